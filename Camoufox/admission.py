@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Optional
+
+import config
+from configure_logger import configure
+from exceptions import AdmissionRejectedException
+
+logger = logging.getLogger(__name__)
+configure(logger)
+
+
+class _Waiter:
+    def __init__(self, priority: str, key: str):
+        self.priority = priority
+        self.key = key
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+
+
+class _PriorityClass:
+    def __init__(self, name: str, weight: int):
+        self.name = name
+        self.weight = weight
+        self.queue: deque[_Waiter] = deque()
+        # Виртуальное время stride-планировщика: класс с меньшим значением обслуживается следующим
+        self.pass_value = 0.0
+        self.in_use = 0
+        self.admitted = 0
+        self.avg_wait = 0.0
+
+
+class AdmissionController:
+    """
+    Допуск к слотам вкладок: ограниченная очередь ожидания, дедлайны,
+    взвешенное разделение слотов между классами приоритета и лимит слотов на один ключ
+    (домен или клиент), чтобы один источник не занимал все вкладки, пока ждут другие.
+    """
+
+    def __init__(self, slots: int, queue_depth: int):
+        self.slots = slots
+        self.queue_depth = queue_depth
+        self.free = slots
+        self.max_per_key = max(1, math.ceil(slots * config.FAIR_MAX_SHARE_PER_KEY))
+        self.classes = {name: _PriorityClass(name, weight) for name, weight in config.PRIORITY_WEIGHTS.items()}
+        self._key_usage: dict[str, int] = {}
+        self.waiting = 0
+        self.in_use = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_deadline = 0
+        # Скользящее среднее времени занятия слота, по нему оценивается ожидание в очереди
+        self._avg_service: Optional[float] = None
+
+    def estimated_wait(self) -> float:
+        if self.free > 0 or self._avg_service is None:
+            return 0.0
+        return (self.waiting + 1) * self._avg_service / self.slots
+
+    async def acquire(
+            self,
+            deadline: Optional[float] = None,
+            priority: str = "normal",
+            key: str = "",
+    ) -> float:
+        """
+        Занимает слот. deadline — момент time.monotonic(), до которого работа должна начаться,
+        priority — класс из config.PRIORITY_WEIGHTS, key — ключ справедливого разделения.
+        """
+        if priority not in self.classes:
+            raise ValueError(f"Неизвестный класс приоритета: {priority}")
+
+        if self.waiting >= self.queue_depth:
+            self.rejected_queue_full += 1
+            raise AdmissionRejectedException(429, "Очередь запросов заполнена", self._retry_after())
+
+        timeout = None
+        if deadline is not None:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0 or self.estimated_wait() > timeout:
+                self.rejected_deadline += 1
+                raise AdmissionRejectedException(503, "Запрос не успеет начаться до дедлайна", self._retry_after())
+
+        waiter = _Waiter(priority, key)
+        cls = self.classes[priority]
+        if not cls.queue:
+            # Класс, простаивавший в очереди, не должен получить «накопленные» слоты разом
+            cls.pass_value = max(cls.pass_value, self._min_active_pass())
+        cls.queue.append(waiter)
+        self.waiting += 1
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Слот уже выдан, но ожидающий ушёл — возвращаем его
+                self._release_slot(waiter.priority, waiter.key)
+            else:
+                waiter.future.cancel()
+                cls.queue.remove(waiter)
+                self.waiting -= 1
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected_deadline += 1
+                raise AdmissionRejectedException(503, "Дедлайн истёк в очереди", self._retry_after())
+            raise
+
+        wait = time.monotonic() - waiter.enqueued_at
+        cls.avg_wait = 0.8 * cls.avg_wait + 0.2 * wait
+        return time.monotonic()
+
+    def try_acquire(self, priority: str = "normal", key: str = "") -> Optional[float]:
+        """Занимает свободный слот без ожидания, если очередь пуста; иначе None."""
+        if self.free <= 0 or self.waiting > 0:
+            return None
+        self._take_slot(self.classes[priority], key)
+        return time.monotonic()
+
+    def release(self, acquired_at: float, priority: str = "normal", key: str = ""):
+        service = time.monotonic() - acquired_at
+        self._avg_service = service if self._avg_service is None else 0.8 * self._avg_service + 0.2 * service
+        self._release_slot(priority, key)
+
+    def stats(self) -> dict[str, int]:
+        result = {
+            "slots": self.slots,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_deadline": self.rejected_deadline,
+            "avg_service_ms": round((self._avg_service or 0) * 1000),
+        }
+        for name, cls in self.classes.items():
+            result[f"{name}_waiting"] = len(cls.queue)
+            result[f"{name}_in_use"] = cls.in_use
+            result[f"{name}_admitted"] = cls.admitted
+            result[f"{name}_avg_wait_ms"] = round(cls.avg_wait * 1000)
+        return result
+
+    def _dispatch(self):
+        """
+        Раздаёт свободные слоты: класс с наименьшим pass_value, первый ожидающий не упёршийся в лимит ключа.
+        Если все ожидающие упёрлись в лимит (ждёт только один ключ), слот всё равно выдаётся — свободные
+        вкладки не простаивают, а лимит снова действует, как только появится запрос другого ключа.
+        """
+        while self.free > 0:
+            picked = self._pick(capped=True) or self._pick(capped=False)
+            if picked is None:
+                return
+            cls, waiter = picked
+            cls.queue.remove(waiter)
+            cls.pass_value += 1 / cls.weight
+            self._grant(cls, waiter)
+
+    def _pick(self, capped: bool) -> Optional[tuple[_PriorityClass, _Waiter]]:
+        for cls in sorted((cls for cls in self.classes.values() if cls.queue), key=lambda c: c.pass_value):
+            for waiter in cls.queue:
+                if not capped or self._key_usage.get(waiter.key, 0) < self.max_per_key:
+                    return cls, waiter
+        return None
+
+    def _grant(self, cls: _PriorityClass, waiter: _Waiter):
+        self.waiting -= 1
+        self._take_slot(cls, waiter.key)
+        waiter.future.set_result(None)
+
+    def _take_slot(self, cls: _PriorityClass, key: str):
+        self.free -= 1
+        self.in_use += 1
+        self.admitted += 1
+        cls.in_use += 1
+        cls.admitted += 1
+        self._key_usage[key] = self._key_usage.get(key, 0) + 1
+
+    def _release_slot(self, priority: str, key: str):
+        self.free += 1
+        self.in_use -= 1
+        self.classes[priority].in_use -= 1
+        self._key_usage[key] -= 1
+        if self._key_usage[key] == 0:
+            del self._key_usage[key]
+        self._dispatch()
+
+    def _min_active_pass(self) -> float:
+        active = [cls.pass_value for cls in self.classes.values() if cls.queue]
+        return min(active) if active else max((cls.pass_value for cls in self.classes.values()), default=0.0)
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self.estimated_wait()))
@@ -0,0 +1,136 @@
+"""
+Локальный стенд для бенчмарков: страницы-заглушки вместо живого Twitch.
+
+/heavy      — SPA-подобная страница: большой DOM строится скриптом, много картинок,
+              узел .channel-info-content появляется после отрисовки.
+/slow       — ответ сервера задерживается на delay_ms, контент дорисовывается ещё через render_ms.
+/challenge  — имитация Cloudflare: заголовок «Just a moment...» и iframe turnstile,
+              через clear_ms страница уходит на /heavy.
+/flaky      — каждые fail_every-й запрос обрывает соединение (для проверки повторов safe_goto).
+"""
+import asyncio
+import base64
+import itertools
+
+from aiohttp import web
+
+_PIXEL = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+
+
+def _heavy_html(nodes: int, images: int) -> str:
+    image_tags = "".join(f'<img src="/asset/img-{i}.png" width="1" height="1">' for i in range(images))
+    return f"""<!doctype html>
+<html>
+<head><title>Heavy fixture</title></head>
+<body>
+<div id="app"></div>
+{image_tags}
+<script>
+    requestAnimationFrame(() => {{
+        const app = document.getElementById('app');
+        const list = document.createElement('ul');
+        for (let i = 0; i < {nodes}; i++) {{
+            const item = document.createElement('li');
+            item.textContent = 'item ' + i;
+            list.appendChild(item);
+        }}
+        app.appendChild(list);
+        const info = document.createElement('div');
+        info.className = 'channel-info-content';
+        info.innerHTML = '<h1>Fixture channel</h1><p data-a-target="stream-title">title</p>';
+        app.appendChild(info);
+    }});
+</script>
+</body>
+</html>"""
+
+
+async def heavy(request: web.Request) -> web.Response:
+    nodes = int(request.query.get("nodes", "5000"))
+    images = int(request.query.get("images", "50"))
+    return web.Response(text=_heavy_html(nodes, images), content_type="text/html")
+
+
+async def slow(request: web.Request) -> web.Response:
+    delay_ms = int(request.query.get("delay_ms", "2000"))
+    render_ms = int(request.query.get("render_ms", "1000"))
+    await asyncio.sleep(delay_ms / 1000)
+    html = f"""<!doctype html>
+<html>
+<head><title>Slow fixture</title></head>
+<body>
+<script>
+    setTimeout(() => {{
+        const info = document.createElement('div');
+        info.className = 'channel-info-content';
+        info.textContent = 'ready';
+        document.body.appendChild(info);
+    }}, {render_ms});
+</script>
+</body>
+</html>"""
+    return web.Response(text=html, content_type="text/html")
+
+
+async def challenge(request: web.Request) -> web.Response:
+    clear_ms = int(request.query.get("clear_ms", "3000"))
+    html = f"""<!doctype html>
+<html>
+<head><title>Just a moment...</title></head>
+<body>
+<div class="cf-turnstile">
+    <iframe src="/cdn-cgi/challenge-platform/turnstile?cloudflare=1" width="300" height="65"></iframe>
+</div>
+<script>
+    setTimeout(() => location.replace('/heavy'), {clear_ms});
+</script>
+</body>
+</html>"""
+    return web.Response(text=html, content_type="text/html")
+
+
+async def turnstile(request: web.Request) -> web.Response:
+    html = '<!doctype html><html><body><input type="checkbox"></body></html>'
+    return web.Response(text=html, content_type="text/html")
+
+
+def _flaky_handler():
+    counter = itertools.count(1)
+
+    async def flaky(request: web.Request) -> web.StreamResponse:
+        fail_every = int(request.query.get("fail_every", "3"))
+        if next(counter) % fail_every == 0:
+            # Обрыв соединения: page.goto получает сетевую ошибку, как при сбое площадки
+            request.transport.abort()
+            raise web.HTTPServiceUnavailable()
+        return web.Response(text=_heavy_html(500, 5), content_type="text/html")
+
+    return flaky
+
+
+async def asset(request: web.Request) -> web.Response:
+    return web.Response(body=_PIXEL, content_type="image/png")
+
+
+def create_app() -> web.Application:
+    app = web.Application()
+    app.router.add_get("/heavy", heavy)
+    app.router.add_get("/slow", slow)
+    app.router.add_get("/challenge", challenge)
+    app.router.add_get("/cdn-cgi/challenge-platform/turnstile", turnstile)
+    app.router.add_get("/flaky", _flaky_handler())
+    app.router.add_get("/asset/{name}", asset)
+    return app
+
+
+async def start_fixture_site(host: str = "127.0.0.1", port: int = 8765) -> web.AppRunner:
+    runner = web.AppRunner(create_app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+if __name__ == "__main__":
+    web.run_app(create_app(), host="127.0.0.1", port=8765)
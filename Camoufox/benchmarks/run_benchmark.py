@@ -0,0 +1,231 @@
+"""
+Офлайн-бенчмарк camoufox_server на локальном стенде (fixture_site.py).
+
+Запускает стенд и настоящий сервер (uvicorn camoufox_server:app) либо использует уже
+запущенный (--server-url), гоняет сценарии с заданной конкурентностью и сохраняет
+p50/p95/p99, пропускную способность и RSS процесса сервера в JSON.
+
+Примеры (из каталога Camoufox):
+    python benchmarks/run_benchmark.py --scenarios heavy,slow --concurrency 1,4,8 --requests 40
+    python benchmarks/run_benchmark.py --compare benchmarks/results/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Optional
+
+import aiohttp
+
+from fixture_site import start_fixture_site
+
+CAMOUFOX_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CAMOUFOX_DIR)
+
+from process_stats import process_tree_rss  # noqa: E402
+
+RESULTS_DIR = os.path.join(CAMOUFOX_DIR, "benchmarks", "results")
+
+SCENARIOS = {
+    "heavy": {"path": "/heavy", "request": {"wait_time": 10, "wait_for": {"selector": ".channel-info-content"}}},
+    "slow": {"path": "/slow", "request": {"wait_time": 15, "wait_for": {"selector": ".channel-info-content"}}},
+    "challenge": {"path": "/challenge", "request": {"wait_time": 10, "wait_for": {"selector": ".channel-info-content"}}},
+    "flaky": {"path": "/flaky", "request": {"wait_time": 1}},
+}
+
+REPORTED_METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "rss_peak_mb")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def sample_rss(pid: Optional[int], samples: list[int], stop: asyncio.Event):
+    while not stop.is_set():
+        if pid is not None:
+            samples.append(process_tree_rss(pid) or 0)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.5)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_scenario(
+        session: aiohttp.ClientSession,
+        server_url: str,
+        fixture_url: str,
+        scenario: str,
+        concurrency: int,
+        requests: int,
+        extra: dict,
+        server_pid: Optional[int],
+) -> dict:
+    spec = SCENARIOS[scenario]
+    body = {"url": fixture_url + spec["path"], "no_cache": True, **spec["request"], **extra}
+    latencies: list[float] = []
+    errors = 0
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+
+    async def worker():
+        nonlocal errors
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.monotonic()
+            try:
+                async with session.post(f"{server_url}/fetch-html", json=body) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+                        continue
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append((time.monotonic() - started) * 1000)
+
+    rss_samples: list[int] = []
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_rss(server_pid, rss_samples, stop))
+    started = time.monotonic()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.monotonic() - started
+    stop.set()
+    await sampler
+
+    result = {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": requests,
+        "ok": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "mean_ms": round(statistics.fmean(latencies), 1) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "rss_peak_mb": round(max(rss_samples) / 1024 ** 2, 1) if rss_samples else None,
+        "rss_mean_mb": round(statistics.fmean(rss_samples) / 1024 ** 2, 1) if rss_samples else None,
+    }
+    print(f"{scenario:>10} c={concurrency:<3} ok={result['ok']:<4} err={errors:<3} "
+          f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms "
+          f"rps={result['throughput_rps']} rss_peak={result['rss_peak_mb']}MB")
+    return result
+
+
+def compare(current: list[dict], baseline_path: str, threshold: float) -> bool:
+    """Печатает отличия от сохранённого прогона. Возвращает True, если найдены регрессии."""
+    with open(baseline_path, "r", encoding="utf-8") as file:
+        baseline = {(r["scenario"], r["concurrency"]): r for r in json.load(file)["results"]}
+
+    regressed = False
+    for result in current:
+        previous = baseline.get((result["scenario"], result["concurrency"]))
+        if previous is None:
+            continue
+        for metric in REPORTED_METRICS:
+            old, new = previous.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            # для пропускной способности хуже — это меньше
+            worse = -change if metric == "throughput_rps" else change
+            flag = ""
+            if worse > threshold:
+                flag = "  <-- регрессия"
+                regressed = True
+            print(f"{result['scenario']:>10} c={result['concurrency']:<3} {metric:<15} {old} -> {new} "
+                  f"({change:+.1f}%){flag}")
+    return regressed
+
+
+async def wait_for_server(session: aiohttp.ClientSession, server_url: str, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{server_url}/health") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(1)
+    raise RuntimeError(f"Сервер {server_url} не поднялся за {timeout} секунд")
+
+
+async def main(args: argparse.Namespace) -> int:
+    fixture_runner = await start_fixture_site(port=args.fixture_port)
+    fixture_url = f"http://127.0.0.1:{args.fixture_port}"
+
+    server_process = None
+    server_url = args.server_url
+    if server_url is None:
+        server_url = f"http://127.0.0.1:{args.server_port}"
+        server_process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "camoufox_server:app",
+             "--host", "127.0.0.1", "--port", str(args.server_port), "--log-level", "warning"],
+            cwd=CAMOUFOX_DIR,
+        )
+
+    extra = json.loads(args.request_json) if args.request_json else {}
+    results = []
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=args.timeout)) as session:
+            await wait_for_server(session, server_url)
+            for scenario in args.scenarios.split(","):
+                for concurrency in (int(c) for c in args.concurrency.split(",")):
+                    results.append(await run_scenario(
+                        session, server_url, fixture_url, scenario, concurrency, args.requests, extra,
+                        server_process.pid if server_process else args.server_pid,
+                    ))
+    finally:
+        if server_process:
+            server_process.terminate()
+            server_process.wait(timeout=30)
+        await fixture_runner.cleanup()
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y-%m-%d_%H-%M-%S") + ".json")
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump({
+            "created_at": datetime.now().isoformat(),
+            "arguments": vars(args),
+            "results": results,
+        }, file, ensure_ascii=False, indent=2)
+    print(f"💾 Результаты сохранены: {output}")
+
+    if args.compare and compare(results, args.compare, args.regression_threshold):
+        return 1
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк camoufox_server")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="сценарии через запятую")
+    parser.add_argument("--concurrency", default="1,4,8", help="уровни конкурентности через запятую")
+    parser.add_argument("--requests", type=int, default=20, help="запросов на сценарий и уровень")
+    parser.add_argument("--request-json", help="дополнительные поля URLRequest, например '{\"block\": {\"preset\": \"html-only\"}}'")
+    parser.add_argument("--server-url", help="использовать уже запущенный сервер вместо запуска своего")
+    parser.add_argument("--server-pid", type=int, help="PID уже запущенного сервера для замера RSS")
+    parser.add_argument("--server-port", type=int, default=8090)
+    parser.add_argument("--fixture-port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=180, help="таймаут одного запроса, секунд")
+    parser.add_argument("--output", help="файл результатов (по умолчанию benchmarks/results/<время>.json)")
+    parser.add_argument("--compare", help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--regression-threshold", type=float, default=10, help="порог регрессии, %%")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
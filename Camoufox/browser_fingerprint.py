@@ -0,0 +1,65 @@
+import fcntl
+import json
+import logging
+import os
+from typing import Any, Optional
+
+import config
+from configure_logger import configure
+
+# generate_fingerprint есть не во всех версиях camoufox: без него отпечаток не закрепляется
+try:
+    from camoufox.fingerprints import generate_fingerprint
+except ImportError:
+    generate_fingerprint = None
+
+logger = logging.getLogger(__name__)
+configure(logger)
+
+_pinned: Optional[dict[str, Any]] = None
+
+
+def browser_options() -> dict[str, Any]:
+    """
+    Параметры запуска Camoufox: config.BROWSER_OPTIONS плюс закреплённый отпечаток.
+    Без закрепления каждый запуск получает новый отпечаток вместе с user agent,
+    и сохранённый clearance (привязанный к user agent) после перезапуска не подходит.
+    """
+    options = dict(config.BROWSER_OPTIONS)
+    fingerprint = pinned_fingerprint()
+    if fingerprint is not None:
+        options["fingerprint"] = fingerprint
+    return options
+
+
+def pinned_fingerprint() -> Optional[dict[str, Any]]:
+    """
+    Отпечаток из BROWSER_FINGERPRINT_PATH; при первом запуске создаётся и сохраняется.
+    Файл общий для шардов и перезапусков: все браузеры представляются одинаково.
+    """
+    global _pinned
+    if _pinned is not None or not config.BROWSER_FINGERPRINT_PATH or generate_fingerprint is None:
+        return _pinned
+
+    path = config.BROWSER_FINGERPRINT_PATH
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # шарды стартуют одновременно: отпечаток создаёт один, остальные читают его
+        with open(path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as file:
+                    _pinned = json.load(file)
+                logger.info(f"🪪 Закреплённый отпечаток браузера загружен из {path}")
+            else:
+                _pinned = generate_fingerprint(os=config.BROWSER_OPTIONS.get("os"))
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as file:
+                    json.dump(_pinned, file)
+                os.replace(tmp_path, path)
+                logger.info(f"🪪 Создан и закреплён новый отпечаток браузера: {path}")
+    except Exception as e:
+        logger.warning(f"⚠️🪪 Не удалось закрепить отпечаток браузера {path}, запуск со случайным: {e}")
+        _pinned = None
+    return _pinned
+
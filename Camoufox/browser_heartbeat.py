@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from playwright.async_api import Browser, BrowserContext, Page
+
+import config
+from configure_logger import configure
+
+logger = logging.getLogger(__name__)
+configure(logger)
+
+
+class BrowserHeartbeat:
+    """
+    Фоновая проверка живости браузера настоящим обращением: evaluate в служебной странице
+    раз в HEARTBEAT_INTERVAL_SECONDS. Результат кэшируется, пути запросов читают его без await.
+    После HEARTBEAT_FAILURES неудач подряд браузер считается мёртвым и вызывается on_dead.
+    """
+
+    def __init__(
+            self,
+            current_browser: Callable[[], Optional[Browser]],
+            on_dead: Callable[[], Awaitable[object]],
+    ):
+        self.current_browser = current_browser
+        self.on_dead = on_dead
+        self.latency = 0.0
+        self.last_ok_at: Optional[float] = None
+        self.failures = 0
+        self.checks = 0
+        self._browser: Optional[Browser] = None
+        self._dead = False
+        self._context: Optional[BrowserContext] = None
+        self._page: Optional[Page] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def is_alive(self, browser: Optional[Browser]) -> bool:
+        """Кэшированное состояние браузера; новый браузер считается живым до первой проверки."""
+        if browser is None or not browser.is_connected():
+            return False
+        return not (browser is self._browser and self._dead)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self._close_sentinel()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "alive": int(self.is_alive(self.current_browser())),
+            "latency_ms": round(self.latency * 1000),
+            "last_ok_age_ms": round((time.monotonic() - self.last_ok_at) * 1000) if self.last_ok_at else -1,
+            "consecutive_failures": self.failures,
+            "checks": self.checks,
+        }
+
+    async def beat(self, browser: Browser) -> bool:
+        """Одна проверка: evaluate в служебной странице с таймаутом HEARTBEAT_TIMEOUT_SECONDS."""
+        if browser is not self._browser:
+            await self._close_sentinel()
+            self._browser = browser
+            self._dead = False
+            self.failures = 0
+
+        self.checks += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._ping(browser), timeout=config.HEARTBEAT_TIMEOUT_SECONDS)
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"⚠️💓 Браузер не ответил на проверку ({self.failures}/{config.HEARTBEAT_FAILURES}): {e!r}")
+            await self._close_sentinel()
+            if self.failures >= config.HEARTBEAT_FAILURES:
+                self._dead = True
+            return False
+
+        self.latency = time.monotonic() - started
+        self.last_ok_at = time.monotonic()
+        self.failures = 0
+        self._dead = False
+        return True
+
+    async def _ping(self, browser: Browser):
+        if self._page is None or self._page.is_closed():
+            self._context = await browser.new_context()
+            self._page = await self._context.new_page()
+        await self._page.evaluate("1")
+
+    async def _close_sentinel(self):
+        context, self._context, self._page = self._context, None, None
+        if context is not None:
+            try:
+                await asyncio.wait_for(context.close(), timeout=config.HEARTBEAT_TIMEOUT_SECONDS)
+            except Exception:
+                pass
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(config.HEARTBEAT_INTERVAL_SECONDS)
+            browser = self.current_browser()
+            if browser is None:
+                continue
+            if not await self.beat(browser) and not self.is_alive(browser):
+                logger.error("❌💓 Браузер признан мёртвым, переключаюсь на резервный")
+                try:
+                    await self.on_dead()
+                except Exception as e:
+                    logger.exception(f"Не удалось заменить мёртвый браузер: {e}")
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from playwright.async_api import Browser
+
+import config
+from configure_logger import configure
+
+logger = logging.getLogger(__name__)
+configure(logger)
+
+
+class BrowserStandby:
+    """
+    Заранее запущенный резервный браузер. При падении или замене активного браузера
+    резерв продвигается мгновенно, а новый резерв запускается в фоне.
+    """
+
+    def __init__(self, launch: Callable[[], Awaitable[Browser]]):
+        self._launch = launch
+        self.browser: Optional[Browser] = None
+        self._task: Optional[asyncio.Task] = None
+        self.launches = 0
+        self.launch_failures = 0
+        self.promotions = 0
+        self.last_launch_seconds = 0.0
+        self._closed = False
+
+    def replenish(self):
+        """Запускает резервный браузер в фоне, если его нет и он ещё не запускается."""
+        if not config.STANDBY_BROWSER or self._closed or self.browser is not None:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def take(self) -> Browser:
+        """
+        Забирает резервный браузер (ждёт идущий запуск) и начинает готовить следующий.
+        Без резерва запускает браузер сразу.
+        """
+        if self.browser is not None and not self.browser.is_connected():
+            logger.warning("⚠️🧊 Резервный браузер отключился, запускаю новый")
+            await self._close(self.browser)
+            self.browser = None
+
+        if self.browser is None and self._task is not None and not self._task.done():
+            await asyncio.shield(self._task)
+
+        browser, self.browser = self.browser, None
+        if browser is None:
+            browser = await self._launch()
+        else:
+            self.promotions += 1
+            logger.info("🧊➡️ Резервный браузер продвинут в активные")
+        self.replenish()
+        return browser
+
+    async def discard(self):
+        """Закрывает резервный браузер (дождавшись идущего запуска) и готовит новый."""
+        if self._task is not None and not self._task.done():
+            await asyncio.shield(self._task)
+        browser, self.browser = self.browser, None
+        if browser is not None:
+            await self._close(browser)
+        self.replenish()
+
+    async def close(self):
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self.browser is not None:
+            await self._close(self.browser)
+            self.browser = None
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "ready": int(self.browser is not None),
+            "launches": self.launches,
+            "launch_failures": self.launch_failures,
+            "promotions": self.promotions,
+            "last_launch_ms": round(self.last_launch_seconds * 1000),
+        }
+
+    async def _run(self):
+        started = time.monotonic()
+        try:
+            browser = await self._launch()
+        except Exception as e:
+            self.launch_failures += 1
+            logger.warning(f"⚠️🧊 Не удалось запустить резервный браузер: {e}, повтор через "
+                           f"{config.RESTART_DELAY_SECONDS} секунд")
+            asyncio.get_running_loop().call_later(config.RESTART_DELAY_SECONDS, self.replenish)
+            return
+        self.launches += 1
+        self.last_launch_seconds = time.monotonic() - started
+        self.browser = browser
+        logger.info(f"🧊 Резервный браузер готов за {self.last_launch_seconds:.1f} с")
+
+    @staticmethod
+    async def _close(browser: Browser):
+        try:
+            await browser.__aexit__(None, None, None)
+        except Exception as e:
+            logger.warning(f"⚠️🧊 Ошибка закрытия резервного браузера: {e}")
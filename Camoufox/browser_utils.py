@@ -4,43 +4,170 @@ import os
 import random
 import re
 import shutil
+import time
+from collections import deque
 from datetime import datetime
-from typing import Callable
+from typing import Callable, Literal, Optional
 
-from playwright.async_api import Page, Browser
+from playwright.async_api import Page, Browser, TimeoutError as PlaywrightTimeoutError
 
 import config
+import metrics
+from clearance_store import clearance_store
 from cloudflare import check_cloudflare, bypass_cloudflare
 from configure_logger import configure
+from domain_health import domain_governor, domain_of
 from exceptions import CloudflareRestartException
 
 logger = logging.getLogger(__name__)
 configure(logger)
 
 
-async def safe_goto(page: Page, url: str) -> bool:
+# Ошибки Firefox/Playwright, при которых повтор перехода бессмыслен: адрес не существует или не принимает соединения
+_FATAL_NAVIGATION_ERRORS = (
+    "NS_ERROR_UNKNOWN_HOST",
+    "NS_ERROR_CONNECTION_REFUSED",
+    "NS_ERROR_MALFORMED_URI",
+    "NS_ERROR_UNKNOWN_PROTOCOL",
+    "NS_ERROR_PROXY_CONNECTION_REFUSED",
+    "ERR_NAME_NOT_RESOLVED",
+    "ERR_CONNECTION_REFUSED",
+    "invalid URL",
+)
+
+# Признаки закрытого браузера или страницы: повтор в этой вкладке невозможен, решает вызывающий код
+_BROWSER_GONE_ERRORS = (
+    "Target page, context or browser has been closed",
+    "Target closed",
+    "Browser has been closed",
+    "Browser closed",
+)
+
+
+def classify_navigation_error(error: Exception) -> Literal["fatal", "browser", "retry"]:
+    """Класс ошибки перехода: fatal — не повторять, browser — браузер или вкладка закрыты, retry — повторить."""
+    if isinstance(error, PlaywrightTimeoutError):
+        return "retry"
+    message = str(error)
+    if any(marker in message for marker in _BROWSER_GONE_ERRORS):
+        return "browser"
+    if any(marker in message for marker in _FATAL_NAVIGATION_ERRORS):
+        return "fatal"
+    return "retry"
+
+
+class CommitLatency:
+    """Скользящее окно задержек от начала перехода до коммита (получен ответ основного фрейма)."""
+
+    def __init__(self, size: int):
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+
+    def p95(self) -> Optional[float]:
+        """95-й перцентиль; None, пока замеров меньше HEDGE_MIN_SAMPLES."""
+        if len(self._samples) < config.HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def stats(self) -> dict[str, int]:
+        p95 = self.p95()
+        return {"samples": len(self._samples), "p95_ms": round(p95 * 1000) if p95 is not None else -1}
+
+
+commit_latency = CommitLatency(config.HEDGE_WINDOW)
+
+
+async def safe_goto(
+        page: Page,
+        url: str,
+        committed: Optional[asyncio.Event] = None,
+) -> bool:
+    """
+    Переход с повторами по классу ошибки: DNS и отказ в соединении — сразу неудача, таймауты и прочие сбои —
+    повтор с экспоненциальной паузой, проверка Cloudflare — обход. Все попытки и паузы укладываются в бюджет
+    NAVIGATION_BUDGET_SECONDS. committed взводится при коммите перехода.
+    """
+    domain = domain_of(url)
+    budget_end = time.monotonic() + config.NAVIGATION_BUDGET_SECONDS
+
     for attempt in range(config.MAX_RETRIES_PAGE):
+        if attempt > 0 and domain_governor.is_open(domain):
+            # домен нас блокирует: повторы только сожгут вкладки
+            logger.warning(f"⛔ Повторы перехода на {url} прекращены: circuit breaker для {domain} открыт")
+            raise domain_governor.open_error(domain)
+        remaining = budget_end - time.monotonic()
+        if remaining < config.NAVIGATION_MIN_ATTEMPT_SECONDS:
+            logger.error(f"❌ Бюджет времени на переход к {url} исчерпан после {attempt} попыток")
+            return False
         try:
             logger.info(f"➡️ Переход на {url} (попытка {attempt + 1}/{config.MAX_RETRIES_PAGE})")
-            await page.goto(url, wait_until=config.WAIT_UNTIL)
+            if attempt > 0:
+                metrics.GOTO_RETRIES.inc()
+            started = time.monotonic()
+
+            def on_navigated(frame):
+                if frame == page.main_frame:
+                    commit_latency.observe(time.monotonic() - started)
+                    page.remove_listener("framenavigated", on_navigated)
+                    if committed is not None:
+                        committed.set()
+
+            page.on("framenavigated", on_navigated)
+            try:
+                with metrics.GOTO.time():
+                    response = await page.goto(
+                        url,
+                        wait_until=config.WAIT_UNTIL,
+                        timeout=min(remaining, config.NAVIGATION_TIMEOUT_SECONDS) * 1000,
+                    )
+            finally:
+                page.remove_listener("framenavigated", on_navigated)
+            latency = time.monotonic() - started
             logger.info(f"✅ Успешный переход на {url}")
-            if await check_cloudflare(page):
-                await bypass_cloudflare(page)
+            challenged = await check_cloudflare(page)
+            if challenged:
+                try:
+                    await bypass_cloudflare(page)
+                except CloudflareRestartException:
+                    metrics.CLOUDFLARE_BYPASS.inc(outcome="failure")
+                    domain_governor.record(domain, "failure", latency)
+                    raise
+                metrics.CLOUDFLARE_BYPASS.inc(outcome="success")
+                await clearance_store.save_from_page(page)
+                domain_governor.record(domain, "challenge", latency)
+            elif response is not None and response.status in (429, 503):
+                logger.warning(f"⚠️ {domain} ограничивает частоту запросов: HTTP {response.status}")
+                domain_governor.record(domain, "rate_limited", latency)
+            else:
+                domain_governor.record(domain, "success", latency)
             return True
         except CloudflareRestartException:
             logger.warning("🔄 Получен сигнал на перезапуск")
             raise
         except Exception as e:
-            logger.warning(f"⚠️ Ошибка при переходе на {url} (попытка {attempt + 1}/{config.MAX_RETRIES_PAGE}): {e}")
+            kind = classify_navigation_error(e)
+            metrics.GOTO_ERRORS.inc(kind=kind)
+            logger.warning(f"⚠️ Ошибка при переходе на {url} (попытка {attempt + 1}/{config.MAX_RETRIES_PAGE}, "
+                           f"{kind}): {e}")
+            if kind == "browser":
+                raise
+            domain_governor.record(domain, "failure")
+            if kind == "fatal":
+                logger.error(f"❌ Адрес {url} недоступен, повторы бессмысленны")
+                return False
 
             if attempt < config.MAX_RETRIES_PAGE - 1:
-                delay = random.uniform(config.RETRY_DELAY_MIN, config.RETRY_DELAY_MAX)
+                # перезагрузка не нужна: следующая попытка снова выполняет goto
+                backoff = min(config.RETRY_DELAY_MAX, config.RETRY_DELAY_MIN * 2 ** attempt)
+                delay = random.uniform(config.RETRY_DELAY_MIN, backoff)
+                if budget_end - time.monotonic() - delay < config.NAVIGATION_MIN_ATTEMPT_SECONDS:
+                    logger.error(f"❌ Бюджет времени на переход к {url} исчерпан после {attempt + 1} попыток")
+                    return False
                 logger.info(f"⏳ Ожидание {delay:.2f} секунд перед повторной попыткой...")
                 await asyncio.sleep(delay)
-                try:
-                    await page.reload(timeout=30000)
-                except:
-                    logger.warning("⚠️ Не удалось обновить страницу")
             else:
                 logger.error(f"❌ Все попытки исчерпаны для {url}")
                 return False
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import os
+import time
+import weakref
+from typing import Awaitable, Callable, Optional
+
+from playwright.async_api import Browser
+
+import config
+import metrics
+from configure_logger import configure
+from page_pool import PagePool
+from process_stats import own_rss, process_tree_rss
+
+logger = logging.getLogger(__name__)
+configure(logger)
+
+
+class BrowserWatchdog:
+    """
+    Периодически снимает показатели активного браузера (RSS его дерева процессов, открытые страницы,
+    страницы с момента запуска) и при превышении порогов вызывает плавную замену браузера.
+    Замена по возрасту (AUTO_RESTART_MINUTES) выполняется только в простое,
+    когда браузер не выдавал страниц ACTIVITY_TIMEOUT_MINUTES минут.
+    """
+
+    def __init__(
+            self,
+            pool: PagePool,
+            current_browser: Callable[[], Optional[Browser]],
+            recycle: Callable[[str], Awaitable[None]],
+    ):
+        self.pool = pool
+        self.current_browser = current_browser
+        self.recycle = recycle
+        self.rss_bytes = 0
+        self.open_pages = 0
+        self.pages_served = 0
+        self.recycles = 0
+        self._browser: Optional[Browser] = None
+        self._started_at = time.monotonic()
+        self._last_activity = time.monotonic()
+        self._last_served = 0
+        self._task: Optional[asyncio.Task] = None
+        # Корневые процессы (драйвер Playwright) каждого браузера, записанные при запуске
+        self._pids: "weakref.WeakKeyDictionary[Browser, set[int]]" = weakref.WeakKeyDictionary()
+
+    def track(self, browser: Browser, pids: set[int]):
+        """Запоминает процессы, появившиеся при запуске браузера: RSS считается только по их дереву."""
+        if pids:
+            self._pids[browser] = pids
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def sample(self, browser: Browser):
+        if browser is not self._browser:
+            self._browser = browser
+            self._started_at = time.monotonic()
+            self._last_activity = time.monotonic()
+            self._last_served = 0
+
+        pids = self._pids.get(browser)
+        if pids:
+            # только дерево активного браузера: резервный и заменяемый браузеры не учитываются
+            self.rss_bytes = sum(process_tree_rss(pid) or 0 for pid in pids)
+        else:
+            # процессы браузера неизвестны — всё дерево сервера без самого Python-процесса
+            tree = process_tree_rss(os.getpid())
+            self.rss_bytes = max(0, tree - own_rss()) if tree is not None else 0
+        self.open_pages = sum(len(context.pages) for context in browser.contexts)
+        self.pages_served = self.pool.served(browser)
+        if self.pages_served != self._last_served or self.pool.leased(browser) > 0:
+            self._last_activity = time.monotonic()
+        self._last_served = self.pages_served
+
+    def recycle_reason(self) -> Optional[str]:
+        if config.BROWSER_RECYCLE_RSS_MB and self.rss_bytes >= config.BROWSER_RECYCLE_RSS_MB * 1024 ** 2:
+            return "rss"
+        if config.BROWSER_RECYCLE_OPEN_PAGES and self.open_pages >= config.BROWSER_RECYCLE_OPEN_PAGES:
+            return "open_pages"
+        if config.BROWSER_RECYCLE_PAGES_SERVED and self.pages_served >= config.BROWSER_RECYCLE_PAGES_SERVED:
+            return "pages_served"
+        now = time.monotonic()
+        if (now - self._started_at >= config.AUTO_RESTART_MINUTES * 60
+                and now - self._last_activity >= config.ACTIVITY_TIMEOUT_MINUTES * 60):
+            return "age"
+        return None
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "rss_bytes": self.rss_bytes,
+            "open_pages": self.open_pages,
+            "pages_served": self.pages_served,
+            "browser_age_seconds": round(time.monotonic() - self._started_at) if self._browser else 0,
+            "recycles": self.recycles,
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(config.TIMEOUT_CHECK_INTERVAL_SECONDS)
+            browser = self.current_browser()
+            if browser is None:
+                continue
+            try:
+                self.sample(browser)
+                reason = self.recycle_reason()
+                if reason is None:
+                    continue
+                logger.warning(f"♻️ Плановая замена браузера ({reason}): RSS {self.rss_bytes // 1024 ** 2} МБ, "
+                               f"открыто страниц {self.open_pages}, обслужено {self.pages_served}")
+                metrics.BROWSER_RECYCLES.inc(reason=reason)
+                self.recycles += 1
+                await self.recycle(reason)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"⚠️♻️ Ошибка сторожа браузера: {e}")
@@ -1,27 +1,152 @@
 import asyncio
+import json
 import logging
+import os
+import time
 from contextlib import asynccontextmanager
-from typing import Optional
+from typing import Awaitable, Callable, Literal, Optional
 
 from camoufox.async_api import AsyncCamoufox
-from fastapi import FastAPI, HTTPException, Response
-from pydantic import BaseModel
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from pydantic import BaseModel, Field, model_validator
 import uvicorn
 
 from scalar_fastapi import get_scalar_api_reference
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
 import config
-from browser_utils import safe_goto
+import metrics
+from admission import AdmissionController
+from browser_fingerprint import browser_options
+from browser_heartbeat import BrowserHeartbeat
+from browser_standby import BrowserStandby
+from browser_utils import classify_navigation_error, commit_latency, safe_goto
+from browser_watchdog import BrowserWatchdog
+from clearance_store import clearance_store
 from configure_logger import configure
+from domain_health import domain_governor, domain_of
+from exceptions import AdmissionRejectedException, InvalidPageInputException
+from extraction import extract_values, subtree_html
+from jobs import JobResult, JobStore, check_webhook_url
+from page_pool import PageLease, PagePool
+from process_stats import child_pids
+from readiness import wait_until_ready
+from response_cache import ResponseCache, make_cache_key
+from route_rules import RouteBlocker
+from screenshot import take_screenshot
+from sessions import PageSession, SessionStore, same_origin, soft_navigate
+from streaming import bytes_stream_response, text_stream_response, utf8_size
+from warm_profile import WarmProfiles
+from watchlist import Watchlist
 
 logger = logging.getLogger(__name__)
 configure(logger)
 
 # ---------------- Models ----------------
+class ReadinessCondition(BaseModel):
+    selector: Optional[str] = None
+    network_idle_ms: Optional[int] = None
+    js_predicate: Optional[str] = None
+    dom_stable_ms: Optional[int] = None
+
+
+class BlockRules(BaseModel):
+    preset: Optional[str] = None
+    resource_types: Optional[list[str]] = None
+    url_patterns: Optional[list[str]] = None
+    domains: Optional[list[str]] = None
+
+
+class Extractor(BaseModel):
+    css: Optional[str] = None
+    xpath: Optional[str] = None
+    js: Optional[str] = None
+    attribute: Optional[str] = None
+    html: bool = False
+    all: bool = False
+
+    @model_validator(mode="after")
+    def check_source(self) -> "Extractor":
+        if sum(source is not None for source in (self.css, self.xpath, self.js)) != 1:
+            raise ValueError("У экстрактора должен быть задан ровно один из css, xpath, js")
+        return self
+
+
+class ClipRect(BaseModel):
+    x: float
+    y: float
+    width: float
+    height: float
+
+
+class ScreenshotOptions(BaseModel):
+    format: Literal["png", "jpeg", "webp"] = "png"
+    # Качество для jpeg/webp (1–100), по умолчанию config.SCREENSHOT_DEFAULT_QUALITY
+    quality: Optional[int] = Field(None, ge=1, le=100)
+    full_page: bool = True
+    clip: Optional[ClipRect] = None
+    # Снимок только элемента (первого совпадения)
+    selector: Optional[str] = None
+    max_height: Optional[int] = Field(None, gt=0)
+    viewport_width: int = 1920
+    viewport_height: int = 1080
+    # Плотность пикселей: страница открывается в отдельном контексте вне пула
+    device_scale_factor: Optional[float] = Field(None, gt=0)
+    # Миниатюра: уменьшение до этой ширины внутри браузера
+    thumbnail_width: Optional[int] = Field(None, gt=0)
+
+
 class URLRequest(BaseModel):
     url: str
+    # Без wait_for — фиксированная пауза, с wait_for — верхняя граница ожидания условия
     wait_time: int = 3
+    wait_for: Optional[ReadinessCondition] = None
+    # Управление кэшем: допустимый возраст ответа (None — значение из config) и обход кэша
+    max_age: Optional[int] = None
+    no_cache: bool = False
+    # Блокировка тяжёлых ресурсов (только /fetch-html), например {"preset": "html-only"}
+    block: Optional[BlockRules] = None
+    # Сколько мс запрос готов ждать начала работы (альтернатива заголовку X-Deadline-Ms)
+    deadline_ms: Optional[int] = None
+    # Извлечение в странице: JSON только с нужными значениями или outerHTML поддерева
+    extract: Optional[dict[str, Extractor]] = None
+    subtree: Optional[str] = None
+    # Класс приоритета в очереди допуска: interactive — действия пользователя, background — фоновые обновления
+    priority: Literal["interactive", "normal", "background"] = "normal"
+    # Идентификатор клиента для справедливого разделения вкладок (по умолчанию X-Caller или адрес клиента)
+    caller: Optional[str] = None
+    # Потоковый ответ: chunked-передача кусками, для HTML — сжатие по Accept-Encoding (gzip/br/zstd).
+    # Экономит только копии при кодировании и сжатии: документ целиком читается из страницы (и хранится в кэше)
+    # до начала передачи, поэтому пиковая память на HTML и время до первого байта не уменьшаются
+    stream: bool = False
+    # Параметры /fetch-screenshot (по умолчанию полная страница в PNG при 1920x1080)
+    screenshot: Optional[ScreenshotOptions] = None
+
+
+class JobRequest(URLRequest):
+    # html — как /fetch-html, screenshot — как /fetch-screenshot (stream для заданий не используется)
+    kind: Literal["html", "screenshot"] = "html"
+    # После завершения задания сюда отправляется POST с его описанием (без тела результата)
+    webhook_url: Optional[str] = None
+
+
+class SessionRequest(BaseModel):
+    # Правила блокировки действуют всю жизнь сессии (block в запросах сессии не используется)
+    block: Optional[BlockRules] = None
+    # Простой в секундах, после которого сессия закрывается (по умолчанию config.SESSION_IDLE_SECONDS)
+    idle_seconds: Optional[int] = Field(None, gt=0)
+
+
+class SessionFetchRequest(URLRequest):
+    # auto — на том же origin и с wait_for.selector переход внутри приложения (без перезагрузки), иначе полный;
+    # goto — всегда полный (кэш ответов, block и screenshot в сессиях не используются)
+    navigation: Literal["auto", "goto"] = "auto"
+
+
+class WatchRequest(URLRequest):
+    # Интервал планового обновления и джиттер — доля интервала, на которую сдвигается каждое обновление
+    interval_seconds: int = Field(300, ge=config.WATCHLIST_MIN_INTERVAL_SECONDS)
+    jitter: float = Field(0.1, ge=0, le=0.5)
 
 
 # class HTMLResponse(BaseModel):
@@ -38,34 +163,98 @@ browser: Optional[AsyncCamoufox] = None
 
 # Блокировка для последовательной инициализации/рестарта браузера.
 _browser_lock = asyncio.Lock()
+# Запуски браузера идут строго по одному: процессы браузера определяются по новым дочерним процессам сервера,
+# и одновременный запуск (например, пополнение резерва во время замены) приписал бы их не тому браузеру
+_launch_lock = asyncio.Lock()
 
 # Ограничение одновременно открытых страниц. Настрой под доступную память/ресурсы.
 # Пример: 6 — уменьшай если хост жалуется на память.
-_pages_semaphore = asyncio.Semaphore(6)
+# Ожидающие запросы стоят в ограниченной очереди и отклоняются, если не успевают к дедлайну.
+admission = AdmissionController(6, config.ADMISSION_QUEUE_DEPTH)
+
+# Пул прогретых контекстов/страниц, аренды выдаются под контролем admission.
+page_pool = PagePool()
+
+# Кэш ответов /fetch-html с объединением одинаковых одновременных запросов.
+response_cache = ResponseCache(
+    config.RESPONSE_CACHE_MAX_BYTES,
+    config.RESPONSE_CACHE_DISK_PATH,
+    config.RESPONSE_CACHE_DISK_MAX_BYTES,
+)
+
+# Постоянные прогретые профили браузера (опционально, config.WARM_PROFILE_DIR).
+warm_profiles = WarmProfiles(config.WARM_PROFILE_DIR, config.WARM_PROFILE_SLOTS) if config.WARM_PROFILE_DIR else None
+
+# Резервный браузер, запущенный заранее: продвигается при падении, замене или перезапуске активного.
+standby = BrowserStandby(lambda: launch_browser())
+
+# Фоновая проверка живости браузера; при его смерти сразу продвигается резервный.
+heartbeat = BrowserHeartbeat(lambda: browser, lambda: ensure_browser())
+
+# Сторож браузера: плановая замена по RSS, числу страниц и возрасту (см. recycle_browser).
+watchdog = BrowserWatchdog(page_pool, lambda: browser, lambda reason: recycle_browser(reason))
+
+# Асинхронные задания /jobs: выполнение не зависит от соединения клиента, результаты в ограниченном хранилище.
+jobs = JobStore(config.JOB_STORE_MAX_BYTES, config.JOB_RESULT_TTL_SECONDS, config.JOB_MAX_ACTIVE)
+
+# Sticky-сессии /sessions: вкладка держится между запросами клиента, простаивающие закрываются.
+sessions = SessionStore(config.SESSION_MAX_ACTIVE, lambda lease, reusable: page_pool.release(lease, reusable=reusable))
+
+# Список отслеживания /watchlist: плановые обновления в простаивающих вкладках, последний результат в памяти.
+watchlist = Watchlist(
+    config.WATCHLIST_MAX_ENTRIES,
+    config.WATCHLIST_MAX_BYTES,
+    lambda req: fetch_html_cached(req, time.monotonic() + config.WATCHLIST_START_DEADLINE_SECONDS),
+    lambda: admission.waiting == 0 and admission.free > config.WATCHLIST_RESERVED_SLOTS,
+)
+
+metrics.register_stats(
+    "camoufox_admission", "Очередь допуска", admission.stats,
+    counters=["admitted", "rejected_queue_full", "rejected_deadline",
+              *(f"{name}_admitted" for name in config.PRIORITY_WEIGHTS)])
+metrics.register_stats("camoufox_page_pool", "Пул страниц", page_pool.stats,
+                       counters=["warm_hits", "cold_hits", "retired"])
+metrics.register_stats("camoufox_response_cache", "Кэш ответов", response_cache.stats,
+                       counters=["hits", "disk_hits", "misses", "coalesced", "evictions"])
+metrics.register_stats("camoufox_clearance", "Кэш clearance Cloudflare", clearance_store.stats,
+                       counters=["hits", "misses", "ua_mismatches", "expired", "stored"])
+# recycles не объявлен счётчиком: camoufox_browser_recycles_total уже есть (BROWSER_RECYCLES, по причине)
+metrics.register_stats("camoufox_browser", "Сторож браузера", watchdog.stats)
+metrics.register_stats("camoufox_heartbeat", "Проверка живости браузера", heartbeat.stats, counters=["checks"])
+metrics.register_stats("camoufox_standby", "Резервный браузер", standby.stats,
+                       counters=["launches", "launch_failures", "promotions"])
+metrics.register_stats("camoufox_domains", "Здоровье доменов", domain_governor.stats,
+                       counters=["circuit_opens", "rejected"])
+metrics.register_stats("camoufox_commit_latency", "Задержка коммита перехода", commit_latency.stats)
+metrics.register_stats(
+    "camoufox_jobs", "Асинхронные задания", jobs.stats,
+    counters=["submitted", "completed", "failed", "evictions", "expired", "webhooks_delivered", "webhooks_failed"])
+metrics.register_stats("camoufox_watchlist", "Список отслеживания", watchlist.stats,
+                       counters=["refreshes", "failures", "deferred"])
+metrics.register_stats("camoufox_sessions", "Sticky-сессии", sessions.stats, counters=["opened", "expired"])
+if warm_profiles is not None:
+    metrics.register_stats("camoufox_warm_profile", "Постоянный профиль браузера", warm_profiles.stats,
+                           counters=["launches", "wipes"])
 
 
 # ---------------- Helper functions ----------------
-async def is_browser_alive() -> bool:
-    """Проверка, что браузер жив и готов к работе."""
-    global browser
-    if browser is None:
-        return False
+async def launch_browser() -> AsyncCamoufox:
+    """Запуск браузера: с постоянным прогретым профилем, если он включён и есть свободный слот, иначе с чистого листа."""
+    async with _launch_lock:
+        # Новые дочерние процессы сервера после запуска — драйвер Playwright этого браузера
+        before = child_pids(os.getpid())
+        launched = None
+        if warm_profiles is not None:
+            launched = await warm_profiles.launch()
+        if launched is None:
+            launched = await AsyncCamoufox(**browser_options()).__aenter__()
+        watchdog.track(launched, child_pids(os.getpid()) - before)
+        return launched
 
-    try:
-        # Простая проверка доступности: атрибут contexts и опционально вызов version()
-        _ = getattr(browser, "contexts", None)
-        # optionally try a cheap call if available
-        try:
-            # некоторые реализации могут поддерживать version() или user_agent()
-            if hasattr(browser, "version"):
-                await browser.version()
-        except Exception:
-            # не критично — браузер может быть в живом состоянии, но version() недоступен
-            pass
-        return True
-    except Exception as e:
-        logger.warning("Браузер недоступен в is_browser_alive: %s", e)
-        return False
+
+def is_browser_alive() -> bool:
+    """Проверка, что браузер жив: кэшированный результат фоновой проверки heartbeat, без обращений к браузеру."""
+    return heartbeat.is_alive(browser)
 
 
 async def ensure_browser() -> AsyncCamoufox:
@@ -76,30 +265,28 @@ async def ensure_browser() -> AsyncCamoufox:
     global browser
 
     # fast-path
-    if browser is not None and await is_browser_alive():
+    if browser is not None and is_browser_alive():
         return browser
 
+    failover_started = time.monotonic()
     async with _browser_lock:
         # кто-то другой мог инициализировать пока мы ждали
-        if browser is not None and await is_browser_alive():
+        if browser is not None and is_browser_alive():
             return browser
 
-        # если есть старый объект — попытка корректного закрытия
-        if browser:
-            try:
-                await browser.__aexit__(None, None, None)
-            except Exception as e:
-                logger.warning("Ошибка при закрытии старого браузера перед реинициализацией: %s", e)
-            finally:
-                browser = None
+        # старый объект закрывается уже после продвижения резерва, чтобы не задерживать запросы
+        dead, browser = browser, None
 
         last_exc = None
         for attempt in range(2):
             try:
-                logger.info("Инициализация Camoufox браузера (attempt %d)...", attempt + 1)
-                browser = await AsyncCamoufox(**config.BROWSER_OPTIONS).__aenter__()
-                logger.info("Camoufox успешно инициализирован")
-                return browser
+                logger.info("Инициализация Camoufox браузера из резерва (attempt %d)...", attempt + 1)
+                browser = await standby.take()
+                metrics.BROWSER_RESTARTS.inc()
+                failover = time.monotonic() - failover_started
+                metrics.BROWSER_FAILOVER.observe(failover)
+                logger.info("Camoufox успешно инициализирован за %.2f с", failover)
+                break
             except Exception as e:
                 logger.exception("Не удалось инициализировать браузер (attempt %d): %s", attempt + 1, e)
                 last_exc = e
@@ -107,8 +294,277 @@ async def ensure_browser() -> AsyncCamoufox:
                 # небольшая пауза перед повторной попыткой
                 await asyncio.sleep(1)
 
+    if dead:
+        await page_pool.drain(dead)
+        await sessions.close_browser(dead)
+        try:
+            await dead.__aexit__(None, None, None)
+        except Exception as e:
+            logger.warning("Ошибка при закрытии старого браузера после реинициализации: %s", e)
+        finally:
+            page_pool.forget(dead)
+
+    if browser is None:
         # если не удалось после всех попыток
         raise HTTPException(503, f"Не удалось инициализировать браузер: {last_exc!s}")
+    return browser
+
+
+async def handle_browser_error(failed: AsyncCamoufox):
+    """
+    Аренда упала с ошибкой «браузер или вкладка закрыты». Заменяется только браузер этой аренды и только если
+    он всё ещё активный и действительно мёртв (по heartbeat); страницы заменяемого браузера и закрытые вкладки
+    живого браузера на активный браузер не влияют.
+    """
+    if failed is browser and not is_browser_alive():
+        logger.warning("⚠️ Активный браузер закрыт, переключаюсь на резервный")
+        await ensure_browser()
+
+
+async def recycle_browser(reason: str):
+    """
+    Плановая замена браузера без простоя: на замену берётся резервный браузер и прогревается,
+    новые аренды сразу идут в него, старый закрывается после завершения его страниц.
+    """
+    global browser
+    logger.info(f"♻️ Замена браузера ({reason})...")
+    replacement = await standby.take()
+    await page_pool.warm(replacement)
+    async with _browser_lock:
+        old, browser = browser, replacement
+    metrics.BROWSER_RESTARTS.inc()
+    logger.info("✅♻️ Новый браузер принимает запросы")
+    if old is None:
+        return
+
+    await page_pool.drain(old)
+    await sessions.close_browser(old)
+    deadline = time.monotonic() + config.BROWSER_RECYCLE_DRAIN_TIMEOUT_SECONDS
+    while page_pool.leased(old) > 0 and time.monotonic() < deadline:
+        await asyncio.sleep(0.5)
+    if page_pool.leased(old) > 0:
+        logger.warning(f"⚠️♻️ Старый браузер закрывается с незавершёнными страницами: {page_pool.leased(old)}")
+    try:
+        await old.__aexit__(None, None, None)
+    except Exception as e:
+        logger.warning(f"⚠️♻️ Ошибка закрытия старого браузера: {e}")
+    finally:
+        page_pool.forget(old)
+    logger.info("♻️ Старый браузер закрыт")
+
+
+async def lease_page(current_browser: AsyncCamoufox, **context_options) -> PageLease:
+    """Берёт страницу из пула, при падении браузера реинициализирует его и повторяет один раз."""
+    try:
+        return await page_pool.acquire(current_browser, **context_options)
+    except Exception as e_newpage:
+        logger.warning("Аренда страницы упала: %s — пробуем реинициализировать браузер и повторить once", e_newpage)
+        try:
+            current_browser = await ensure_browser()
+            return await page_pool.acquire(current_browser, **context_options)
+        except Exception as e2:
+            logger.exception("Повторная аренда страницы тоже упала: %s", e2)
+            raise HTTPException(500, f"Browser.new_page failed: {e2!s}")
+
+
+def request_deadline(req: URLRequest, header_deadline_ms: Optional[int]) -> Optional[float]:
+    """Абсолютный дедлайн (time.monotonic) начала работы из тела запроса или заголовка X-Deadline-Ms."""
+    deadline_ms = req.deadline_ms if req.deadline_ms is not None else header_deadline_ms
+    if deadline_ms is None:
+        return None
+    return time.monotonic() + deadline_ms / 1000
+
+
+def set_caller(req: URLRequest, request: Request):
+    """Заполняет URLRequest.caller из заголовка X-Caller или адреса клиента, если он не задан в теле."""
+    if req.caller is None:
+        req.caller = request.headers.get("X-Caller") or (request.client.host if request.client else "unknown")
+
+
+def fairness_key(req: URLRequest) -> str:
+    """Ключ справедливого разделения вкладок внутри класса приоритета."""
+    if config.FAIR_SHARE_BY == "caller":
+        return req.caller or "unknown"
+    return domain_of(req.url)
+
+
+@asynccontextmanager
+async def render_slot(req: URLRequest, deadline: Optional[float]):
+    """
+    Слоты домена и допуска на время рендера. Слот домена берётся до общего слота:
+    ждущие медленный домен не держат вкладки остальных. Отказ — AdmissionRejectedException.
+    """
+    domain = domain_of(req.url)
+    key = fairness_key(req)
+    with metrics.QUEUE_WAIT.time():
+        await domain_governor.acquire(domain, deadline)
+        try:
+            acquired_at = await admission.acquire(deadline, req.priority, key)
+        except BaseException:
+            domain_governor.release(domain)
+            raise
+    try:
+        yield
+    finally:
+        admission.release(acquired_at, req.priority, key)
+        domain_governor.release(domain)
+
+
+async def cancel_on_disconnect(request: Request, coro):
+    """Выполняет работу, пока клиент на связи; при отключении клиента работа отменяется."""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=1)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.warning("🔌 Клиент отключился, отменяю работу: %s", request.url.path)
+                task.cancel()
+                raise HTTPException(499, "Клиент закрыл соединение")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def admission_error(e: AdmissionRejectedException) -> HTTPException:
+    return HTTPException(e.status_code, str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+async def apply_clearance(lease: PageLease, url: str):
+    """Подставляет сохранённый clearance Cloudflare в контекст аренды до навигации."""
+    try:
+        if lease.user_agent is None:
+            lease.user_agent = await lease.page.evaluate("navigator.userAgent")
+        await clearance_store.apply(lease.context, url, lease.user_agent)
+    except Exception as e:
+        logger.warning("Не удалось применить clearance для %s: %s", url, e)
+
+
+async def navigate(
+        lease: PageLease,
+        req: URLRequest,
+        prepare: Callable[[PageLease], Awaitable[None]],
+) -> PageLease:
+    """
+    Переход на req.url в арендованной странице. При HEDGE_NAVIGATION, если коммит не случился за p95,
+    тот же переход запускается во второй вкладке из пула (prepare готовит её так же, как первую),
+    если для неё есть свободный слот. Побеждает первая успешно загрузившая страница, проигравшая закрывается.
+    Возвращает аренду с загруженной страницей; при неудаче исходная аренда остаётся у вызывающего.
+    """
+    hedge_delay = commit_latency.p95() if config.HEDGE_NAVIGATION and not lease.dedicated else None
+    if hedge_delay is None:
+        if not await safe_goto(lease.page, req.url):
+            raise HTTPException(400, "Не удалось загрузить страницу")
+        return lease
+
+    committed = asyncio.Event()
+    primary = asyncio.create_task(safe_goto(lease.page, req.url, committed))
+    racers = {primary: lease}
+    commit_wait = asyncio.create_task(committed.wait())
+    try:
+        await asyncio.wait({primary, commit_wait}, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        commit_wait.cancel()
+
+    domain = domain_of(req.url)
+    hedge_acquired_at = None
+    domain_acquired = False
+    winner = None
+    try:
+        if not committed.is_set() and not primary.done():
+            hedge_acquired_at = admission.try_acquire(req.priority, fairness_key(req))
+            domain_acquired = hedge_acquired_at is not None and domain_governor.try_acquire(domain)
+            if hedge_acquired_at is not None and not domain_acquired:
+                admission.release(hedge_acquired_at, req.priority, fairness_key(req))
+                hedge_acquired_at = None
+            if domain_acquired:
+                logger.info(f"🏁 Переход на {req.url} не закоммичен за p95 {hedge_delay:.2f} с, "
+                            f"запускаю дублирующий в другой вкладке")
+                metrics.HEDGED_NAVIGATIONS.inc(outcome="started")
+                try:
+                    hedge_lease = await page_pool.acquire(lease.browser)
+                except Exception as e:
+                    logger.warning(f"⚠️🏁 Не удалось взять вкладку для дублирующего перехода: {e}")
+                else:
+                    racers[asyncio.create_task(_prepare_and_goto(hedge_lease, req, prepare))] = hedge_lease
+
+        pending = set(racers)
+        errors = []
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    errors.append(task.exception())
+                elif task.result():
+                    winner = racers[task]
+                    break
+
+        if winner is None:
+            if errors:
+                raise errors[0]
+            raise HTTPException(400, "Не удалось загрузить страницу")
+        if len(racers) > 1:
+            metrics.HEDGED_NAVIGATIONS.inc(outcome="hedge_won" if winner is not lease else "primary_won")
+        return winner
+    finally:
+        for task, racer in racers.items():
+            if racer is winner:
+                continue
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            # исходная аренда при неудаче остаётся у вызывающего, остальные проигравшие закрываются здесь
+            if racer is not lease or winner is not None:
+                await page_pool.release(racer, reusable=False)
+        if hedge_acquired_at is not None:
+            admission.release(hedge_acquired_at, req.priority, fairness_key(req))
+        if domain_acquired:
+            domain_governor.release(domain)
+
+
+async def _prepare_and_goto(
+        lease: PageLease,
+        req: URLRequest,
+        prepare: Callable[[PageLease], Awaitable[None]],
+) -> bool:
+    await prepare(lease)
+    return await safe_goto(lease.page, req.url)
+
+
+async def wait_for_page(page, req: URLRequest) -> dict[str, str]:
+    """Ожидание готовности страницы, возвращает заголовки ответа с фактическим временем ожидания."""
+    if req.wait_for is None:
+        await page.wait_for_timeout(req.wait_time * 1000)
+        return {"X-Wait-Time-Ms": str(req.wait_time * 1000)}
+
+    ready, elapsed = await wait_until_ready(page, req.wait_time, **req.wait_for.model_dump())
+    return {
+        "X-Wait-Time-Ms": str(round(elapsed * 1000)),
+        "X-Ready": str(ready).lower(),
+    }
+
+
+async def page_content(page, req: URLRequest) -> str:
+    """Результат запроса из загруженной страницы: извлечённые значения (JSON), поддерево или весь HTML."""
+    final_url = page.url
+    if req.extract:
+        with metrics.CONTENT.time():
+            values = await extract_values(page, {name: ex.model_dump() for name, ex in req.extract.items()})
+        content = json.dumps(values, ensure_ascii=False)
+        logger.info(f"✅ Извлечено значений: {len(values)} ({len(content)} символов), url: {final_url}")
+    elif req.subtree:
+        with metrics.CONTENT.time():
+            content = await subtree_html(page, req.subtree)
+        if content is None:
+            raise HTTPException(404, f"Элемент не найден: {req.subtree}")
+        logger.info(f"✅ Поддерево получено ({len(content)} символов), url: {final_url}")
+    else:
+        with metrics.CONTENT.time():
+            content = await page.content()
+        page_title = await page.title()
+        logger.info(f"✅ HTML получен ({len(content)} символов, title: {page_title}), url: {final_url}")
+    metrics.RESPONSE_SIZE.observe(utf8_size(content))
+    return content
 
 
 # ---------------- FastAPI lifespan & app ----------------
@@ -116,15 +572,29 @@ async def ensure_browser() -> AsyncCamoufox:
 async def lifespan(app: FastAPI):
     """Инициализация и корректное закрытие Camoufox при старте/остановке приложения."""
     global browser
+    clearance_store.load()
     try:
-        browser = await AsyncCamoufox(**config.BROWSER_OPTIONS).__aenter__()
+        browser = await launch_browser()
         logger.info("Camoufox-браузер инициализирован при старте приложения")
+        await page_pool.warm(browser)
     except Exception as exc:
         logger.error("Не удалось запустить Camoufox при старте: %s", exc)
         browser = None
+    standby.replenish()
+    heartbeat.start()
+    watchdog.start()
+    sessions.start()
+    watchlist.start()
 
     yield
 
+    await watchlist.stop()
+    await jobs.close()
+    await sessions.stop()
+    await watchdog.stop()
+    await heartbeat.stop()
+    await standby.close()
+    await page_pool.drain()
     if browser:
         try:
             await browser.__aexit__(None, None, None)
@@ -151,167 +621,522 @@ async def scalar_html():
 
 
 @app.get("/health")
-async def health() -> dict[str, str]:
-    """Проверка состояния сервиса."""
-    browser_ready = await is_browser_alive()
+async def health() -> dict:
+    """Проверка состояния сервиса по кэшированному результату heartbeat."""
+    browser_ready = is_browser_alive()
     return {
         "status": "ok",
         "service": "camoufox-server",
-        "browser_ready": str(browser_ready)
+        "browser_ready": str(browser_ready),
+        "heartbeat_latency_ms": round(heartbeat.latency * 1000),
+        "heartbeat_age_seconds": round(time.monotonic() - heartbeat.last_ok_at, 1) if heartbeat.last_ok_at else None
     }
 
 
+@app.get("/domains")
+async def domains() -> dict[str, dict]:
+    """Здоровье доменов: лимит одновременных запросов, доли успехов и проверок, задержка, состояние circuit breaker."""
+    return domain_governor.snapshot()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Метрики конвейера загрузки в текстовом формате Prometheus."""
+    return PlainTextResponse(metrics.render_latest(), media_type="text/plain; version=0.0.4")
+
+
 # ---------------- Core endpoints ----------------
 @app.post("/fetch-html")
-async def fetch_html(req: URLRequest):
+async def fetch_html(req: URLRequest, request: Request, x_deadline_ms: Optional[int] = Header(None)):
     """
     Получение HTML-контента страницы.
-    Защита: семафор ограничивает число одновременно открытых страниц.
-    Повторная попытка new_page() при падении браузера.
+    Ответ берётся из response_cache, одинаковые одновременные запросы ждут один рендер.
     """
-    current_browser = await ensure_browser()
+    set_caller(req, request)
+    deadline = request_deadline(req, x_deadline_ms)
+    content, headers = await cancel_on_disconnect(request, fetch_html_cached(req, deadline))
+    media_type = "application/json" if req.extract else "text/html"
+    if req.stream:
+        return text_stream_response(content, media_type, headers, request.headers.get("Accept-Encoding"))
+    return PlainTextResponse(content=content, media_type=media_type, headers=headers)
 
-    page = None
-    acquired = False
-    try:
-        logger.info(f"⏩ HTML-запрос: {req.url}")
 
-        await _pages_semaphore.acquire()
-        acquired = True
+@app.post("/fetch-html/batch")
+async def fetch_html_batch(items: list[URLRequest], request: Request, x_deadline_ms: Optional[int] = Header(None)):
+    """
+    Пакетное получение HTML. Элементы рендерятся параллельно (не больше BATCH_CONCURRENCY разом) с теми же
+    ограничениями, что и /fetch-html, результаты отдаются в NDJSON по мере готовности.
+    Дедлайн элемента отсчитывается с момента, когда до него дошла очередь внутри пакета.
+    """
+    logger.info(f"⏩ Пакетный HTML-запрос: {len(items)} шт.")
+    for item in items:
+        set_caller(item, request)
+
+    # Элементы ждут внутри пакета, а не в общих ограниченных очередях допуска и домена
+    limit = asyncio.Semaphore(config.BATCH_CONCURRENCY)
 
+    async def fetch_item(index: int, req: URLRequest) -> dict:
+        async with limit:
+            return await render_item(index, req)
+
+    async def render_item(index: int, req: URLRequest) -> dict:
+        started = time.monotonic()
         try:
-            page = await current_browser.new_page()
-        except Exception as e_newpage:
-            logger.warning("new_page() упал: %s — пробуем реинициализировать браузер и повторить once", e_newpage)
-            try:
-                current_browser = await ensure_browser()
-                page = await current_browser.new_page()
-            except Exception as e2:
-                logger.exception("Повторный new_page() тоже упал: %s", e2)
-                raise HTTPException(500, f"Browser.new_page failed: {e2!s}")
+            content, headers = await fetch_html_cached(req, request_deadline(req, x_deadline_ms))
+            result = {
+                "index": index,
+                "url": req.url,
+                "status": 200,
+                "elapsed_ms": round((time.monotonic() - started) * 1000),
+                "final_url": headers.get("X-Final-Url"),
+                "cache": headers.get("X-Cache"),
+            }
+            if req.extract:
+                result["data"] = json.loads(content)
+            else:
+                result["html"] = content
+            return result
+        except HTTPException as e:
+            error, status = e.detail, e.status_code
+        except Exception as e:
+            error, status = str(e), 500
+        return {
+            "index": index,
+            "url": req.url,
+            "status": status,
+            "elapsed_ms": round((time.monotonic() - started) * 1000),
+            "error": error,
+        }
 
-        if not await safe_goto(page, req.url):
-            raise HTTPException(400, "Не удалось загрузить страницу")
+    async def stream():
+        tasks = [asyncio.create_task(fetch_item(i, item)) for i, item in enumerate(items)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done, ensure_ascii=False) + "\n"
+        finally:
+            # клиент отключился — не держим вкладки под уже ненужные элементы
+            for task in tasks:
+                task.cancel()
 
-        await page.wait_for_timeout(req.wait_time * 1000)
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
-        html = await page.content()
-        page_title = await page.title()
-        final_url = page.url
 
-        logger.info(f"✅ HTML получен ({len(html)} символов, title: {page_title}), url: {final_url}")
+async def fetch_html_cached(req: URLRequest, deadline: Optional[float] = None) -> tuple[str, dict[str, str]]:
+    """
+    HTML страницы через response_cache: свежий ответ из кэша или общий рендер.
+    Приоритет не входит в ключ: запрос присоединяется к рендеру своего или более высокого класса,
+    а рендер низшего класса (например, обновление списка отслеживания) не ждёт — начинает свой.
+    """
+    max_age = req.max_age if req.max_age is not None else config.RESPONSE_CACHE_DEFAULT_MAX_AGE_SECONDS
+    key = make_cache_key(req.url, req.model_dump(include={"wait_time", "wait_for", "block", "extract", "subtree"}))
+    return await response_cache.get_or_render(
+        key, max_age, req.no_cache, lambda: render_html(req, deadline), config.PRIORITY_WEIGHTS[req.priority])
 
-        return PlainTextResponse(content=html, media_type="text/html")
-    except HTTPException:
-        raise
-    except Exception as exc:
-        logger.exception("Ошибка загрузки %s: %s", req.url, exc)
-        async with _browser_lock:
+
+async def render_html(req: URLRequest, deadline: Optional[float] = None) -> tuple[str, dict[str, str]]:
+    """
+    Рендер HTML-контента страницы.
+    Защита: admission ограничивает число одновременно открытых страниц и длину очереди.
+    Страница арендуется из пула page_pool, повторная попытка при падении браузера.
+    """
+    try:
+        blocker = RouteBlocker.from_rules(**(req.block.model_dump() if req.block else {}))
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+
+    lease = None
+    reusable = True
+    try:
+        logger.info(f"⏩ HTML-запрос: {req.url}")
+
+        async with render_slot(req, deadline):
             try:
-                if browser:
-                    await browser.__aexit__(None, None, None)
-            except Exception:
-                logger.warning("Ошибка закрытия браузера после исключения")
+                # Браузер берётся после допуска: за время ожидания его могла заменить плановая замена
+                current_browser = await ensure_browser()
+
+                with metrics.NEW_PAGE.time():
+                    lease = await lease_page(current_browser)
+                page = lease.page
+                metrics.INFLIGHT_PAGES.inc()
+
+                async def prepare(target: PageLease):
+                    await apply_clearance(target, req.url)
+                    if blocker:
+                        await blocker.attach(target.page)
+
+                await prepare(lease)
+                lease = await navigate(lease, req, prepare)
+                page = lease.page
+
+                with metrics.READINESS_WAIT.time():
+                    wait_headers = await wait_for_page(page, req)
+                if blocker:
+                    wait_headers.update(blocker.headers())
+                    logger.info(f"🚧 Заблокировано запросов: {blocker.blocked}, загружено {blocker.loaded_bytes} байт")
+
+                content = await page_content(page, req)
+                return content, {**wait_headers, "X-Final-Url": page.url}
+            except (AdmissionRejectedException, InvalidPageInputException):
+                raise
+            except HTTPException:
+                reusable = False
+                raise
+            except Exception as exc:
+                reusable = False
+                logger.exception("Ошибка загрузки %s: %s", req.url, exc)
+                # вкладка выводится из оборота; браузер меняется, только если закрыт именно он
+                if lease is not None and classify_navigation_error(exc) == "browser":
+                    await handle_browser_error(lease.browser)
+                raise HTTPException(500, f"Ошибка: {exc!s}")
             finally:
-                try:
-                    globals_browser = globals()
-                    globals_browser["browser"] = None
-                except Exception:
-                    pass
-        raise HTTPException(500, f"Ошибка: {exc!s}")
-    finally:
-        if page:
-            try:
-                await page.close()
-            except Exception as e:
-                logger.warning(f"Ошибка закрытия страницы: {e}")
-        if acquired:
-            _pages_semaphore.release()
+                if lease:
+                    metrics.INFLIGHT_PAGES.dec()
+                    if blocker:
+                        await blocker.detach(lease.page)
+                    await page_pool.release(lease, reusable=reusable)
+    except AdmissionRejectedException as e:
+        raise admission_error(e)
+    except InvalidPageInputException as e:
+        # ошибка в параметрах клиента: страница и браузер исправны
+        raise HTTPException(422, str(e))
 
 
 @app.post("/fetch-screenshot")
-async def fetch_screenshot(req: URLRequest):
+async def fetch_screenshot(req: URLRequest, request: Request, x_deadline_ms: Optional[int] = Header(None)):
+    """Получение скриншота страницы (PNG, JPEG или WebP, см. URLRequest.screenshot)."""
+    set_caller(req, request)
+    deadline = request_deadline(req, x_deadline_ms)
+    return await cancel_on_disconnect(request, render_screenshot(req, deadline))
+
+
+async def render_screenshot(req: URLRequest, deadline: Optional[float] = None) -> Response:
     """
-    Получение скриншота страницы (PNG).
-    Повторная попытка new_page() при падении браузера и семафор.
+    Рендер скриншота страницы по параметрам req.screenshot.
+    Страница арендуется из пула page_pool под контролем допуска, повторная попытка при падении браузера.
     """
-    current_browser = await ensure_browser()
-
-    page = None
-    acquired = False
+    lease = None
+    reusable = True
     try:
         logger.info(f"⏩ Screenshot-запрос: {req.url}")
 
-        await _pages_semaphore.acquire()
-        acquired = True
-
-        try:
-            page = await current_browser.new_page()
-        except Exception as e_newpage:
-            logger.warning("new_page() упал в fetch_screenshot: %s — пробуем реинициализировать и повторить", e_newpage)
+        async with render_slot(req, deadline):
             try:
+                # Браузер берётся после допуска: за время ожидания его могла заменить плановая замена
                 current_browser = await ensure_browser()
-                page = await current_browser.new_page()
-            except Exception as e2:
-                logger.exception("Повторный new_page() в fetch_screenshot тоже упал: %s", e2)
-                raise HTTPException(500, f"Browser.new_page failed: {e2!s}")
 
-        # установим viewport
+                options = req.screenshot or ScreenshotOptions()
+                context_options = {}
+                if options.device_scale_factor:
+                    context_options["device_scale_factor"] = options.device_scale_factor
+
+                with metrics.NEW_PAGE.time():
+                    lease = await lease_page(current_browser, **context_options)
+                page = lease.page
+                metrics.INFLIGHT_PAGES.inc()
+
+                async def prepare(target: PageLease):
+                    # установим viewport
+                    try:
+                        await target.page.set_viewport_size(
+                            {"width": options.viewport_width, "height": options.viewport_height})
+                    except Exception:
+                        # некоторые реализации могут не поддерживать set_viewport_size
+                        pass
+                    await apply_clearance(target, req.url)
+
+                await prepare(lease)
+                lease = await navigate(lease, req, prepare)
+                page = lease.page
+
+                with metrics.READINESS_WAIT.time():
+                    wait_headers = await wait_for_page(page, req)
+
+                with metrics.CONTENT.time():
+                    result = await take_screenshot(page, options.model_dump())
+                if result is None:
+                    raise HTTPException(404, f"Элемент не найден: {options.selector}")
+                screenshot, media_type = result
+                metrics.RESPONSE_SIZE.observe(len(screenshot))
+
+                logger.info(f"✅ Скриншот получен ({len(screenshot)} байт, {media_type})")
+
+                extension = media_type.split("/")[-1]
+                headers = {
+                    "Content-Disposition": f"attachment; filename=screenshot_{abs(hash(req.url))}.{extension}",
+                    **wait_headers
+                }
+                if req.stream:
+                    return bytes_stream_response(screenshot, media_type, headers)
+                return Response(content=screenshot, media_type=media_type, headers=headers)
+            except (AdmissionRejectedException, InvalidPageInputException):
+                raise
+            except HTTPException:
+                reusable = False
+                raise
+            except Exception as exc:
+                reusable = False
+                logger.exception("Ошибка создания скриншота %s: %s", req.url, exc)
+                if lease is not None and classify_navigation_error(exc) == "browser":
+                    await handle_browser_error(lease.browser)
+                raise HTTPException(500, f"Ошибка создания скриншота: {exc!s}")
+            finally:
+                if lease:
+                    metrics.INFLIGHT_PAGES.dec()
+                    await page_pool.release(lease, reusable=reusable)
+    except AdmissionRejectedException as e:
+        raise admission_error(e)
+    except InvalidPageInputException as e:
+        # ошибка в параметрах клиента: страница и браузер исправны
+        raise HTTPException(422, str(e))
+
+
+# ---------------- Jobs ----------------
+@app.post("/jobs", status_code=202)
+async def submit_job(req: JobRequest, request: Request, x_deadline_ms: Optional[int] = Header(None)) -> dict:
+    """
+    Асинхронное задание рендера: id возвращается сразу, результат — через GET /jobs/{id}
+    или по webhook_url. Долгий рендер не зависит от таймаутов клиента.
+    Дедлайн (deadline_ms или X-Deadline-Ms) отсчитывается от приёма задания.
+    """
+    set_caller(req, request)
+    if req.webhook_url:
         try:
-            await page.set_viewport_size({"width": 1920, "height": 1080})
-        except Exception:
-            # некоторые реализации могут не поддерживать set_viewport_size
-            pass
+            check_webhook_url(req.webhook_url)
+        except ValueError as e:
+            raise HTTPException(422, str(e))
+    deadline = request_deadline(req, x_deadline_ms)
+    try:
+        job = jobs.submit(req.kind, req.url, lambda: run_job(req, deadline), req.webhook_url)
+    except AdmissionRejectedException as e:
+        raise admission_error(e)
+    return job.describe()
 
-        if not await safe_goto(page, req.url):
-            raise HTTPException(400, "Не удалось загрузить страницу")
 
-        await page.wait_for_timeout(req.wait_time * 1000)
+async def run_job(req: JobRequest, deadline: Optional[float] = None) -> JobResult:
+    if req.kind == "screenshot":
+        response = await render_screenshot(req.model_copy(update={"stream": False}), deadline)
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in ("content-length", "content-type")}
+        return response.body, response.media_type, headers
+    content, headers = await fetch_html_cached(req, deadline)
+    media_type = "application/json" if req.extract else "text/html"
+    return content.encode("utf-8"), media_type, headers
 
-        screenshot = await page.screenshot(
-            full_page=True,
-            type="png"
-        )
 
-        logger.info(f"✅ Скриншот получен ({len(screenshot)} байт)")
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Статус или результат задания: 202 и описание, пока задание выполняется; 200 и тело результата
+    (как у синхронного эндпоинта), когда готово; код ошибки рендера и описание, если задание не выполнено.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Задание не найдено или его результат уже удалён")
+    if job.status == "done":
+        return Response(content=job.content, media_type=job.media_type, headers={**job.headers, "X-Job-Id": job.id})
+    if job.status == "failed":
+        return JSONResponse(job.describe(), status_code=job.error_status)
+    return JSONResponse(job.describe(), status_code=202, headers={"Retry-After": "1"})
+
+
+@app.delete("/jobs/{job_id}")
+async def delete_job(job_id: str) -> dict:
+    """Отмена задания или удаление его результата из хранилища."""
+    if not jobs.delete(job_id):
+        raise HTTPException(404, "Задание не найдено или его результат уже удалён")
+    return {"status": "success", "message": f"Задание {job_id} удалено"}
+
+
+# ---------------- Sessions ----------------
+@app.post("/sessions", status_code=201)
+async def open_session(req: SessionRequest) -> dict:
+    """
+    Открывает sticky-сессию: вкладка закрепляется за клиентом до DELETE или простоя idle_seconds.
+    Запросы /sessions/{id}/fetch-html к тому же приложению переходят внутри SPA, без перезагрузки страницы.
+    """
+    try:
+        blocker = RouteBlocker.from_rules(**(req.block.model_dump() if req.block else {}))
+    except ValueError as e:
+        raise HTTPException(422, str(e))
 
-        return Response(
-            content=screenshot,
-            media_type="image/png",
-            headers={
-                "Content-Disposition": f"attachment; filename=screenshot_{abs(hash(req.url))}.png"
-            }
-        )
-    except HTTPException:
-        raise
-    except Exception as exc:
-        logger.exception("Ошибка создания скриншота %s: %s", req.url, exc)
-        async with _browser_lock:
+    async def create() -> tuple[PageLease, Optional[RouteBlocker]]:
+        lease = await lease_page(await ensure_browser())
+        if blocker:
             try:
-                if browser:
-                    await browser.__aexit__(None, None, None)
+                await blocker.attach(lease.page)
             except Exception:
-                logger.warning("Ошибка закрытия браузера после исключения в screenshot")
-            finally:
+                await page_pool.release(lease, reusable=False)
+                raise
+        return lease, blocker
+
+    try:
+        session = await sessions.open(create, req.idle_seconds or config.SESSION_IDLE_SECONDS)
+    except AdmissionRejectedException as e:
+        raise admission_error(e)
+    return session.describe()
+
+
+@app.get("/sessions")
+async def list_sessions() -> list[dict]:
+    return sessions.describe()
+
+
+@app.post("/sessions/{session_id}/fetch-html")
+async def session_fetch_html(
+        session_id: str,
+        req: SessionFetchRequest,
+        request: Request,
+        x_deadline_ms: Optional[int] = Header(None),
+):
+    """Как /fetch-html, но во вкладке сессии и без кэша ответов."""
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(404, "Сессия не найдена или закрыта по простою")
+    set_caller(req, request)
+    deadline = request_deadline(req, x_deadline_ms)
+    content, headers = await cancel_on_disconnect(request, render_in_session(session, req, deadline))
+    media_type = "application/json" if req.extract else "text/html"
+    if req.stream:
+        return text_stream_response(content, media_type, headers, request.headers.get("Accept-Encoding"))
+    return PlainTextResponse(content=content, media_type=media_type, headers=headers)
+
+
+async def render_in_session(
+        session: PageSession,
+        req: SessionFetchRequest,
+        deadline: Optional[float] = None,
+) -> tuple[str, dict[str, str]]:
+    """
+    Рендер во вкладке сессии. На том же origin сначала переход внутри приложения,
+    если приложение не перерисовалось — полный переход. Слоты домена и допуска берутся на время запроса.
+    """
+    async with session.lock:
+        if session.closed:
+            raise HTTPException(404, "Сессия не найдена или закрыта по простою")
+        session.touch()
+        page = session.lease.page
+        try:
+            logger.info(f"⏩📌 HTML-запрос в сессии {session.id}: {req.url}")
+            async with render_slot(req, deadline):
+                metrics.INFLIGHT_PAGES.inc()
                 try:
-                    globals()["browser"] = None
-                except Exception:
-                    pass
-        raise HTTPException(500, f"Ошибка создания скриншота: {exc!s}")
-    finally:
-        if page:
-            try:
-                await page.close()
-            except Exception as e:
-                logger.warning(f"Ошибка закрытия страницы: {e}")
-        if acquired:
-            _pages_semaphore.release()
+                    navigation = None
+                    # без селектора готовности нечем отличить разметку нового URL от старой — только полный переход
+                    selector = req.wait_for.selector if req.wait_for else None
+                    if req.navigation == "auto" and selector and same_origin(page.url, req.url):
+                        with metrics.GOTO.time():
+                            navigation = await soft_navigate(
+                                page, req.url, selector, config.SESSION_SPA_TIMEOUT_SECONDS)
+                    if navigation is None:
+                        await apply_clearance(session.lease, req.url)
+                        if not await safe_goto(page, req.url):
+                            raise HTTPException(400, "Не удалось загрузить страницу")
+                        navigation = "goto"
+                        session.full_navigations += 1
+                    else:
+                        session.soft_navigations += 1
+                    metrics.SESSION_NAVIGATIONS.inc(mode=navigation)
+                    session.requests += 1
+
+                    with metrics.READINESS_WAIT.time():
+                        wait_headers = await wait_for_page(page, req)
+                    content = await page_content(page, req)
+                finally:
+                    metrics.INFLIGHT_PAGES.dec()
+
+            return content, {
+                **wait_headers,
+                "X-Final-Url": page.url,
+                "X-Session-Id": session.id,
+                "X-Navigation": navigation,
+            }
+        except AdmissionRejectedException as e:
+            raise admission_error(e)
+        except InvalidPageInputException as e:
+            raise HTTPException(422, str(e))
+        except HTTPException:
+            raise
+        except Exception as exc:
+            # вкладка в неизвестном состоянии (например, браузер упал) — сессия закрывается
+            logger.exception("Ошибка загрузки %s в сессии %s: %s", req.url, session.id, exc)
+            await sessions.discard(session, reusable=False)
+            if classify_navigation_error(exc) == "browser":
+                await handle_browser_error(session.lease.browser)
+            raise HTTPException(500, f"Ошибка: {exc!s}")
+        finally:
+            session.touch()
+
+
+@app.delete("/sessions/{session_id}")
+async def close_session(session_id: str) -> dict:
+    """Закрывает сессию (после её текущего запроса), вкладка возвращается в пул."""
+    if not await sessions.close(session_id):
+        raise HTTPException(404, "Сессия не найдена или закрыта по простою")
+    return {"status": "success", "message": f"Сессия {session_id} закрыта"}
+
+
+# ---------------- Watchlist ----------------
+@app.post("/watchlist", status_code=201)
+async def watch(req: WatchRequest) -> dict:
+    """
+    Добавляет URL в список отслеживания: рендерер сам обновляет его раз в interval_seconds (± jitter)
+    в свободных вкладках с приоритетом background. Повторное добавление с теми же параметрами рендера меняет интервал.
+    """
+    options = req.model_dump(include={"wait_time", "wait_for", "block", "extract", "subtree"})
+    entry_id = f"{config.SHARD_INDEX}-{make_cache_key(req.url, options)[:32]}"
+    # обновление идёт через response_cache: /fetch-html с тем же запросом получает его результат из кэша
+    refresh = URLRequest(**req.model_dump(include=set(URLRequest.model_fields)))
+    refresh.priority, refresh.caller, refresh.no_cache, refresh.stream = "background", "watchlist", True, False
+    refresh.deadline_ms = None
+    try:
+        entry = watchlist.add(entry_id, refresh, req.interval_seconds, req.jitter)
+    except AdmissionRejectedException as e:
+        raise admission_error(e)
+    return entry.describe()
+
+
+@app.get("/watchlist")
+async def list_watchlist() -> list[dict]:
+    return watchlist.describe()
+
+
+@app.get("/watchlist/{entry_id}")
+async def get_watched(entry_id: str):
+    """
+    Последний результат отслеживаемого URL без рендера: 200 и тело с заголовками возраста (Age, X-Fetched-At, X-Stale);
+    202, пока первого результата нет; код ошибки и описание, если первое обновление не удалось.
+    """
+    entry = watchlist.get(entry_id)
+    if entry is None:
+        raise HTTPException(404, "URL не отслеживается")
+    if entry.content is None:
+        if entry.error_status is not None:
+            return JSONResponse(entry.describe(), status_code=entry.error_status)
+        return JSONResponse(entry.describe(), status_code=202, headers={"Retry-After": "1"})
+
+    headers = {
+        **entry.headers,
+        "X-Watch-Id": entry.id,
+        "X-Fetched-At": str(round(entry.fetched_at)),
+        "Age": str(int(entry.age())),
+        "X-Stale": str(entry.is_stale()).lower(),
+        "X-Refresh-Failures": str(entry.failures),
+    }
+    headers.pop("X-Cache", None)
+    media_type = "application/json" if entry.request.extract else "text/html"
+    return PlainTextResponse(content=entry.content, media_type=media_type, headers=headers)
+
+
+@app.delete("/watchlist/{entry_id}")
+async def unwatch(entry_id: str) -> dict:
+    if not watchlist.remove(entry_id):
+        raise HTTPException(404, "URL не отслеживается")
+    return {"status": "success", "message": f"{entry_id} удалён из списка отслеживания"}
 
 
 @app.get("/browser-info")
 async def browser_info():
     """Получение информации о браузере."""
-    if not await is_browser_alive():
+    if not is_browser_alive():
         return {"browser_ready": False, "error": "Браузер не инициализирован или недоступен"}
 
     try:
@@ -336,7 +1161,12 @@ async def browser_info():
             "browser_ready": True,
             "version": version,
             "user_agent": user_agent,
-            "contexts_count": contexts_count
+            "contexts_count": contexts_count,
+            "page_pool": page_pool.stats(),
+            "clearance": clearance_store.stats(),
+            "response_cache": response_cache.stats(),
+            "watchdog": watchdog.stats(),
+            "standby": standby.stats()
         }
     except Exception as e:
         return {"browser_ready": False, "error": str(e)}
@@ -344,27 +1174,55 @@ async def browser_info():
 
 @app.post("/restart-browser")
 async def restart_browser():
-    """Принудительный перезапуск браузера."""
+    """Принудительный перезапуск браузера: активным становится резервный, старый закрывается."""
     global browser
-    async with _browser_lock:
-        try:
-            if browser:
-                try:
-                    await browser.__aexit__(None, None, None)
-                except Exception as e:
-                    logger.warning(f"Ошибка при закрытии старого браузера: {e}")
-                finally:
-                    browser = None
+    started = time.monotonic()
+    old = None
+    try:
+        async with _browser_lock:
+            await page_pool.drain(browser)
+            old, browser = browser, None
+            browser = await standby.take()
+            metrics.BROWSER_RESTARTS.inc()
+            metrics.BROWSER_FAILOVER.observe(time.monotonic() - started)
+    except Exception as e:
+        logger.exception("Ошибка перезапуска браузера: %s", e)
+        browser = None
+        raise HTTPException(500, f"Ошибка перезапуска браузера: {str(e)}")
+    finally:
+        if old:
+            await sessions.close_browser(old)
+            try:
+                await old.__aexit__(None, None, None)
+            except Exception as e:
+                logger.warning(f"Ошибка при закрытии старого браузера: {e}")
+            finally:
+                page_pool.forget(old)
 
-            browser = await AsyncCamoufox(**config.BROWSER_OPTIONS).__aenter__()
-            logger.info("Браузер перезапущен успешно")
-            return {"status": "success", "message": "Браузер перезапущен"}
-        except Exception as e:
-            logger.exception("Ошибка перезапуска браузера: %s", e)
-            browser = None
-            raise HTTPException(500, f"Ошибка перезапуска браузера: {str(e)}")
+    await page_pool.warm(browser)
+    logger.info("Браузер перезапущен успешно")
+    return {"status": "success", "message": "Браузер перезапущен"}
+
+
+@app.post("/wipe-profile")
+async def wipe_profile():
+    """Очистка постоянного профиля (например, при его повреждении) с заменой браузеров на чистые."""
+    if warm_profiles is None:
+        raise HTTPException(400, "Постоянный профиль выключен (config.WARM_PROFILE_DIR)")
+    warm_profiles.wipe()
+    await standby.discard()
+    try:
+        await recycle_browser("wipe_profile")
+    except Exception as e:
+        logger.exception("Ошибка замены браузера после очистки профиля: %s", e)
+        raise HTTPException(500, f"Ошибка замены браузера: {e!s}")
+    return {"status": "success", "message": "Профиль очищен, браузер заменён"}
 
 
 # ---------------- Run ----------------
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8080, log_level="info")
+    if config.SHARDS > 1:
+        from supervisor import run_supervisor
+        run_supervisor()
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8080, log_level="info")
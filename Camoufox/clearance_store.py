@@ -0,0 +1,156 @@
+import fcntl
+import json
+import logging
+import os
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+from playwright.async_api import BrowserContext, Page
+
+import config
+from configure_logger import configure
+
+logger = logging.getLogger(__name__)
+configure(logger)
+
+
+def _is_clearance_cookie(cookie: dict) -> bool:
+    name = cookie.get("name", "")
+    return name == "cf_clearance" or name.startswith("__cf") or name.startswith("cf_")
+
+
+class ClearanceStore:
+    """
+    Хранилище состояния прохождения Cloudflare по доменам: cookies cf_clearance
+    и user agent, к которому они привязаны. Записи истекают по TTL и сохраняются на диск,
+    чтобы переживать /restart-browser и перезапуск контейнера.
+    Файл общий для шардов: запись идёт под блокировкой файла и сливается с записями других шардов.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: dict[str, dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self.ua_mismatches = 0
+        self.expired = 0
+        self.stored = 0
+
+    def load(self):
+        """Загружает сохранённые записи с диска, пропуская истёкшие."""
+        entries = self._read()
+        if entries is None:
+            return
+
+        now = time.time()
+        self._entries = {domain: entry for domain, entry in entries.items() if entry["expires_at"] > now}
+        logger.info(f"🍪 Загружено записей clearance: {len(self._entries)}")
+
+    async def save_from_page(self, page: Page):
+        """Сохраняет cookies Cloudflare после успешного прохождения проверки на странице."""
+        cookies = [c for c in await page.context.cookies(page.url) if _is_clearance_cookie(c)]
+        if not cookies:
+            return
+
+        user_agent = await page.evaluate("navigator.userAgent")
+        expires_at = time.time() + config.CLEARANCE_TTL_MINUTES * 60
+        for cookie in cookies:
+            if cookie.get("expires", -1) > 0:
+                expires_at = min(expires_at, cookie["expires"])
+
+        domain = self._domain_for(cookies, page.url)
+        self._entries[domain] = {
+            "cookies": cookies,
+            "user_agent": user_agent,
+            "expires_at": expires_at,
+        }
+        self.stored += 1
+        self._persist()
+        logger.info(f"🍪 Сохранён clearance для {domain} ({len(cookies)} cookies)")
+
+    async def apply(self, context: BrowserContext, url: str, user_agent: Optional[str]) -> bool:
+        """Добавляет сохранённые cookies в контекст перед навигацией. Возвращает True при попадании."""
+        domain, entry = self._lookup(url)
+        if entry is None:
+            self.misses += 1
+            return False
+
+        if entry["expires_at"] <= time.time():
+            self.expired += 1
+            del self._entries[domain]
+            self._persist()
+            return False
+
+        if user_agent is not None and entry["user_agent"] != user_agent:
+            self.ua_mismatches += 1
+            return False
+
+        await context.add_cookies(entry["cookies"])
+        self.hits += 1
+        return True
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "domains": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "ua_mismatches": self.ua_mismatches,
+            "expired": self.expired,
+            "stored": self.stored,
+        }
+
+    def _lookup(self, url: str) -> tuple[Optional[str], Optional[dict]]:
+        host = urlsplit(url).hostname or ""
+        for domain, entry in self._entries.items():
+            if host == domain or host.endswith("." + domain):
+                return domain, entry
+        return None, None
+
+    @staticmethod
+    def _domain_for(cookies: list[dict], url: str) -> str:
+        for cookie in cookies:
+            if cookie["name"] == "cf_clearance" and cookie.get("domain"):
+                return cookie["domain"].lstrip(".")
+        return urlsplit(url).hostname or ""
+
+    def _read(self) -> Optional[dict[str, dict]]:
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except Exception as e:
+            logger.warning(f"⚠️🍪 Не удалось прочитать хранилище clearance {self.path}: {e}")
+            return None
+
+    def _persist(self):
+        """
+        Сохраняет записи, слив их с файлом: другие шарды могли записать свои домены.
+        Для каждого домена остаётся запись с более поздним сроком, истёкшие отбрасываются.
+        """
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path + ".lock", "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                now = time.time()
+                merged = {
+                    domain: entry for domain, entry in (self._read() or {}).items()
+                    if entry["expires_at"] > now
+                }
+                for domain, entry in self._entries.items():
+                    if entry["expires_at"] <= now:
+                        continue
+                    if domain not in merged or merged[domain]["expires_at"] < entry["expires_at"]:
+                        merged[domain] = entry
+                self._entries = merged
+                # временный файл уникален для процесса: шарды не пишут в один и тот же .tmp
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as file:
+                    json.dump(merged, file)
+                os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"⚠️🍪 Не удалось сохранить хранилище clearance {self.path}: {e}")
+
+
+clearance_store = ClearanceStore(config.CLEARANCE_STORE_PATH)
@@ -1,10 +1,15 @@
 import asyncio
 import logging
 import random
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Callable, Optional
 
-from playwright.async_api import Page
+from playwright.async_api import Frame, Page, TimeoutError as PlaywrightTimeoutError
 
 import config
+import metrics
 from configure_logger import configure
 from exceptions import CloudflareRestartException
 
@@ -12,180 +17,254 @@ logger = logging.getLogger(__name__)
 configure(logger)
 
 
-async def bypass_cloudflare(page: Page):
+_CHALLENGE_FRAME_PREFIX = "https://challenges.cloudflare.com"
+
+# Готовность чекбокса внутри iframe проверки: координаты центра чекбокса (относительно iframe),
+# {x: null} — чекбокс в закрытом shadow root, но виджет уже отрисован; null — ещё не готов.
+_CHECKBOX_SCRIPT = '''
+    () => {
+        const checkbox = document.querySelector('input[type=checkbox]');
+        if (checkbox) {
+            const rect = checkbox.getBoundingClientRect();
+            return rect.width > 0 ? { x: rect.x + rect.width / 2, y: rect.y + rect.height / 2 } : null;
+        }
+        const host = document.body && document.body.firstElementChild;
+        if (document.readyState === 'complete' && host && host.getBoundingClientRect().height > 0) {
+            return { x: null, y: null };
+        }
+        return null;
+    }
+'''
+
+_ACCESS_DENIED_SCRIPT = "() => /access denied|доступ запрещен/i.test(document.body ? document.body.innerText : '')"
+
+
+class _ChallengeEvents:
     """
-    Улучшенная функция обхода Cloudflare с таймаутами и восстановлением
+    События страницы, по которым продвигается обход: подключение и переходы фреймов, загрузка.
+    Запоминает найденный iframe проверки; changed взводится при каждом событии.
     """
-    try:
-        # Проверяем загрузку страницы с таймаутом
+
+    def __init__(self, page: Page):
+        self.page = page
+        self.changed = asyncio.Event()
+        self.frame: Optional[Frame] = None
+        self._handlers = [
+            ("frameattached", self._on_frame),
+            ("framenavigated", self._on_frame),
+            ("load", self._on_load),
+        ]
+
+    def __enter__(self) -> "_ChallengeEvents":
+        for event, handler in self._handlers:
+            self.page.on(event, handler)
+        for frame in self.page.frames:
+            self._match(frame)
+        return self
+
+    def __exit__(self, *args):
+        for event, handler in self._handlers:
+            self.page.remove_listener(event, handler)
+
+    def challenge_frame(self) -> Optional[Frame]:
+        if self.frame is not None and self.frame.is_detached():
+            self.frame = None
+        return self.frame
+
+    async def wait(self, timeout: float):
+        """Ждёт следующего события не дольше timeout и не дольше CLOUDFLARE_EVENT_FALLBACK_SECONDS."""
         try:
-            await asyncio.wait_for(
-                page.wait_for_load_state(config.WAIT_UNTIL),
-                timeout=config.CLOUDFLARE_TIMEOUTS
-            )
+            await asyncio.wait_for(self.changed.wait(), timeout=min(timeout, config.CLOUDFLARE_EVENT_FALLBACK_SECONDS))
         except asyncio.TimeoutError:
-            logger.warning("⏳ Таймаут ожидания загрузки страницы")
-            # Продолжаем, возможно страница частично загружена
+            pass
 
-        # Проверяем наличие Cloudflare
-        if not await check_cloudflare(page):
-            logger.info("✅ Cloudflare не обнаружен")
-            return True
+    def _match(self, frame: Frame):
+        if frame.url.startswith(_CHALLENGE_FRAME_PREFIX):
+            if self.frame is None:
+                logger.info(f"✅🔍 Найден iframe Cloudflare: {frame.url}")
+            self.frame = frame
 
-        logger.warning("🛡️ Обнаружена защита Cloudflare. Запускаю процедуру обхода...")
+    def _on_frame(self, frame: Frame):
+        if frame != self.page.main_frame:
+            self._match(frame)
+        self.changed.set()
 
-        # Имитируем движение мыши при обнаружении Cloudflare
-        # await simulate_human_mouse_movement(page)
+    def _on_load(self, _page):
+        self.changed.set()
 
-        for attempt in range(config.CLOUDFLARE_ATTEMPTS):
-            logger.info(f"🛡️ Попытка обхода {attempt + 1}/{config.CLOUDFLARE_ATTEMPTS}...")
 
-            try:
-                # Поиск iframe с таймаутом
-                challenge_frame = None
-                logger.info("🔍 Поиск iframe Cloudflare...")
-
-                for search_attempt in range(config.CLOUDFLARE_FIND_SECONDS):
-                    try:
-                        # Обновляем список фреймов
-                        await asyncio.sleep(1)  # Небольшая пауза для обновления DOM
+@contextmanager
+def _phase(timings: dict[str, float], name: str):
+    """Замер фазы обхода: в лог (сумма по попыткам) и в метрику CLOUDFLARE_PHASE."""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        elapsed = time.monotonic() - started
+        timings[name] = timings.get(name, 0.0) + elapsed
+        metrics.CLOUDFLARE_PHASE.observe(elapsed, phase=name)
 
-                        if not await check_cloudflare(page):
-                            return True
 
-                        for frame in page.frames:
-                            if frame.url and frame.url.startswith("https://challenges.cloudflare.com"):
-                                challenge_frame = frame
-                                logger.info(f"✅🔍 Найден iframe Cloudflare: {frame.url}")
-                                break
-
-                        if challenge_frame:
-                            break
-
-                        # Также проверяем iframe по селектору
-                        iframe_element = await page.query_selector('iframe[src*="cloudflare"]')
-                        if iframe_element:
-                            logger.info("✅🔍 Найден iframe Cloudflare по селектору")
-                            break
-
-                        if search_attempt % 5 == 0:
-                            logger.info(f"⏳🔍 Поиск iframe... ({search_attempt + 1}/{config.CLOUDFLARE_FIND_SECONDS})")
-
-                        await asyncio.sleep(1)
-
-                    except Exception as e:
-                        logger.warning(f"⚠️🔍 Ошибка при поиске iframe (попытка {search_attempt + 1}): {e}")
-                        await asyncio.sleep(1)
-
-                if not challenge_frame:
-                    logger.error(f"❌🔍 Не удалось найти iframe Cloudflare за {config.CLOUDFLARE_FIND_SECONDS} секунд")
-
-                    # Попытка альтернативного метода - поиск по селектору
-                    try:
-                        iframe_element = await asyncio.wait_for(
-                            page.query_selector('iframe[src*="cloudflare"]'),
-                            timeout=config.CLOUDFLARE_TIMEOUTS
-                        )
-                        if iframe_element:
-                            logger.info("💡 Используем альтернативный метод с iframe элементом")
-                            await _handle_iframe_element(page, iframe_element)
-                            if await _wait_for_cloudflare_completion(page):
-                                return True
-                    except Exception as e:
-                        logger.error(f"❌💡 Альтернативный метод не удался: {e}")
-
-                    continue
-
-                # Получаем координаты iframe
-                logger.info("🗺️ Iframe Cloudflare найден. Получаю его координаты")
+async def bypass_cloudflare(page: Page):
+    """
+    Обход Cloudflare как конечный автомат по событиям страницы:
+    load → detect → frame (iframe проверки подключён) → checkbox (чекбокс отрисован) → click → verify (проверка ушла).
+    Каждая фаза завершается по событию или готовности элемента, а не по фиксированной паузе.
+    """
+    timings: dict[str, float] = {}
+    with _ChallengeEvents(page) as events:
+        try:
+            with _phase(timings, "load"):
                 try:
-                    frame_element = await asyncio.wait_for(
-                        challenge_frame.frame_element(),
-                        timeout=config.CLOUDFLARE_TIMEOUTS
-                    )
-
-                    if not frame_element:
-                        logger.error("❌ Не удалось получить элемент iframe")
-                        continue
-
-                    await asyncio.sleep(7)
-
-                    bounding_box = await asyncio.wait_for(
-                        frame_element.bounding_box(),
-                        timeout=config.CLOUDFLARE_TIMEOUTS
-                    )
-
-                    if not bounding_box:
-                        logger.error("❌ Не удалось получить размеры iframe")
-                        await asyncio.sleep(5)
-                        continue
-
-                except asyncio.TimeoutError:
-                    logger.error("⏳❌ Таймаут при получении координат iframe")
-                    continue
-                except Exception as e:
-                    logger.error(f"❌ Ошибка при получении координат iframe: {e}")
-                    continue
+                    await page.wait_for_load_state(config.WAIT_UNTIL, timeout=config.CLOUDFLARE_TIMEOUTS)
+                except PlaywrightTimeoutError:
+                    logger.warning("⏳ Таймаут ожидания загрузки страницы")
+                    # Продолжаем, возможно страница частично загружена
 
-                # Небольшое движение мыши перед кликом
-                checkbox_x = bounding_box["x"] + 25
-                checkbox_y = bounding_box["y"] + bounding_box["height"] / 2
+            with _phase(timings, "detect"):
+                challenged = await check_cloudflare(page)
+            if not challenged:
+                logger.info("✅ Cloudflare не обнаружен")
+                return True
 
-                # Подводим мышь к чекбоксу с небольшим отклонением
-                pre_click_x = checkbox_x + random.randint(-10, 10)
-                pre_click_y = checkbox_y + random.randint(-10, 10)
-                await page.mouse.move(pre_click_x, pre_click_y)
-                await asyncio.sleep(random.uniform(0.2, 0.5))
+            logger.warning("🛡️ Обнаружена защита Cloudflare. Запускаю процедуру обхода...")
 
-                # Кликаем по чекбоксу
+            for attempt in range(config.CLOUDFLARE_ATTEMPTS):
+                logger.info(f"🛡️ Попытка обхода {attempt + 1}/{config.CLOUDFLARE_ATTEMPTS}...")
                 try:
-                    logger.info(f"🖱️🎯 Клик по координатам: ({checkbox_x}, {checkbox_y})")
-                    await asyncio.wait_for(
-                        page.mouse.click(x=checkbox_x, y=checkbox_y),
-                        timeout=config.CLOUDFLARE_TIMEOUTS
-                    )
-
-                except asyncio.TimeoutError:
-                    logger.error("⏳❌ Таймаут при клике по чекбоксу")
-                    continue
-                except Exception as e:
-                    logger.error(f"❌🖱️ Ошибка при клике по чекбоксу: {e}")
-                    continue
-
-                # Ждем завершения проверки
-                logger.info("⏳🛡️ Ожидание завершения проверки Cloudflare...")
-                if await _wait_for_cloudflare_completion(page):
-                    logger.info("✅🛡️ Cloudflare успешно пройден!")
-                    return True
-                else:
+                    if await _bypass_attempt(page, events, timings):
+                        logger.info("✅🛡️ Cloudflare успешно пройден!")
+                        return True
                     logger.warning(
                         f"⚠️🛡️ Проверка Cloudflare не пройдена (попытка {attempt + 1}/{config.CLOUDFLARE_ATTEMPTS})")
+                except Exception as e:
+                    logger.error(f"❌ Ошибка во время попытки обхода №{attempt + 1}: {type(e).__name__}: {e}")
+
+                # Пауза перед следующей попыткой; прохождение проверки за это время завершает обход сразу
+                if attempt < config.CLOUDFLARE_ATTEMPTS - 1:
+                    wait_time = 3 + attempt
+                    logger.info(f"⏳ Пауза до {wait_time} секунд перед следующей попыткой...")
+                    with _phase(timings, "retry_wait"):
+                        if await _wait_for_cloudflare_completion(page, events, wait_time, report_timeout=False):
+                            logger.info("🤔✅ Похоже, защита была пройдена во время паузы. Продолжаем")
+                            return True
 
-            except Exception as e:
-                logger.error(f"❌ Ошибка во время попытки обхода №{attempt + 1}: {type(e).__name__}: {e}")
+            logger.critical(f"🔥🛡️ Не удалось обойти защиту Cloudflare после {config.CLOUDFLARE_ATTEMPTS} попыток")
+            raise CloudflareRestartException("Сбой обхода Cloudflare для перезапуска")
+
+        except CloudflareRestartException:
+            raise
+        except Exception as e:
+            logger.error(f"💥 Критическая ошибка в функции bypass_cloudflare: {type(e).__name__}: {e}")
+            raise CloudflareRestartException(f"Непредвиденная ошибка в bypass_cloudflare: {e}")
+        finally:
+            if len(timings) > 2:
+                logger.info("⏱️🛡️ Фазы обхода Cloudflare: "
+                            + ", ".join(f"{name} {seconds:.2f} с" for name, seconds in timings.items()))
+
+
+async def _bypass_attempt(page: Page, events: _ChallengeEvents, timings: dict[str, float]) -> bool:
+    """Одна попытка: дождаться iframe и чекбокса, кликнуть, дождаться ухода со страницы проверки."""
+    logger.info("🔍 Поиск iframe Cloudflare...")
+    with _phase(timings, "frame"):
+        frame = await _wait_for_challenge_frame(page, events, config.CLOUDFLARE_FIND_SECONDS)
+        if frame is None and not await _challenge_present(page):
+            return True
 
-            # Проверяем, не прошли ли мы защиту случайно
-            try:
-                if not await check_cloudflare(page):
-                    logger.info("🤔✅ Похоже, защита была пройдена во время обработки ошибки. Продолжаем")
-                    return True
-            except Exception as e:
-                logger.warning(f"⚠️ Ошибка при финальной проверке: {e}")
-
-            # Пауза перед следующей попыткой
-            if attempt < config.CLOUDFLARE_ATTEMPTS - 1:
-                wait_time = 3 + attempt  # Увеличиваем время ожидания
-                logger.info(f"⏳ Пауза {wait_time} секунд перед следующей попыткой...")
-                await asyncio.sleep(wait_time)
-
-        logger.critical(f"🔥🛡️ Не удалось обойти защиту Cloudflare после {config.CLOUDFLARE_ATTEMPTS} попыток")
-        raise CloudflareRestartException("Сбой обхода Cloudflare для перезапуска")
-
-    except CloudflareRestartException:
-        raise
-    except Exception as e:
-        logger.error(f"💥 Критическая ошибка в функции bypass_cloudflare: {type(e).__name__}: {e}")
-        raise CloudflareRestartException(f"Непредвиденная ошибка в bypass_cloudflare: {e}")
+    if frame is None:
+        logger.error(f"❌🔍 Не удалось найти iframe Cloudflare за {config.CLOUDFLARE_FIND_SECONDS} секунд")
+
+        # Попытка альтернативного метода - поиск по селектору
+        try:
+            iframe_element = await page.query_selector('iframe[src*="cloudflare"]')
+            if iframe_element:
+                logger.info("💡 Используем альтернативный метод с iframe элементом")
+                with _phase(timings, "click"):
+                    await _handle_iframe_element(page, iframe_element)
+                with _phase(timings, "verify"):
+                    return await _wait_for_cloudflare_completion(page, events)
+        except Exception as e:
+            logger.error(f"❌💡 Альтернативный метод не удался: {e}")
+        return False
+
+    logger.info("🗺️ Iframe Cloudflare найден. Жду готовности чекбокса")
+    with _phase(timings, "checkbox"):
+        try:
+            point = await _wait_for_checkbox(frame)
+        except Exception as e:
+            # iframe мог исчезнуть из-за того, что проверка пройдена без клика
+            if not await _challenge_present(page):
+                return True
+            logger.error(f"❌ Чекбокс Cloudflare не стал доступен: {e}")
+            return False
+    if point is None:
+        logger.error("❌ Не удалось получить размеры iframe")
+        return False
+
+    checkbox_x, checkbox_y = point
+    with _phase(timings, "click"):
+        # Подводим мышь к чекбоксу с небольшим отклонением
+        await page.mouse.move(checkbox_x + random.randint(-10, 10), checkbox_y + random.randint(-10, 10))
+        await asyncio.sleep(random.uniform(0.2, 0.5))
+
+        logger.info(f"🖱️🎯 Клик по координатам: ({checkbox_x}, {checkbox_y})")
+        await asyncio.wait_for(
+            page.mouse.click(x=checkbox_x, y=checkbox_y),
+            timeout=config.CLOUDFLARE_TIMEOUTS / 1000
+        )
+
+    # Ждем завершения проверки
+    logger.info("⏳🛡️ Ожидание завершения проверки Cloudflare...")
+    with _phase(timings, "verify"):
+        return await _wait_for_cloudflare_completion(page, events)
+
+
+async def _wait_for_challenge_frame(page: Page, events: _ChallengeEvents, timeout: float) -> Optional[Frame]:
+    """Ждёт подключения iframe проверки; None — не появился за timeout или проверка уже пройдена."""
+    deadline = time.monotonic() + timeout
+    while True:
+        events.changed.clear()
+        frame = events.challenge_frame()
+        if frame is not None:
+            return frame
+        if not await _challenge_present(page):
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        await events.wait(remaining)
+
+
+async def _wait_for_checkbox(frame: Frame) -> Optional[tuple[float, float]]:
+    """
+    Ждёт, пока iframe станет видимым и неподвижным, а чекбокс внутри отрисуется (проверка по requestAnimationFrame).
+    Возвращает координаты клика на странице; если чекбокс недоступен из-за закрытого shadow root — точку у левого края iframe.
+    """
+    timeout_ms = config.CLOUDFLARE_CHECKBOX_SECONDS * 1000
+    element = await frame.frame_element()
+    await element.wait_for_element_state("visible", timeout=timeout_ms)
+    await element.wait_for_element_state("stable", timeout=timeout_ms)
+    try:
+        handle = await frame.wait_for_function(_CHECKBOX_SCRIPT, timeout=timeout_ms)
+        checkbox = await handle.json_value()
+    except PlaywrightTimeoutError:
+        logger.warning("⚠️🖱️ Готовность чекбокса не определена, кликаю по координатам iframe")
+        checkbox = {"x": None, "y": None}
+
+    bounding_box = await element.bounding_box()
+    if not bounding_box:
+        return None
+    if checkbox["x"] is None:
+        return bounding_box["x"] + 25, bounding_box["y"] + bounding_box["height"] / 2
+    return bounding_box["x"] + checkbox["x"], bounding_box["y"] + checkbox["y"]
+
+
+async def _challenge_present(page: Page) -> bool:
+    try:
+        return (await probe_cloudflare(page))["challenge"]
+    except Exception:
+        # контекст страницы пересоздаётся при переходе — решит следующее событие
+        return True
 
 
 async def _handle_iframe_element(page: Page, iframe_element):
@@ -213,56 +292,137 @@ async def _handle_iframe_element(page: Page, iframe_element):
         raise
 
 
-async def _wait_for_cloudflare_completion(page: Page, max_wait_seconds=35):
+async def _wait_for_cloudflare_completion(
+        page: Page,
+        events: _ChallengeEvents,
+        max_wait_seconds: float = 35,
+        report_timeout: bool = True,
+) -> bool:
     """
-    Ожидание завершения проверки Cloudflare с промежуточными проверками
+    Ожидание ухода со страницы проверки: перепроверка по каждому переходу и загрузке страницы,
+    в режиме CLOUDFLARE_WATCH_MODE — также по событию наблюдателя за DOM.
     """
+    started = time.monotonic()
+    deadline = started + max_wait_seconds
+    watcher = None
+    if config.CLOUDFLARE_WATCH_MODE:
+        try:
+            watcher = await watch_cloudflare(page)
+            watcher.listeners.append(events.changed.set)
+        except Exception as e:
+            logger.warning(f"⚠️🛡️ Не удалось установить наблюдатель Cloudflare: {e}")
+
     try:
-        # Небольшая начальная пауза
-        await asyncio.sleep(2)
+        while True:
+            events.changed.clear()
+            if not await _challenge_present(page):
+                logger.info(f"✅🛡️ Cloudflare пройден через {time.monotonic() - started:.1f} секунд")
+                return True
 
-        for second in range(max_wait_seconds):
             try:
-                # Проверяем состояние загрузки
-                if second % 5 == 0:
-                    try:
-                        await asyncio.wait_for(
-                            page.wait_for_load_state(config.WAIT_UNTIL),
-                            timeout=3
-                        )
-                    except asyncio.TimeoutError:
-                        pass  # Продолжаем ожидание
-
-                # Проверяем, прошли ли мы защиту
-                if not await check_cloudflare(page):
-                    logger.info(f"✅🛡️ Cloudflare пройден через {second + 1} секунд")
-                    return True
-
-                # Проверяем на ошибки доступа
-                try:
-                    error_elements = await page.query_selector_all('text="Access denied", text="Доступ запрещен"')
-                    if error_elements:
-                        logger.error("🚫 Получен отказ в доступе от Cloudflare")
-                        return False
-                except Exception:
-                    pass
-
-                # Логируем прогресс каждые 5 секунд
-                if second % 5 == 0 and second > 0:
-                    logger.info(f"⏳🛡️ Ожидание завершения проверки... ({second}/{max_wait_seconds} сек)")
-
-                await asyncio.sleep(1)
-
-            except Exception as e:
-                logger.warning(f"⚠️ Ошибка при ожидании завершения проверки: {e}")
-                await asyncio.sleep(1)
-
-        logger.warning(f"⏳❌ Таймаут ожидания завершения проверки Cloudflare ({max_wait_seconds} сек)")
-        return False
-
-    except Exception as e:
-        logger.error(f"💥 Критическая ошибка при ожидании завершения: {e}")
-        return False
+                if await page.evaluate(_ACCESS_DENIED_SCRIPT):
+                    logger.error("🚫 Получен отказ в доступе от Cloudflare")
+                    return False
+            except Exception:
+                pass
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                if report_timeout:
+                    logger.warning(f"⏳❌ Таймаут ожидания завершения проверки Cloudflare ({max_wait_seconds} сек)")
+                return False
+            await events.wait(remaining)
+    finally:
+        if watcher is not None:
+            watcher.listeners.remove(events.changed.set)
+            await watcher.stop()
+
+
+_CONTENT_MARKERS = ["подтвердите, что вы человек", "challenge.cloudflare.com"]
+
+_TITLE_MARKERS = [
+    "security check",
+    "cloudflare",
+    "проверка безопасности",
+    "just a moment...",
+    "один момент...",
+    "site connection is secure",
+    "checking if the site connection",
+]
+
+# Одна проверка внутри страницы вместо передачи всего DOM через Playwright.
+# Возвращает короткий вердикт {challenge, reason, title}.
+_PROBE_SCRIPT = '''
+    ([contentMarkers, titleMarkers]) => {
+        const title = (document.title || '').toLowerCase();
+        const bodyText = document.body ? (document.body.innerText || '').toLowerCase() : '';
+        const inlineScripts = Array.from(document.scripts)
+            .filter(s => !s.src)
+            .map(s => s.textContent.toLowerCase())
+            .join('\\n');
+        for (const marker of contentMarkers) {
+            if (bodyText.includes(marker) || inlineScripts.includes(marker)
+                || document.querySelector(`[src*="${marker}"], [action*="${marker}"]`) !== null) {
+                return { challenge: true, reason: 'content', title: document.title };
+            }
+        }
+        for (const marker of titleMarkers) {
+            if (title.includes(marker)) {
+                return { challenge: true, reason: 'title', title: document.title };
+            }
+        }
+        const hasElements = document.querySelector('.cf-turnstile') !== null ||
+            document.querySelector('#challenge-form') !== null ||
+            document.querySelector('iframe[src*="challenges.cloudflare.com"]') !== null ||
+            document.querySelector('iframe[src*="turnstile"]') !== null;
+        return { challenge: hasElements, reason: hasElements ? 'elements' : null, title: document.title };
+    }
+'''
+
+# Наблюдатель за DOM: сообщает в Python о появлении/исчезновении проверки без опроса.
+# Проба встраивается в текст скрипта, чтобы не зависеть от eval под CSP страницы.
+_WATCH_SCRIPT = '''
+    (args) => {
+        if (window.__camoufoxCloudflareWatch) {
+            return;
+        }
+        const probe = ''' + _PROBE_SCRIPT.strip() + ''';
+        let last = null;
+        let scheduled = false;
+        const report = () => {
+            scheduled = false;
+            const challenge = probe(args).challenge;
+            if (challenge !== last) {
+                last = challenge;
+                window.__camoufoxCloudflareEvent(challenge);
+            }
+        };
+        window.__camoufoxCloudflareWatch = new MutationObserver(() => {
+            if (!scheduled) {
+                scheduled = true;
+                setTimeout(report, 100);
+            }
+        });
+        window.__camoufoxCloudflareWatch.observe(document, { subtree: true, childList: true, attributes: true });
+        report();
+    }
+'''
+
+_STOP_WATCH_SCRIPT = '''
+    () => {
+        if (window.__camoufoxCloudflareWatch) {
+            window.__camoufoxCloudflareWatch.disconnect();
+            delete window.__camoufoxCloudflareWatch;
+        }
+    }
+'''
+
+_watchers: "weakref.WeakKeyDictionary[Page, CloudflareWatcher]" = weakref.WeakKeyDictionary()
+
+
+async def probe_cloudflare(page: Page) -> dict:
+    """Проверка наличия Cloudflare за один evaluate, возвращает вердикт {challenge, reason, title}."""
+    return await page.evaluate(_PROBE_SCRIPT, [_CONTENT_MARKERS, _TITLE_MARKERS])
 
 
 async def check_cloudflare(page: Page) -> bool:
@@ -270,33 +430,83 @@ async def check_cloudflare(page: Page) -> bool:
     #     logger.info("🤖 Обнаружена страница с капчей (по URL)")
     #     return True
 
-    content = await page.content()
-    if "подтвердите, что вы человек" in content.lower() or "challenge.cloudflare.com" in content.lower():
+    metrics.CLOUDFLARE_CHECKS.inc()
+    verdict = await probe_cloudflare(page)
+    if not verdict["challenge"]:
+        return False
+
+    if verdict["reason"] == "content":
         logger.warning(f"🤖 Обнаружена капча по контенту страницы")
-        return True
+    elif verdict["reason"] == "title":
+        logger.warning(f"🤖 Обнаружена капча по заголовку страницы: {verdict['title']}")
+    else:
+        logger.warning("🤖 Обнаружены элементы капчи на странице")
+    return True
 
-    title = await page.title()
-    if title and ("security check" in title.lower() or
-                  "cloudflare" in title.lower() or
-                  "проверка безопасности" in title.lower() or
-                  "just a moment..." in title.lower() or
-                  "один момент..." in title.lower() or
-                  "site connection is secure" in title.lower() or
-                  "checking if the site connection" in title.lower()):
-        logger.warning(f"🤖 Обнаружена капча по заголовку страницы: {title}")
-        return True
 
-    has_captcha = await page.evaluate('''
-                () => {
-                    return document.querySelector('.cf-turnstile') !== null || 
-                           document.querySelector('#challenge-form') !== null ||
-                           document.querySelector('iframe[src*="challenges.cloudflare.com"]') !== null ||
-                           document.querySelector('iframe[src*="turnstile"]') !== null;
-                }
-            ''')
+class CloudflareWatcher:
+    """
+    Событийный режим: MutationObserver в странице сообщает о появлении/исчезновении проверки,
+    переход основного фрейма вызывает повторную проверку.
+    """
 
-    if has_captcha:
-        logger.warning("🤖 Обнаружены элементы капчи на странице")
-        return True
+    def __init__(self, page: Page):
+        self.page = page
+        self.challenge: Optional[bool] = None
+        self.active = False
+        self.appeared = asyncio.Event()
+        self.cleared = asyncio.Event()
+        # вызываются при каждом изменении состояния проверки
+        self.listeners: list[Callable[[], None]] = []
+
+    def _on_event(self, _source, challenge: bool):
+        self.challenge = challenge
+        if challenge:
+            self.cleared.clear()
+            self.appeared.set()
+        else:
+            self.appeared.clear()
+            self.cleared.set()
+        for listener in self.listeners:
+            listener()
+
+    async def _on_navigated(self, frame):
+        if not self.active or frame != self.page.main_frame:
+            return
+        try:
+            await self.install()
+        except Exception as e:
+            logger.warning(f"⚠️🛡️ Не удалось установить наблюдатель Cloudflare после перехода: {e}")
+
+    async def install(self):
+        self.active = True
+        self.appeared.clear()
+        self.cleared.clear()
+        await self.page.evaluate(_WATCH_SCRIPT, [_CONTENT_MARKERS, _TITLE_MARKERS])
+
+    async def stop(self):
+        """Отключает наблюдатель, чтобы он не работал на следующих страницах вкладки из пула."""
+        self.active = False
+        try:
+            await self.page.evaluate(_STOP_WATCH_SCRIPT)
+        except Exception:
+            pass
 
-    return False
+    async def wait_cleared(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self.cleared.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+async def watch_cloudflare(page: Page) -> CloudflareWatcher:
+    """Возвращает (и при необходимости устанавливает) событийный наблюдатель Cloudflare для страницы."""
+    watcher = _watchers.get(page)
+    if watcher is None:
+        watcher = CloudflareWatcher(page)
+        await page.expose_binding("__camoufoxCloudflareEvent", watcher._on_event)
+        page.on("framenavigated", lambda frame: asyncio.create_task(watcher._on_navigated(frame)))
+        _watchers[page] = watcher
+    await watcher.install()
+    return watcher
@@ -1,21 +1,165 @@
+import os
 import typing
 
 WAIT_UNTIL: typing.Optional[typing.Literal["domcontentloaded", "load", "networkidle"]] = "domcontentloaded"
 
 MAX_CONCURRENT_TABS = 8
+# Максимум запросов, ожидающих свободную вкладку; сверх этого — сразу 429
+ADMISSION_QUEUE_DEPTH = 32
+# Сколько элементов одного /fetch-html/batch рендерится одновременно: остальные ждут внутри пакета,
+# а не в общих очередях, иначе большой пакет к одному домену получает 429 на часть элементов
+BATCH_CONCURRENCY = 4
+# Доли слотов вкладок по классам приоритета (URLRequest.priority) при конкуренции за них
+PRIORITY_WEIGHTS = {"interactive": 6, "normal": 3, "background": 1}
+# Справедливость внутри классов: по домену URL или по клиенту (заголовок X-Caller / адрес).
+# Пока ждут запросы других ключей, один ключ занимает не больше FAIR_MAX_SHARE_PER_KEY от всех слотов
+# (без конкурентов ключ может занять все свободные слоты).
+FAIR_SHARE_BY: typing.Literal["domain", "caller"] = "domain"
+FAIR_MAX_SHARE_PER_KEY = 0.5
+
+# Адаптивный предел одновременных запросов к домену (AIMD): +1/предел за успешный переход,
+# умножение на DOMAIN_DECREASE_FACTOR за проверку Cloudflare, 429/503, ошибку или переход дольше DOMAIN_SLOW_SECONDS
+DOMAIN_INITIAL_CONCURRENCY = 3
+DOMAIN_MIN_CONCURRENCY = 1
+DOMAIN_MAX_CONCURRENCY = 6
+DOMAIN_DECREASE_FACTOR = 0.5
+DOMAIN_SLOW_SECONDS = 20
+# Максимум запросов, ждущих слота одного домена
+DOMAIN_QUEUE_DEPTH = 32
+# Circuit breaker: открывается при доле неудач >= DOMAIN_BREAKER_FAILURE_RATIO среди последних
+# DOMAIN_BREAKER_WINDOW переходов (не меньше DOMAIN_BREAKER_MIN_REQUESTS), после паузы пропускает один пробный запрос
+DOMAIN_BREAKER_WINDOW = 20
+DOMAIN_BREAKER_MIN_REQUESTS = 5
+DOMAIN_BREAKER_FAILURE_RATIO = 0.5
+DOMAIN_BREAKER_COOLDOWN_SECONDS = 60
+# Сколько доменов отслеживать; сверх этого забываются давно неактивные
+DOMAIN_MAX_TRACKED = 1000
+
+# Шардирование: при SHARDS > 1 сервер запускается супервизором с отдельным процессом и браузером на шард.
+# SHARD_ROUTING: "least-load" — наименее загруженный шард, "domain" — привязка домена к шарду.
+SHARDS = int(os.environ.get("CAMOUFOX_SHARDS", "1"))
+SHARD_BASE_PORT = 8100
+SHARD_ROUTING: typing.Literal["least-load", "domain"] = "least-load"
+# Номер шарда текущего процесса (задаёт супервизор)
+SHARD_INDEX = int(os.environ.get("CAMOUFOX_SHARD", "0"))
 AUTO_RESTART_MINUTES = 5
 RESTART_DELAY_SECONDS = 5
 
 ACTIVITY_TIMEOUT_MINUTES = 1
 TIMEOUT_CHECK_INTERVAL_SECONDS = 30
 
+# Держать запущенный резервный браузер для мгновенной замены активного (удваивает расход памяти на браузер)
+STANDBY_BROWSER = True
+
+# Проверка живости браузера: evaluate в служебной странице раз в HEARTBEAT_INTERVAL_SECONDS,
+# после HEARTBEAT_FAILURES неудачных проверок подряд браузер заменяется резервным
+HEARTBEAT_INTERVAL_SECONDS = 5
+HEARTBEAT_TIMEOUT_SECONDS = 5
+HEARTBEAT_FAILURES = 2
+
+# Сторож браузера: раз в TIMEOUT_CHECK_INTERVAL_SECONDS сверяет показатели с порогами (0 — порог отключён)
+# и заменяет браузер заранее запущенным новым без простоя. Старше AUTO_RESTART_MINUTES браузер
+# заменяется, только если ACTIVITY_TIMEOUT_MINUTES минут не выдавал страниц.
+BROWSER_RECYCLE_RSS_MB = 2048
+BROWSER_RECYCLE_OPEN_PAGES = 40
+BROWSER_RECYCLE_PAGES_SERVED = 2000
+# Сколько ждать завершения страниц старого браузера перед его закрытием
+BROWSER_RECYCLE_DRAIN_TIMEOUT_SECONDS = 120
+
 CLOUDFLARE_FIND_SECONDS = 25
 CLOUDFLARE_ATTEMPTS = 3
+# Таймауты операций Playwright при обходе (мс)
 CLOUDFLARE_TIMEOUTS = 25000
+# Сколько ждать, пока чекбокс в iframe проверки станет доступен для клика
+CLOUDFLARE_CHECKBOX_SECONDS = 15
+# Обход продвигается по событиям страницы (фреймы, переходы, загрузка); без событий состояние
+# перепроверяется не реже раза в CLOUDFLARE_EVENT_FALLBACK_SECONDS — на случай прохождения без перехода
+CLOUDFLARE_EVENT_FALLBACK_SECONDS = 2
+# Дополнительно ждать прохождения проверки по событиям MutationObserver в DOM
+CLOUDFLARE_WATCH_MODE = False
+
+# Кэш прохождения Cloudflare (cf_clearance + user agent) по доменам
+CLEARANCE_STORE_PATH = "data/cf_clearance.json"
+CLEARANCE_TTL_MINUTES = 30
+# Закреплённый отпечаток браузера (вместе с user agent) для всех запусков и шардов: без него каждый запуск
+# получает новый user agent и сохранённый clearance после перезапуска не подходит (None — случайный при каждом запуске)
+BROWSER_FINGERPRINT_PATH: typing.Optional[str] = "data/fingerprint.json"
+
+# Кэш ответов /fetch-html (по умолчанию только память, дисковый уровень включается путём)
+RESPONSE_CACHE_DEFAULT_MAX_AGE_SECONDS = 30
+RESPONSE_CACHE_MAX_BYTES = 128 * 1024 * 1024
+RESPONSE_CACHE_DISK_PATH: typing.Optional[str] = None
+RESPONSE_CACHE_DISK_MAX_BYTES = 1024 * 1024 * 1024
+
+# Асинхронные задания (/jobs): результаты хранятся JOB_RESULT_TTL_SECONDS в пределах JOB_STORE_MAX_BYTES
+# (сверх объёма вытесняются самые старые), незавершённых заданий не больше JOB_MAX_ACTIVE
+JOB_STORE_MAX_BYTES = 256 * 1024 * 1024
+JOB_RESULT_TTL_SECONDS = 15 * 60
+JOB_MAX_ACTIVE = 64
+# Доставка webhook о завершении задания
+JOB_WEBHOOK_TIMEOUT_SECONDS = 10
+JOB_WEBHOOK_ATTEMPTS = 3
+# webhook_url — только http(s) и только на публичные адреса; хостам из списка разрешены и внутренние
+# (например, сервису в той же docker-сети)
+JOB_WEBHOOK_ALLOWED_HOSTS: list[str] = []
+
+# Sticky-сессии (/sessions): каждая держит вкладку вне пула, поэтому их число ограничено;
+# сессия закрывается после SESSION_IDLE_SECONDS простоя (проверка раз в SESSION_REAP_INTERVAL_SECONDS)
+SESSION_MAX_ACTIVE = 4
+SESSION_IDLE_SECONDS = 5 * 60
+SESSION_REAP_INTERVAL_SECONDS = 15
+# Переход внутри SPA считается завершённым, когда по селектору wait_for появилась новая разметка
+# и она не меняется SESSION_SPA_SETTLE_MS; без неё за SESSION_SPA_TIMEOUT_SECONDS выполняется полный переход
+SESSION_SPA_SETTLE_MS = 500
+SESSION_SPA_TIMEOUT_SECONDS = 10
+
+# Список отслеживания (/watchlist): плановое обновление URL в фоне. Обновление запускается, только если в очереди
+# допуска никто не ждёт и свободно больше WATCHLIST_RESERVED_SLOTS слотов; не больше WATCHLIST_MAX_CONCURRENT
+# обновлений разом и не чаще раза в WATCHLIST_DOMAIN_MIN_INTERVAL_SECONDS на домен
+WATCHLIST_MAX_ENTRIES = 500
+# Общий объём последних результатов в памяти: при заполнении новые URL не принимаются (429),
+# а обновление, которое не помещается, не сохраняется — запись отдаёт прежний результат с X-Stale
+WATCHLIST_MAX_BYTES = 128 * 1024 * 1024
+WATCHLIST_MIN_INTERVAL_SECONDS = 30
+WATCHLIST_TICK_SECONDS = 1
+WATCHLIST_MAX_CONCURRENT = 2
+WATCHLIST_RESERVED_SLOTS = 2
+WATCHLIST_DOMAIN_MIN_INTERVAL_SECONDS = 5
+# Сколько обновление может ждать слот, прежде чем отложиться до следующей попытки
+WATCHLIST_START_DEADLINE_SECONDS = 5
+# Пауза перед повтором после ошибки (удваивается, но не больше интервала записи)
+WATCHLIST_RETRY_SECONDS = 30
+
+# Потоковые ответы (URLRequest.stream): размер куска chunked-передачи и уровни сжатия
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_GZIP_LEVEL = 6
+STREAM_BROTLI_QUALITY = 5
+STREAM_ZSTD_LEVEL = 3
+
+# Скриншоты: качество jpeg/webp по умолчанию и качество промежуточного JPEG для перекодирования в браузере
+SCREENSHOT_DEFAULT_QUALITY = 80
+SCREENSHOT_TRANSCODE_CAPTURE_QUALITY = 90
+
+# Глобальные правила блокировки запросов для /fetch-html (дополняются правилами запроса)
+BLOCK_RESOURCE_TYPES: list[str] = []
+BLOCK_URL_PATTERNS: list[str] = []
+BLOCK_DOMAINS: list[str] = []
 
 MAX_RETRIES_PAGE = 5
+# Пауза перед повтором растёт экспоненциально от RETRY_DELAY_MIN до RETRY_DELAY_MAX (со случайным разбросом)
 RETRY_DELAY_MIN = 1
 RETRY_DELAY_MAX = 5
+# Бюджет времени на все попытки перехода одного запроса и таймаут одной попытки;
+# попытка не начинается, если от бюджета осталось меньше NAVIGATION_MIN_ATTEMPT_SECONDS
+NAVIGATION_BUDGET_SECONDS = 90
+NAVIGATION_TIMEOUT_SECONDS = 30
+NAVIGATION_MIN_ATTEMPT_SECONDS = 2
+
+# Дублирующий переход: если коммит не случился за p95 задержки коммита (по последним HEDGE_WINDOW переходам,
+# не меньше HEDGE_MIN_SAMPLES замеров), тот же URL открывается во второй вкладке при свободном слоте; побеждает первая
+HEDGE_NAVIGATION = False
+HEDGE_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
 
 BROWSER_OPTIONS = {
     "headless": True,
@@ -27,3 +171,31 @@ BROWSER_OPTIONS = {
     "disable_coop": True,
     "i_know_what_im_doing": True
 }
+
+# Постоянный прогретый профиль (None — выключено, каждый запуск с чистого листа).
+# Браузер запускается с профилем в WARM_PROFILE_DIR/shard-N/slot-N и дисковым кэшем до WARM_PROFILE_CACHE_MB;
+# слотов нужно не меньше одновременно живущих браузеров: активный, резервный и заменяемый;
+# у каждого шарда свой подкаталог shard-N. Перехват запросов (block) отключает HTTP-кэш страницы,
+# поэтому дисковый кэш работает только для запросов без правил блокировки.
+# Очистка профиля: POST /wipe-profile.
+WARM_PROFILE_DIR: typing.Optional[str] = None
+WARM_PROFILE_SLOTS = 3
+WARM_PROFILE_CACHE_MB = 256
+# Лёгкие URL для прогрева DNS/TLS-соединений сразу после запуска
+WARM_PROFILE_PREWARM_URLS: list[str] = [
+    "https://www.twitch.tv/robots.txt",
+    "https://static.twitchcdn.net/robots.txt",
+    "https://gql.twitch.tv/",
+    "https://static-cdn.jtvnw.net/",
+]
+WARM_PROFILE_PREWARM_TIMEOUT_SECONDS = 10
+
+# Пул прогретых контекстов/страниц для /fetch-html и /fetch-screenshot
+PAGE_POOL_WARM_SIZE = 2
+PAGE_POOL_MAX_IDLE = 8
+PAGE_POOL_MAX_USES = 50
+PAGE_POOL_MAX_AGE_MINUTES = 10
+# Изоляция аренд: контекст закрывается после каждой аренды (куки, IndexedDB, Cache Storage, service workers
+# и хранилища всех origin уходят вместе с ним), новый создаётся в фоне. False — только переход на about:blank.
+# Общий постоянный профиль (WARM_PROFILE_DIR) не изолируется: его хранилище общее по замыслу
+PAGE_POOL_CLEAR_STORAGE = True
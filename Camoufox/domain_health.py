@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Literal, Optional
+from urllib.parse import urlsplit
+
+import config
+import metrics
+from configure_logger import configure
+from exceptions import AdmissionRejectedException, DomainCircuitOpenException
+
+logger = logging.getLogger(__name__)
+configure(logger)
+
+Outcome = Literal["success", "challenge", "rate_limited", "failure"]
+
+
+def domain_of(url: str) -> str:
+    return urlsplit(url).hostname or ""
+
+
+class _DomainState:
+    def __init__(self, domain: str):
+        self.domain = domain
+        self.limit = float(config.DOMAIN_INITIAL_CONCURRENCY)
+        self.inflight = 0
+        self.waiters: deque[asyncio.Future] = deque()
+        # Последние исходы переходов: True — неудача (для circuit breaker)
+        self.window: deque[bool] = deque(maxlen=config.DOMAIN_BREAKER_WINDOW)
+        self.success_rate = 1.0
+        self.challenge_rate = 0.0
+        self.latency = 0.0
+        self.attempts = 0
+        self.state: Literal["closed", "open", "half_open"] = "closed"
+        self.opened_at = 0.0
+        self.probing = False
+        self.last_seen = time.monotonic()
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "limit": round(self.limit, 2),
+            "inflight": self.inflight,
+            "waiting": len(self.waiters),
+            "success_rate": round(self.success_rate, 3),
+            "challenge_rate": round(self.challenge_rate, 3),
+            "latency_ms": round(self.latency * 1000),
+            "attempts": self.attempts,
+        }
+
+
+class DomainGovernor:
+    """
+    Учёт здоровья доменов: доля успехов и проверок Cloudflare и задержка переходов.
+    По ним AIMD-алгоритм меняет предел одновременных запросов к домену: плавно растит при успехах
+    и уменьшает в DOMAIN_DECREASE_FACTOR раз при проверках, ограничениях частоты, ошибках и медленных ответах.
+    Circuit breaker при доле неудач выше DOMAIN_BREAKER_FAILURE_RATIO сразу отклоняет запросы к домену,
+    а после DOMAIN_BREAKER_COOLDOWN_SECONDS пропускает один пробный запрос.
+    """
+
+    def __init__(self):
+        self._states: dict[str, _DomainState] = {}
+        self.circuit_opens = 0
+        self.rejected = 0
+
+    async def acquire(self, domain: str, deadline: Optional[float] = None):
+        """Занимает слот домена в пределах его текущего лимита; при открытом circuit breaker — отказ сразу."""
+        state = self._state(domain)
+        self._check_circuit(state)
+
+        if state.inflight < self._slots(state) and not state.waiters:
+            state.inflight += 1
+            return
+
+        if len(state.waiters) >= config.DOMAIN_QUEUE_DEPTH:
+            self.rejected += 1
+            raise AdmissionRejectedException(429, f"Очередь запросов к {domain} заполнена", self._retry_after(state))
+
+        timeout = None
+        if deadline is not None:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                raise AdmissionRejectedException(503, "Запрос не успеет начаться до дедлайна", 1)
+
+        future = asyncio.get_running_loop().create_future()
+        state.waiters.append(future)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # слот уже выдан, но ожидающий ушёл
+                self.release(domain)
+            elif not future.done():
+                future.cancel()
+                state.waiters.remove(future)
+            if isinstance(e, asyncio.TimeoutError):
+                raise AdmissionRejectedException(503, f"Дедлайн истёк в очереди к {domain}", self._retry_after(state))
+            raise
+
+    def try_acquire(self, domain: str) -> bool:
+        """Занимает слот домена без ожидания, если circuit breaker закрыт и лимит не исчерпан."""
+        state = self._state(domain)
+        if state.state != "closed" or state.waiters or state.inflight >= self._slots(state):
+            return False
+        state.inflight += 1
+        return True
+
+    def release(self, domain: str):
+        state = self._states.get(domain)
+        if state is None:
+            return
+        state.inflight -= 1
+        if state.probing and state.state == "half_open":
+            # пробный запрос завершился, не дойдя до перехода — пропускаем следующий
+            state.probing = False
+        self._dispatch(state)
+
+    def record(self, domain: str, outcome: Outcome, latency: Optional[float] = None):
+        """Учитывает исход одного перехода к домену."""
+        state = self._state(domain)
+        state.attempts += 1
+        failed = outcome in ("failure", "rate_limited")
+        state.window.append(failed)
+        state.success_rate = 0.9 * state.success_rate + 0.1 * (0.0 if failed else 1.0)
+        state.challenge_rate = 0.9 * state.challenge_rate + 0.1 * (1.0 if outcome == "challenge" else 0.0)
+        if latency is not None:
+            state.latency = latency if state.attempts == 1 else 0.8 * state.latency + 0.2 * latency
+
+        slow = latency is not None and latency >= config.DOMAIN_SLOW_SECONDS
+        if outcome == "success" and not slow:
+            state.limit = min(config.DOMAIN_MAX_CONCURRENCY, state.limit + 1 / state.limit)
+        elif state.limit > config.DOMAIN_MIN_CONCURRENCY:
+            state.limit = max(config.DOMAIN_MIN_CONCURRENCY, state.limit * config.DOMAIN_DECREASE_FACTOR)
+            logger.info(f"📉 Лимит для {domain} снижен до {state.limit:.2f} ({outcome}"
+                        f"{', медленно' if slow else ''})")
+
+        if state.state == "half_open":
+            state.probing = False
+            if failed:
+                self._open(state)
+            else:
+                logger.info(f"✅🔌 Пробный запрос к {domain} успешен, circuit breaker закрыт")
+                state.state = "closed"
+                state.window.clear()
+                state.limit = float(config.DOMAIN_INITIAL_CONCURRENCY)
+        elif state.state == "closed" and len(state.window) >= config.DOMAIN_BREAKER_MIN_REQUESTS:
+            if sum(state.window) / len(state.window) >= config.DOMAIN_BREAKER_FAILURE_RATIO:
+                self._open(state)
+        self._dispatch(state)
+
+    def is_open(self, domain: str) -> bool:
+        state = self._states.get(domain)
+        return state is not None and state.state == "open"
+
+    def open_error(self, domain: str) -> DomainCircuitOpenException:
+        return DomainCircuitOpenException(domain, self._retry_after(self._state(domain)))
+
+    def snapshot(self) -> dict[str, dict]:
+        return {domain: state.snapshot() for domain, state in self._states.items()}
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "domains": len(self._states),
+            "circuits_open": sum(1 for s in self._states.values() if s.state != "closed"),
+            "circuit_opens": self.circuit_opens,
+            "rejected": self.rejected,
+        }
+
+    def _check_circuit(self, state: _DomainState):
+        if state.state == "open":
+            if time.monotonic() - state.opened_at < config.DOMAIN_BREAKER_COOLDOWN_SECONDS:
+                self._reject_open(state)
+            state.state = "half_open"
+            logger.info(f"🔌 Пробный запрос к {state.domain} после паузы")
+        if state.state == "half_open":
+            if state.probing:
+                self._reject_open(state)
+            state.probing = True
+
+    def _reject_open(self, state: _DomainState):
+        self.rejected += 1
+        raise self.open_error(state.domain)
+
+    def _open(self, state: _DomainState):
+        state.state = "open"
+        state.opened_at = time.monotonic()
+        state.probing = False
+        self.circuit_opens += 1
+        metrics.DOMAIN_CIRCUIT_OPENS.inc(domain=state.domain)
+        logger.warning(f"⛔🔌 Circuit breaker для {state.domain} открыт на {config.DOMAIN_BREAKER_COOLDOWN_SECONDS} "
+                       f"секунд: неудач {sum(state.window)}/{len(state.window)}")
+        while state.waiters:
+            future = state.waiters.popleft()
+            if not future.done():
+                future.set_exception(self.open_error(state.domain))
+
+    def _dispatch(self, state: _DomainState):
+        while state.waiters and state.inflight < self._slots(state):
+            future = state.waiters.popleft()
+            if not future.done():
+                state.inflight += 1
+                future.set_result(None)
+
+    @staticmethod
+    def _slots(state: _DomainState) -> int:
+        return max(1, math.floor(state.limit))
+
+    @staticmethod
+    def _retry_after(state: _DomainState) -> int:
+        if state.state == "open":
+            return max(1, math.ceil(config.DOMAIN_BREAKER_COOLDOWN_SECONDS - (time.monotonic() - state.opened_at)))
+        return max(1, math.ceil(state.latency or 1))
+
+    def _state(self, domain: str) -> _DomainState:
+        state = self._states.get(domain)
+        if state is None:
+            if len(self._states) >= config.DOMAIN_MAX_TRACKED:
+                self._prune()
+            state = self._states[domain] = _DomainState(domain)
+        state.last_seen = time.monotonic()
+        return state
+
+    def _prune(self):
+        idle = [s for s in self._states.values() if s.state == "closed" and not s.inflight and not s.waiters]
+        idle.sort(key=lambda s: s.last_seen)
+        for state in idle[:max(1, len(idle) // 2)]:
+            del self._states[state.domain]
+
+
+domain_governor = DomainGovernor()
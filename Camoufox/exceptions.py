@@ -16,3 +16,26 @@ class AutoRestartException(Exception):
 class NoModelsAddedException(Exception):
     """Исключение для случая, когда модели не добавляются в течение заданного времени"""
     pass
+
+
+class AdmissionRejectedException(Exception):
+    """Запрос отклонён контролем допуска: очередь заполнена или дедлайн недостижим"""
+
+    def __init__(self, status_code: int, message: str, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class DomainCircuitOpenException(AdmissionRejectedException):
+    """Домен временно недоступен: circuit breaker открыт после серии проверок, ограничений частоты или ошибок"""
+
+    def __init__(self, domain: str, retry_after: int):
+        super().__init__(503, f"Домен {domain} временно недоступен (circuit breaker), повтор через {retry_after} с",
+                         retry_after)
+        self.domain = domain
+
+
+class InvalidPageInputException(Exception):
+    """Параметры запроса, выполняемые в странице (селектор, JS-выражение), некорректны — ошибка клиента, а не браузера"""
+    pass
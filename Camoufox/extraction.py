@@ -0,0 +1,88 @@
+import logging
+from typing import Optional
+
+from playwright.async_api import Error as PlaywrightError, Page
+
+from browser_utils import classify_navigation_error
+from configure_logger import configure
+from exceptions import InvalidPageInputException
+
+logger = logging.getLogger(__name__)
+configure(logger)
+
+# Все CSS/XPath-экстракторы выполняются внутри страницы за один evaluate.
+# Ошибка селектора ловится по каждому экстрактору и возвращается в errors, а не роняет evaluate.
+_EXTRACT_SCRIPT = '''
+    (extractors) => {
+        const read = (node, ex) => {
+            if (ex.attribute) {
+                return node.getAttribute ? node.getAttribute(ex.attribute) : null;
+            }
+            if (ex.html) {
+                return node.outerHTML ?? null;
+            }
+            return (node.textContent || '').trim();
+        };
+        const result = {};
+        const errors = {};
+        for (const [name, ex] of Object.entries(extractors)) {
+            let nodes = [];
+            try {
+                if (ex.css) {
+                    nodes = Array.from(document.querySelectorAll(ex.css));
+                } else if (ex.xpath) {
+                    const snapshot = document.evaluate(
+                        ex.xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+                    for (let i = 0; i < snapshot.snapshotLength; i++) {
+                        nodes.push(snapshot.snapshotItem(i));
+                    }
+                }
+            } catch (e) {
+                errors[name] = String(e && e.message || e);
+                continue;
+            }
+            const values = nodes.map(node => read(node, ex));
+            result[name] = ex.all ? values : (values.length ? values[0] : null);
+        }
+        return {result, errors};
+    }
+'''
+
+
+async def extract_values(page: Page, extractors: dict[str, dict]) -> dict:
+    """
+    Выполняет именованные экстракторы в странице и возвращает компактный словарь значений.
+    Экстрактор: css или xpath (+ attribute / html / all) либо js — выражение, вычисляемое в странице.
+    Некорректный селектор — InvalidPageInputException.
+    """
+    dom_extractors = {name: ex for name, ex in extractors.items() if not ex.get("js")}
+    result = {}
+    if dom_extractors:
+        evaluated = await page.evaluate(_EXTRACT_SCRIPT, dom_extractors)
+        if evaluated["errors"]:
+            details = "; ".join(f"{name}: {error}" for name, error in evaluated["errors"].items())
+            raise InvalidPageInputException(f"Некорректный селектор экстрактора ({details})")
+        result = evaluated["result"]
+
+    for name, ex in extractors.items():
+        if ex.get("js"):
+            try:
+                result[name] = await page.evaluate(ex["js"])
+            except Exception as e:
+                logger.warning(f"⚠️🔎 Ошибка JS-экстрактора {name}: {e}")
+                result[name] = None
+
+    return result
+
+
+async def subtree_html(page: Page, selector: str) -> Optional[str]:
+    """outerHTML первого элемента по CSS/XPath-селектору или None, если элемента нет."""
+    try:
+        element = await page.query_selector(selector)
+    except PlaywrightError as e:
+        if classify_navigation_error(e) == "browser":
+            raise
+        raise InvalidPageInputException(f"Некорректный селектор subtree: {e}")
+    if element is None:
+        return None
+    return await element.evaluate("node => node.outerHTML")
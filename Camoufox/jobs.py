@@ -0,0 +1,271 @@
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Literal, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+from fastapi import HTTPException
+
+import config
+from configure_logger import configure
+from exceptions import AdmissionRejectedException
+
+logger = logging.getLogger(__name__)
+configure(logger)
+
+# Результат задания: тело ответа, media type и заголовки
+JobResult = tuple[bytes, str, dict[str, str]]
+
+
+def _is_public(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global
+
+
+def check_webhook_url(url: str):
+    """
+    Проверка webhook_url при приёме задания: только http/https, адрес-литерал — только публичный.
+    Хосты из JOB_WEBHOOK_ALLOWED_HOSTS не проверяются. Имя хоста проверяется при доставке (_WebhookResolver).
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("webhook_url должен быть абсолютным http(s) URL")
+    host = parts.hostname
+    if host in config.JOB_WEBHOOK_ALLOWED_HOSTS:
+        return
+    try:
+        public = _is_public(host)
+    except ValueError:
+        # имя, а не адрес: его адреса проверит резолвер при доставке
+        return
+    if not public:
+        raise ValueError(f"webhook_url указывает на внутренний адрес: {host}")
+
+
+class _WebhookResolver(aiohttp.ThreadedResolver):
+    """
+    Резолвер доставки webhook: имя, указывающее на внутренний адрес (loopback, частные сети, link-local),
+    отклоняется — webhook не должен давать доступ во внутреннюю сеть. Проверяются те же адреса,
+    к которым затем подключается aiohttp, поэтому подмена DNS между проверкой и запросом не помогает.
+    """
+
+    async def resolve(self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET):
+        hosts = await super().resolve(host, port, family)
+        if host not in config.JOB_WEBHOOK_ALLOWED_HOSTS:
+            internal = [entry["host"] for entry in hosts if not _is_public(entry["host"])]
+            if internal:
+                raise OSError(f"webhook {host} указывает на внутренний адрес: {', '.join(internal)}")
+        return hosts
+
+
+class Job:
+    def __init__(self, kind: str, url: str, webhook_url: Optional[str]):
+        # номер шарда в id нужен супервизору, чтобы опрос попал в процесс, где задание выполняется
+        self.id = f"{config.SHARD_INDEX}-{uuid.uuid4().hex}"
+        self.kind = kind
+        self.url = url
+        self.webhook_url = webhook_url
+        self.status: Literal["queued", "running", "done", "failed"] = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.content: Optional[bytes] = None
+        self.media_type: Optional[str] = None
+        self.headers: dict[str, str] = {}
+        self.error: Optional[str] = None
+        self.error_status: Optional[int] = None
+        self.webhook_status: Optional[Literal["delivered", "failed"]] = None
+        self.size = 0
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def describe(self) -> dict:
+        result = {
+            "id": self.id,
+            "kind": self.kind,
+            "url": self.url,
+            "status": self.status,
+            "result_url": f"/jobs/{self.id}",
+            "created_at": self.created_at,
+        }
+        if self.started_at is not None:
+            result["queued_ms"] = round((self.started_at - self.created_at) * 1000)
+        if self.finished_at is not None:
+            result["elapsed_ms"] = round((self.finished_at - self.created_at) * 1000)
+            result["expires_at"] = self.finished_at + config.JOB_RESULT_TTL_SECONDS
+        if self.status == "done":
+            result["size"] = self.size
+        if self.error is not None:
+            result["error"] = self.error
+            result["error_status"] = self.error_status
+        if self.webhook_status is not None:
+            result["webhook"] = self.webhook_status
+        return result
+
+
+class JobStore:
+    """
+    Асинхронные задания рендера: id выдаётся сразу, результат забирается опросом или по webhook.
+    Готовые результаты хранятся JOB_RESULT_TTL_SECONDS; при превышении JOB_STORE_MAX_BYTES
+    вытесняются самые старые завершённые задания. Выполнение не зависит от соединения клиента.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, max_active: int):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_active = max_active
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._bytes = 0
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.evictions = 0
+        self.expired = 0
+        self.webhooks_delivered = 0
+        self.webhooks_failed = 0
+
+    def submit(
+            self,
+            kind: str,
+            url: str,
+            run: Callable[[], Awaitable[JobResult]],
+            webhook_url: Optional[str] = None,
+    ) -> Job:
+        self._expire()
+        if self.active() >= self.max_active:
+            raise AdmissionRejectedException(429, "Слишком много незавершённых заданий", 5)
+
+        job = Job(kind, url, webhook_url)
+        self._jobs[job.id] = job
+        self.submitted += 1
+        job.task = asyncio.create_task(self._run(job, run))
+        logger.info(f"📥 Задание {job.id} ({kind}) принято: {url}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._expire()
+        return self._jobs.get(job_id)
+
+    def delete(self, job_id: str) -> bool:
+        """Удаляет задание; незавершённое отменяется."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+        self._drop(job)
+        return True
+
+    def active(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.finished)
+
+    async def close(self):
+        tasks = [job.task for job in self._jobs.values() if job.task is not None and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "jobs": len(self._jobs),
+            "active": self.active(),
+            "bytes": self._bytes,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "webhooks_delivered": self.webhooks_delivered,
+            "webhooks_failed": self.webhooks_failed,
+        }
+
+    async def _run(self, job: Job, run: Callable[[], Awaitable[JobResult]]):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            content, media_type, headers = await run()
+        except asyncio.CancelledError:
+            raise
+        except HTTPException as e:
+            self._fail(job, e.status_code, str(e.detail))
+        except Exception as e:
+            logger.exception(f"Задание {job.id} упало: {e}")
+            self._fail(job, 500, str(e))
+        else:
+            if len(content) > self.max_bytes:
+                self._fail(job, 507, f"Результат ({len(content)} байт) больше хранилища заданий")
+            else:
+                job.content, job.media_type, job.headers = content, media_type, headers
+                job.size = len(content)
+                job.status = "done"
+                job.finished_at = time.time()
+                self.completed += 1
+                self._bytes += job.size
+                self._evict()
+                logger.info(f"✅📥 Задание {job.id} выполнено ({job.size} байт)")
+
+        if job.webhook_url:
+            await self._deliver_webhook(job)
+
+    def _fail(self, job: Job, status_code: int, error: str):
+        job.status = "failed"
+        job.error_status = status_code
+        job.error = error
+        job.finished_at = time.time()
+        self.failed += 1
+        logger.warning(f"⚠️📥 Задание {job.id} не выполнено ({status_code}): {error}")
+
+    async def _deliver_webhook(self, job: Job):
+        """POST с описанием задания (без тела результата) на webhook_url, с повторами."""
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(resolver=_WebhookResolver()),
+                timeout=aiohttp.ClientTimeout(total=config.JOB_WEBHOOK_TIMEOUT_SECONDS))
+        for attempt in range(config.JOB_WEBHOOK_ATTEMPTS):
+            try:
+                async with self._session.post(job.webhook_url, json=job.describe()) as response:
+                    if response.status < 400:
+                        job.webhook_status = "delivered"
+                        self.webhooks_delivered += 1
+                        return
+                    error = f"HTTP {response.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = f"{type(e).__name__}: {e}"
+            logger.warning(f"⚠️📨 Webhook задания {job.id} не доставлен "
+                           f"({attempt + 1}/{config.JOB_WEBHOOK_ATTEMPTS}): {error}")
+            if attempt < config.JOB_WEBHOOK_ATTEMPTS - 1:
+                await asyncio.sleep(2 ** attempt)
+        job.webhook_status = "failed"
+        self.webhooks_failed += 1
+
+    def _expire(self):
+        now = time.time()
+        for job in [job for job in self._jobs.values() if job.finished and now - job.finished_at > self.ttl_seconds]:
+            self._drop(job)
+            self.expired += 1
+
+    def _evict(self):
+        while self._bytes > self.max_bytes:
+            oldest = next(job for job in self._jobs.values() if job.status == "done")
+            logger.info(f"🧹📥 Результат задания {oldest.id} вытеснен: хранилище заданий заполнено")
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, job: Job):
+        self._jobs.pop(job.id, None)
+        self._bytes -= job.size
+        job.content = None
+        job.size = 0
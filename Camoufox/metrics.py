@@ -0,0 +1,184 @@
+import math
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator
+
+# Минимальная реализация метрик в текстовом формате Prometheus без внешних зависимостей.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 512 * 1024, 1024 ** 2, 5 * 1024 ** 2, 10 * 1024 ** 2, 50 * 1024 ** 2)
+
+_registry: list["_Metric"] = []
+_collectors: list[Callable[[], Iterator[str]]] = []
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = labels
+        _registry.append(self)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self._samples()
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple[str, ...], float] = {} if labels else {(): 0.0}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+    def _samples(self) -> Iterator[str]:
+        yield f"{self.name} {_format_value(self.value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            buckets: tuple[float, ...] = LATENCY_BUCKETS,
+            labels: tuple[str, ...] = (),
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets) + (math.inf,)
+        # по каждому набору меток: счётчики корзин, сумма, количество
+        self._series: dict[tuple[str, ...], list] = {} if labels else {(): [[0] * len(self.buckets), 0.0, 0]}
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+        counts = series[0]
+        series[1] += value
+        series[2] += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+
+    @contextmanager
+    def time(self, **labels: str):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - started, **labels)
+
+    def _samples(self) -> Iterator[str]:
+        for key, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.label_names, key)} {count}"
+
+
+def register_stats(
+        prefix: str,
+        documentation: str,
+        stats: Callable[[], dict[str, int]],
+        counters: Iterable[str] = (),
+):
+    """
+    Публикует словарь stats() компонента как набор метрик, вычисляемых при каждом запросе.
+    Ключи из counters — монотонные счётчики: тип counter и суффикс _total (для rate()); остальные — gauge.
+    """
+    counters = frozenset(counters)
+
+    def collect() -> Iterator[str]:
+        for key, value in stats().items():
+            if key in counters:
+                name, kind = f"{prefix}_{key}_total", "counter"
+            else:
+                name, kind = f"{prefix}_{key}", "gauge"
+            yield f"# HELP {name} {documentation}: {key}"
+            yield f"# TYPE {name} {kind}"
+            yield f"{name} {_format_value(value)}"
+
+    _collectors.append(collect)
+
+
+def render_latest() -> str:
+    lines: list[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        lines.extend(collect())
+    return "\n".join(lines) + "\n"
+
+
+# ---------------- Метрики конвейера загрузки ----------------
+QUEUE_WAIT = Histogram("camoufox_queue_wait_seconds", "Ожидание слота вкладки в очереди допуска")
+NEW_PAGE = Histogram("camoufox_new_page_seconds", "Получение страницы из пула (включая создание новой)")
+GOTO = Histogram("camoufox_goto_seconds", "Длительность page.goto")
+READINESS_WAIT = Histogram("camoufox_readiness_wait_seconds", "Ожидание готовности страницы")
+CONTENT = Histogram("camoufox_content_seconds", "Сериализация результата (page.content или извлечение)")
+RESPONSE_SIZE = Histogram("camoufox_response_bytes", "Размер ответа", SIZE_BUCKETS)
+
+CLOUDFLARE_CHECKS = Counter("camoufox_cloudflare_checks_total", "Вызовы check_cloudflare")
+CLOUDFLARE_BYPASS = Counter("camoufox_cloudflare_bypass_total", "Попытки bypass_cloudflare по исходу", ("outcome",))
+GOTO_RETRIES = Counter("camoufox_goto_retries_total", "Повторные попытки перехода в safe_goto")
+GOTO_ERRORS = Counter("camoufox_goto_errors_total", "Ошибки перехода в safe_goto по классу", ("kind",))
+HEDGED_NAVIGATIONS = Counter("camoufox_hedged_navigations_total", "Дублирующие переходы по исходу", ("outcome",))
+BROWSER_RESTARTS = Counter("camoufox_browser_restarts_total", "Перезапуски браузера")
+BROWSER_FAILOVER = Histogram("camoufox_browser_failover_seconds", "Время без рабочего браузера при его падении или перезапуске")
+CLOUDFLARE_PHASE = Histogram("camoufox_cloudflare_phase_seconds", "Длительность фаз обхода Cloudflare",
+                             labels=("phase",))
+BROWSER_RECYCLES = Counter("camoufox_browser_recycles_total", "Плановые замены браузера сторожем по причине", ("reason",))
+DOMAIN_CIRCUIT_OPENS = Counter("camoufox_domain_circuit_opens_total", "Открытия circuit breaker по домену", ("domain",))
+SESSION_NAVIGATIONS = Counter("camoufox_session_navigations_total", "Переходы в sticky-сессиях по способу",
+                              ("mode",))
+INFLIGHT_PAGES = Gauge("camoufox_inflight_pages", "Страниц в работе")
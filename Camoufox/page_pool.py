@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Optional
+
+from playwright.async_api import Browser, BrowserContext, Page
+
+import config
+from configure_logger import configure
+from readiness import track_network
+
+logger = logging.getLogger(__name__)
+configure(logger)
+
+class PageLease:
+    """Аренда прогретой пары контекст/страница из пула."""
+
+    def __init__(self, browser: Browser, context: BrowserContext, page: Page):
+        self.browser = browser
+        self.context = context
+        self.page = page
+        self.created_at = time.monotonic()
+        self.uses = 0
+        self.warm = False
+        self.user_agent: Optional[str] = None
+        # Контекст с особыми параметрами (например, device_scale_factor) — только для одного запроса
+        self.dedicated = False
+
+    def is_expired(self) -> bool:
+        if self.uses >= config.PAGE_POOL_MAX_USES:
+            return True
+        return time.monotonic() - self.created_at >= config.PAGE_POOL_MAX_AGE_MINUTES * 60
+
+
+class PagePool:
+    """
+    Пул переиспользуемых контекстов/страниц.
+    Аренды выдаются под контролем допуска сервера, очищаются между использованиями
+    и выводятся из оборота после PAGE_POOL_MAX_USES использований или PAGE_POOL_MAX_AGE_MINUTES минут.
+    """
+
+    def __init__(self):
+        self._idle: deque[PageLease] = deque()
+        self.warm_hits = 0
+        self.cold_hits = 0
+        self.retired = 0
+        # Учёт по браузерам: выданные аренды и страницы, обслуженные с запуска браузера
+        self._leased: dict[Browser, int] = {}
+        self._served: dict[Browser, int] = {}
+        # Браузеры, выводимые из работы: их страницы не возвращаются в пул
+        self._closing: set[Browser] = set()
+        # Фоновые создания контекстов на замену закрытым после аренды (PAGE_POOL_CLEAR_STORAGE)
+        self._replacing: set[asyncio.Task] = set()
+
+    async def warm(self, browser: Browser, count: int = config.PAGE_POOL_WARM_SIZE):
+        """Заранее создаёт count страниц, чтобы первые запросы не платили за холодный старт."""
+        for _ in range(count):
+            try:
+                self._idle.append(await self._create(browser))
+            except Exception as e:
+                logger.warning(f"⚠️📑 Не удалось прогреть страницу для пула: {e}")
+                break
+        logger.info(f"📑🔥 Пул страниц прогрет: {len(self._idle)} шт.")
+
+    async def acquire(self, browser: Browser, **context_options) -> PageLease:
+        """
+        Возвращает прогретую страницу текущего браузера или создаёт новую.
+        С context_options создаётся отдельный контекст, который не возвращается в пул.
+        """
+        if context_options:
+            lease = await self._create(browser, **context_options)
+            lease.dedicated = True
+            self.cold_hits += 1
+            return self._lend(lease)
+
+        while self._idle:
+            lease = self._idle.popleft()
+            if lease.browser is browser and not lease.is_expired() and not lease.page.is_closed():
+                lease.warm = True
+                self.warm_hits += 1
+                return self._lend(lease)
+            await self._retire(lease)
+
+        lease = await self._create(browser)
+        self.cold_hits += 1
+        return self._lend(lease)
+
+    async def release(self, lease: PageLease, reusable: bool = True):
+        """Возвращает аренду в пул после очистки, либо закрывает её."""
+        if lease.browser in self._leased:
+            self._leased[lease.browser] -= 1
+        if (not reusable or lease.dedicated or lease.is_expired() or lease.browser in self._closing
+                or len(self._idle) >= config.PAGE_POOL_MAX_IDLE):
+            await self._retire(lease)
+            return
+
+        if config.PAGE_POOL_CLEAR_STORAGE and not getattr(lease.context, "shared_storage", False):
+            # IndexedDB, Cache Storage, service workers и хранилища других origin из страницы не очищаются:
+            # контекст закрывается целиком, а новый для следующей аренды создаётся в фоне
+            await self._retire(lease)
+            task = asyncio.create_task(self._replace(lease.browser))
+            self._replacing.add(task)
+            task.add_done_callback(self._replacing.discard)
+            return
+
+        try:
+            # без изоляции (общий постоянный профиль или PAGE_POOL_CLEAR_STORAGE=False) страница только уводится на about:blank
+            await lease.page.goto("about:blank")
+        except Exception as e:
+            logger.warning(f"⚠️📑 Ошибка очистки страницы пула, закрываю её: {e}")
+            await self._retire(lease)
+            return
+
+        self._idle.append(lease)
+
+    async def drain(self, browser: Optional[Browser] = None):
+        """
+        Закрывает простаивающие страницы (например, перед перезапуском браузера).
+        С browser — только страницы этого браузера, возвращаемые позже аренды тоже закрываются.
+        """
+        if browser is not None:
+            self._closing.add(browser)
+        else:
+            for task in self._replacing:
+                task.cancel()
+        keep = deque()
+        while self._idle:
+            lease = self._idle.popleft()
+            if browser is None or lease.browser is browser:
+                await self._retire(lease)
+            else:
+                keep.append(lease)
+        self._idle = keep
+
+    def leased(self, browser: Browser) -> int:
+        """Число аренд браузера, ещё не возвращённых в пул."""
+        return self._leased.get(browser, 0)
+
+    def served(self, browser: Browser) -> int:
+        """Число страниц, выданных браузером с момента запуска."""
+        return self._served.get(browser, 0)
+
+    def forget(self, browser: Browser):
+        """Сбрасывает учёт закрытого браузера."""
+        self._leased.pop(browser, None)
+        self._served.pop(browser, None)
+        self._closing.discard(browser)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "idle": len(self._idle),
+            "warm_hits": self.warm_hits,
+            "cold_hits": self.cold_hits,
+            "retired": self.retired,
+        }
+
+    def _lend(self, lease: PageLease) -> PageLease:
+        lease.uses += 1
+        self._leased[lease.browser] = self._leased.get(lease.browser, 0) + 1
+        self._served[lease.browser] = self._served.get(lease.browser, 0) + 1
+        return lease
+
+    @staticmethod
+    async def _create(browser: Browser, **context_options) -> PageLease:
+        context = await browser.new_context(**context_options)
+        try:
+            page = await context.new_page()
+        except Exception:
+            await context.close()
+            raise
+        # запросы считаются с самого начала: условие network_idle_ms видит и уже начатые загрузки
+        track_network(page)
+        return PageLease(browser, context, page)
+
+    async def _replace(self, browser: Browser):
+        try:
+            lease = await self._create(browser)
+        except Exception as e:
+            logger.warning(f"⚠️📑 Не удалось создать страницу на замену в пуле: {e}")
+            return
+        if browser in self._closing or len(self._idle) >= config.PAGE_POOL_MAX_IDLE:
+            await self._retire(lease)
+            return
+        self._idle.append(lease)
+
+    async def _retire(self, lease: PageLease):
+        self.retired += 1
+        try:
+            await asyncio.wait_for(lease.context.close(), timeout=10)
+        except Exception as e:
+            logger.warning(f"⚠️📑 Ошибка закрытия контекста пула: {e}")
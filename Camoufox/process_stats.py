@@ -0,0 +1,62 @@
+import os
+from typing import Optional
+
+# Память процессов по данным /proc: общая для сторожа браузера и офлайн-бенчмарка.
+
+
+def _children() -> Optional[dict[int, list[int]]]:
+    """Дочерние процессы по родителю; None, если /proc недоступен."""
+    children: dict[int, list[int]] = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return None
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as file:
+                ppid = int(file.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def child_pids(pid: int) -> set[int]:
+    """Непосредственные потомки процесса (пустое множество, если /proc недоступен)."""
+    children = _children()
+    return set(children.get(pid, [])) if children is not None else set()
+
+
+def process_tree_rss(pid: int) -> Optional[int]:
+    """RSS процесса и всех его потомков в байтах по данным /proc; None, если /proc недоступен."""
+    children = _children()
+    if children is None:
+        return None
+
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/status", "r") as file:
+                for line in file:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return total
+
+
+def own_rss() -> int:
+    try:
+        with open("/proc/self/status", "r") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import time
+import weakref
+from typing import Optional
+
+from playwright.async_api import Error as PlaywrightError, Page, Request, TimeoutError as PlaywrightTimeoutError
+
+from browser_utils import classify_navigation_error
+from configure_logger import configure
+from exceptions import InvalidPageInputException
+
+logger = logging.getLogger(__name__)
+configure(logger)
+
+
+# DOM считается стабильным, если не было мутаций не менее ms.
+_DOM_STABLE_SCRIPT = '''
+    (ms) => {
+        if (!window.__camoufoxDomStable) {
+            window.__camoufoxDomStable = { last: performance.now() };
+            new MutationObserver(() => { window.__camoufoxDomStable.last = performance.now(); })
+                .observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+            return false;
+        }
+        return performance.now() - window.__camoufoxDomStable.last >= ms;
+    }
+'''
+
+POLLING_MS = 100
+
+
+class NetworkTracker:
+    """
+    Запросы страницы в полёте по событиям Playwright (request / requestfinished / requestfailed).
+    В отличие от performance.getEntriesByType('resource') видит незавершённые запросы
+    и не упирается в размер буфера Resource Timing (250 записей по умолчанию).
+    """
+
+    def __init__(self, page: Page):
+        self._pending: set[Request] = set()
+        self._last_activity = time.monotonic()
+        page.on("request", self._started)
+        page.on("requestfinished", self._finished)
+        page.on("requestfailed", self._finished)
+
+    def _started(self, request: Request):
+        self._pending.add(request)
+        self._last_activity = time.monotonic()
+
+    def _finished(self, request: Request):
+        self._pending.discard(request)
+        self._last_activity = time.monotonic()
+
+    def quiet_seconds(self) -> float:
+        """Сколько секунд нет ни одного запроса в полёте (0 — запросы есть)."""
+        if self._pending:
+            return 0.0
+        return time.monotonic() - self._last_activity
+
+
+_trackers: "weakref.WeakKeyDictionary[Page, NetworkTracker]" = weakref.WeakKeyDictionary()
+
+
+def track_network(page: Page) -> NetworkTracker:
+    """
+    Учёт запросов страницы; подключается при создании страницы, до первой навигации,
+    иначе запросы, начатые раньше, не видны.
+    """
+    tracker = _trackers.get(page)
+    if tracker is None:
+        tracker = _trackers[page] = NetworkTracker(page)
+    return tracker
+
+
+async def _wait_network_quiet(page: Page, ms: int, timeout_ms: float):
+    tracker = track_network(page)
+    deadline = time.monotonic() + timeout_ms / 1000
+    while tracker.quiet_seconds() * 1000 < ms:
+        if time.monotonic() >= deadline:
+            raise PlaywrightTimeoutError(f"Сеть не затихла на {ms} мс за {timeout_ms:.0f} мс")
+        await asyncio.sleep(POLLING_MS / 1000)
+
+
+async def wait_until_ready(
+        page: Page,
+        timeout_seconds: float,
+        selector: Optional[str] = None,
+        network_idle_ms: Optional[int] = None,
+        js_predicate: Optional[str] = None,
+        dom_stable_ms: Optional[int] = None,
+) -> tuple[bool, float]:
+    """
+    Ожидание готовности страницы по условиям вместо фиксированной паузы.
+    Все заданные условия должны выполниться; timeout_seconds — общая верхняя граница.
+    selector — CSS или XPath (с префиксом xpath= или начинающийся с //).
+    Возвращает (условия выполнены, фактическое время ожидания в секундах).
+    Некорректный селектор или выбрасывающий js_predicate — InvalidPageInputException.
+    """
+    started = time.monotonic()
+    deadline = started + timeout_seconds
+
+    def remaining_ms() -> float:
+        # timeout=0 в Playwright означает «без ограничения», поэтому не опускаемся ниже 1 мс
+        return max(1.0, (deadline - time.monotonic()) * 1000)
+
+    try:
+        if selector:
+            await page.wait_for_selector(selector, state="attached", timeout=remaining_ms())
+        if js_predicate:
+            await page.wait_for_function(js_predicate, polling=POLLING_MS, timeout=remaining_ms())
+        if network_idle_ms:
+            await _wait_network_quiet(page, network_idle_ms, remaining_ms())
+        if dom_stable_ms:
+            await page.wait_for_function(
+                _DOM_STABLE_SCRIPT, arg=dom_stable_ms, polling=POLLING_MS, timeout=remaining_ms()
+            )
+        ready = True
+    except PlaywrightTimeoutError:
+        logger.warning(f"⏳ Условия готовности не выполнены за {timeout_seconds} секунд: {page.url}")
+        ready = False
+    except PlaywrightError as e:
+        if classify_navigation_error(e) == "browser":
+            raise
+        raise InvalidPageInputException(f"Условие готовности не может быть проверено: {e}")
+
+    return ready, time.monotonic() - started
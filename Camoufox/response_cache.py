@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from configure_logger import configure
+
+logger = logging.getLogger(__name__)
+configure(logger)
+
+
+def normalize_url(url: str) -> str:
+    """Нормализация URL для ключа кэша: регистр схемы/хоста, порядок параметров, без фрагмента."""
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    path = parts.path or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ""))
+
+
+def make_cache_key(url: str, options: dict) -> str:
+    """Ключ кэша: нормализованный URL плюс параметры рендера."""
+    payload = json.dumps({"url": normalize_url(url), "options": options}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CacheEntry:
+    def __init__(self, content: str, headers: dict[str, str], created_at: Optional[float] = None):
+        self.content = content
+        self.headers = headers
+        self.created_at = created_at if created_at is not None else time.time()
+        self.size = len(content.encode("utf-8"))
+
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+
+class ResponseCache:
+    """
+    Кэш отрендеренных страниц с TTL и LRU-вытеснением по объёму памяти,
+    необязательным дисковым уровнем и объединением одинаковых одновременных запросов.
+    """
+
+    def __init__(self, max_bytes: int, disk_path: Optional[str] = None, disk_max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.disk_path = disk_path
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._memory_bytes = 0
+        # Начатые рендеры по ключу: задача и rank, с которым она начата
+        self._inflight: dict[str, tuple[asyncio.Task, int]] = {}
+        self._waiters: dict[asyncio.Task, int] = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    async def get_or_render(
+            self,
+            key: str,
+            max_age: float,
+            no_cache: bool,
+            render: Callable[[], Awaitable[tuple[str, dict[str, str]]]],
+            rank: int = 0,
+    ) -> tuple[str, dict[str, str]]:
+        """
+        Возвращает свежий ответ из кэша или рендерит страницу.
+        Одновременные запросы с одинаковым ключом ждут один общий рендер, если он начат с тем же
+        или большим rank (вес класса приоритета). Запрос с большим rank не ждёт рендер в низшем классе:
+        он начинает свой, и следующие запросы присоединяются уже к нему.
+        """
+        if not no_cache and max_age > 0:
+            entry = await self._get(key, max_age)
+            if entry is not None:
+                return entry.content, {**entry.headers, "X-Cache": "HIT", "Age": str(int(entry.age()))}
+
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight[1] >= rank:
+            self.coalesced += 1
+            content, headers = await self._wait_shared(inflight[0])
+            return content, {**headers, "X-Cache": "COALESCED"}
+
+        self.misses += 1
+        task = asyncio.ensure_future(self._render_and_store(key, render))
+        self._inflight[key] = (task, rank)
+        task.add_done_callback(lambda t: self._on_render_done(key, t))
+        content, headers = await self._wait_shared(task)
+        return content, {**headers, "X-Cache": "MISS"}
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._memory),
+            "bytes": self._memory_bytes,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+        }
+
+    async def _wait_shared(self, task: asyncio.Task) -> tuple[str, dict[str, str]]:
+        """Ожидание общего рендера; если все ожидающие ушли, рендер отменяется."""
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if self._waiters[task] == 0:
+                del self._waiters[task]
+                if not task.done():
+                    task.cancel()
+
+    async def _render_and_store(self, key: str, render) -> tuple[str, dict[str, str]]:
+        content, headers = await render()
+        entry = CacheEntry(content, headers)
+        self._store_memory(key, entry)
+        if self.disk_path:
+            await asyncio.to_thread(self._store_disk, key, entry)
+        return content, headers
+
+    def _on_render_done(self, key: str, task: asyncio.Task):
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight[0] is task:
+            del self._inflight[key]
+        # Забираем исключение, даже если все ожидающие клиенты уже отключились
+        if not task.cancelled():
+            task.exception()
+
+    async def _get(self, key: str, max_age: float) -> Optional[CacheEntry]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry.age() <= max_age:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry
+            self._drop_memory(key)
+
+        if self.disk_path:
+            entry = await asyncio.to_thread(self._load_disk, key)
+            if entry is not None and entry.age() <= max_age:
+                self._store_memory(key, entry)
+                self.disk_hits += 1
+                return entry
+
+        return None
+
+    def _store_memory(self, key: str, entry: CacheEntry):
+        if entry.size > self.max_bytes:
+            return
+        if key in self._memory:
+            self._drop_memory(key)
+        self._memory[key] = entry
+        self._memory_bytes += entry.size
+        while self._memory_bytes > self.max_bytes:
+            oldest_key = next(iter(self._memory))
+            self._drop_memory(oldest_key)
+            self.evictions += 1
+
+    def _drop_memory(self, key: str):
+        entry = self._memory.pop(key)
+        self._memory_bytes -= entry.size
+
+    def _disk_file(self, key: str) -> str:
+        return os.path.join(self.disk_path, f"{key}.json")
+
+    def _load_disk(self, key: str) -> Optional[CacheEntry]:
+        try:
+            with open(self._disk_file(key), "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️💾 Не удалось прочитать запись кэша {key}: {e}")
+            return None
+        return CacheEntry(data["content"], data["headers"], data["created_at"])
+
+    def _store_disk(self, key: str, entry: CacheEntry):
+        try:
+            os.makedirs(self.disk_path, exist_ok=True)
+            tmp_path = self._disk_file(key) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump({"content": entry.content, "headers": entry.headers, "created_at": entry.created_at}, file)
+            os.replace(tmp_path, self._disk_file(key))
+            self._trim_disk()
+        except Exception as e:
+            logger.warning(f"⚠️💾 Не удалось сохранить запись кэша {key} на диск: {e}")
+
+    def _trim_disk(self):
+        files = [os.path.join(self.disk_path, name) for name in os.listdir(self.disk_path) if name.endswith(".json")]
+        files.sort(key=os.path.getmtime)
+        total = sum(os.path.getsize(path) for path in files)
+        while files and total > self.disk_max_bytes:
+            path = files.pop(0)
+            total -= os.path.getsize(path)
+            os.remove(path)
+
@@ -0,0 +1,102 @@
+import fnmatch
+import logging
+from typing import Optional
+from urllib.parse import urlsplit
+
+from playwright.async_api import Page, Request, Response, Route
+
+import config
+from configure_logger import configure
+
+logger = logging.getLogger(__name__)
+configure(logger)
+
+# Пресеты правил блокировки. Скрипты, документы и xhr/fetch не блокируются,
+# чтобы SPA могла отрисовать DOM.
+PRESETS: dict[str, dict[str, list[str]]] = {
+    "html-only": {
+        "resource_types": ["image", "media", "font", "texttrack", "manifest"],
+        "url_patterns": ["*.m3u8*", "*.ts", "*.ts?*", "*.mp4*", "*.webm*"],
+        # Видеосегменты и плейлисты плеера Twitch (идут через fetch, а не media)
+        "domains": ["hls.ttvnw.net", "usher.ttvnw.net"],
+    },
+}
+
+
+class RouteBlocker:
+    """
+    Перехват запросов страницы: блокировка по типу ресурса, маске URL или домену со счётчиками.
+    page.route отключает HTTP-кэш страницы, поэтому запросы с блокировкой не пользуются дисковым кэшем
+    постоянного профиля (WARM_PROFILE_DIR) — остаются только прогретые соединения и куки.
+    """
+
+    def __init__(self, resource_types: set[str], url_patterns: list[str], domains: list[str]):
+        self.resource_types = resource_types
+        self.url_patterns = url_patterns
+        self.domains = domains
+        self.blocked = 0
+        self.loaded_bytes = 0
+
+    @classmethod
+    def from_rules(
+            cls,
+            preset: Optional[str] = None,
+            resource_types: Optional[list[str]] = None,
+            url_patterns: Optional[list[str]] = None,
+            domains: Optional[list[str]] = None,
+    ) -> Optional["RouteBlocker"]:
+        """
+        Объединяет глобальные правила из config, пресет и правила запроса.
+        Возвращает None, если блокировать нечего — тогда перехват не ставится вовсе.
+        """
+        rules = {
+            "resource_types": list(config.BLOCK_RESOURCE_TYPES) + (resource_types or []),
+            "url_patterns": list(config.BLOCK_URL_PATTERNS) + (url_patterns or []),
+            "domains": list(config.BLOCK_DOMAINS) + (domains or []),
+        }
+        if preset:
+            if preset not in PRESETS:
+                raise ValueError(f"Неизвестный пресет блокировки: {preset}")
+            for name, values in PRESETS[preset].items():
+                rules[name] += values
+
+        if not any(rules.values()):
+            return None
+        return cls(set(rules["resource_types"]), rules["url_patterns"], rules["domains"])
+
+    def should_block(self, request: Request) -> bool:
+        if request.resource_type in self.resource_types:
+            return True
+        host = urlsplit(request.url).hostname or ""
+        if any(host == domain or host.endswith("." + domain) for domain in self.domains):
+            return True
+        return any(fnmatch.fnmatchcase(request.url, pattern) for pattern in self.url_patterns)
+
+    async def attach(self, page: Page):
+        await page.route("**/*", self._handle)
+        page.on("response", self._on_response)
+
+    async def detach(self, page: Page):
+        page.remove_listener("response", self._on_response)
+        try:
+            await page.unroute("**/*", self._handle)
+        except Exception as e:
+            logger.warning(f"⚠️🚧 Не удалось снять перехват запросов: {e}")
+
+    def headers(self) -> dict[str, str]:
+        return {
+            "X-Blocked-Requests": str(self.blocked),
+            "X-Loaded-Bytes": str(self.loaded_bytes),
+        }
+
+    async def _handle(self, route: Route):
+        if self.should_block(route.request):
+            self.blocked += 1
+            await route.abort("blockedbyclient")
+        else:
+            await route.continue_()
+
+    def _on_response(self, response: Response):
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            self.loaded_bytes += int(length)
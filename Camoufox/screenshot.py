@@ -0,0 +1,104 @@
+import base64
+import logging
+from typing import Optional
+
+from playwright.async_api import Error as PlaywrightError, Page
+
+import config
+from browser_utils import classify_navigation_error
+from configure_logger import configure
+from exceptions import InvalidPageInputException
+
+logger = logging.getLogger(__name__)
+configure(logger)
+
+MEDIA_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+
+# Перекодирование и уменьшение снимка внутри браузера: WebP и миниатюры Playwright сам не делает.
+_TRANSCODE_SCRIPT = '''
+    async ([data, mime, quality, width]) => {
+        const bytes = Uint8Array.from(atob(data), c => c.charCodeAt(0));
+        const bitmap = await createImageBitmap(new Blob([bytes]));
+        const scale = width && width < bitmap.width ? width / bitmap.width : 1;
+        const canvas = new OffscreenCanvas(
+            Math.max(1, Math.round(bitmap.width * scale)),
+            Math.max(1, Math.round(bitmap.height * scale)));
+        const context = canvas.getContext('2d');
+        context.imageSmoothingQuality = 'high';
+        context.drawImage(bitmap, 0, 0, canvas.width, canvas.height);
+        bitmap.close();
+        const blob = await canvas.convertToBlob({type: mime, quality: quality / 100});
+        const out = new Uint8Array(await blob.arrayBuffer());
+        let binary = '';
+        for (let i = 0; i < out.length; i += 0x8000) {
+            binary += String.fromCharCode.apply(null, out.subarray(i, i + 0x8000));
+        }
+        return [blob.type, btoa(binary)];
+    }
+'''
+
+_PAGE_SIZE_SCRIPT = '''
+    () => [
+        Math.max(document.documentElement.scrollWidth, document.body ? document.body.scrollWidth : 0),
+        Math.max(document.documentElement.scrollHeight, document.body ? document.body.scrollHeight : 0),
+    ]
+'''
+
+
+async def take_screenshot(page: Page, options: dict) -> Optional[tuple[bytes, str]]:
+    """
+    Снимок страницы по параметрам ScreenshotOptions: формат и качество, clip, элемент по selector,
+    ограничение высоты и миниатюра. Возвращает (байты, media type) или None, если элемент не найден;
+    некорректный selector — InvalidPageInputException.
+    """
+    image_format = options["format"]
+    quality = options.get("quality")
+    thumbnail_width = options.get("thumbnail_width")
+    transcode = image_format == "webp" or thumbnail_width is not None
+
+    # Для перекодирования в браузере снимаем дешёвый JPEG: PNG-кодирование длинной страницы самое дорогое
+    if transcode:
+        kwargs = {"type": "jpeg", "quality": config.SCREENSHOT_TRANSCODE_CAPTURE_QUALITY}
+    else:
+        kwargs = {"type": image_format}
+        if image_format == "jpeg":
+            kwargs["quality"] = quality or config.SCREENSHOT_DEFAULT_QUALITY
+    if thumbnail_width is not None:
+        # миниатюре не нужна плотность пикселей устройства
+        kwargs["scale"] = "css"
+
+    if options.get("selector"):
+        locator = page.locator(options["selector"]).first
+        try:
+            found = await locator.count()
+        except PlaywrightError as e:
+            if classify_navigation_error(e) == "browser":
+                raise
+            raise InvalidPageInputException(f"Некорректный selector скриншота: {e}")
+        if found == 0:
+            return None
+        image = await locator.screenshot(**kwargs)
+    else:
+        clip = options.get("clip")
+        full_page = options.get("full_page", True)
+        max_height = options.get("max_height")
+        if clip is None and full_page and max_height:
+            width, height = await page.evaluate(_PAGE_SIZE_SCRIPT)
+            if height > max_height:
+                clip = {"x": 0, "y": 0, "width": width, "height": max_height}
+        elif clip is not None and max_height:
+            clip = {**clip, "height": min(clip["height"], max_height)}
+        image = await page.screenshot(full_page=full_page, clip=clip, **kwargs)
+
+    if not transcode:
+        return image, MEDIA_TYPES[image_format]
+
+    media_type, data = await page.evaluate(_TRANSCODE_SCRIPT, [
+        base64.b64encode(image).decode("ascii"),
+        MEDIA_TYPES[image_format],
+        quality or config.SCREENSHOT_DEFAULT_QUALITY,
+        thumbnail_width,
+    ])
+    if media_type != MEDIA_TYPES[image_format]:
+        logger.warning(f"⚠️📸 Браузер не поддерживает {MEDIA_TYPES[image_format]}, снимок в {media_type}")
+    return base64.b64decode(data), media_type
@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urlsplit
+
+from playwright.async_api import Browser, Page
+
+import config
+from configure_logger import configure
+from exceptions import AdmissionRejectedException
+from page_pool import PageLease
+from route_rules import RouteBlocker
+
+logger = logging.getLogger(__name__)
+configure(logger)
+
+# Элементы по селектору условия готовности: CSS или XPath (с префиксом xpath= или начинающийся с //).
+_MATCH_SELECTOR_JS = '''
+    (selector) => {
+        if (selector.startsWith('xpath=') || selector.startsWith('//')) {
+            const xpath = selector.startsWith('xpath=') ? selector.slice(6) : selector;
+            const found = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            return Array.from({ length: found.snapshotLength }, (_, i) => found.snapshotItem(i));
+        }
+        return Array.from(document.querySelectorAll(selector));
+    }
+'''
+
+# Переход внутри SPA: клик по ссылке на целевой URL (его перехватит роутер приложения),
+# а без ссылки — history.pushState и popstate. Перед переходом запоминается текст элементов по селектору,
+# чтобы потом отличить разметку нового URL от старой.
+_SOFT_NAVIGATE_SCRIPT = f'''
+    ({{ url, selector, settle }}) => {{
+        const match = {_MATCH_SELECTOR_JS};
+        const target = new URL(url, location.href);
+        window.__camoufoxSoftNav = {{
+            match,
+            selector,
+            settle,
+            before: new Map(match(selector).map(el => [el, el.textContent])),
+            fresh: new Map(),
+        }};
+
+        const link = Array.from(document.querySelectorAll('a[href]'))
+            .find(a => a.href === target.href && (!a.target || a.target === '_self'));
+        if (link) {{
+            link.click();
+            return 'link';
+        }}
+        history.pushState({{}}, '', target.href);
+        window.dispatchEvent(new PopStateEvent('popstate', {{ state: {{}} }}));
+        return 'history';
+    }}
+'''
+
+# Перерисовка под новый URL закончилась: по селектору есть элемент, которого не было до перехода
+# (или чей текст изменился), и его текст не меняется уже settle мс. Мутации в других частях страницы
+# (чат, счётчики) и неизменная разметка старого URL не учитываются.
+_SOFT_NAVIGATE_SETTLED_SCRIPT = '''
+    () => {
+        const state = window.__camoufoxSoftNav;
+        if (!state) {
+            return false;
+        }
+        const now = performance.now();
+        let settled = false;
+        for (const el of state.match(state.selector)) {
+            const text = el.textContent;
+            if (state.before.has(el) && state.before.get(el) === text) {
+                continue;
+            }
+            const seen = state.fresh.get(el);
+            if (!seen || seen.text !== text) {
+                state.fresh.set(el, { text, since: now });
+            } else if (now - seen.since >= state.settle) {
+                settled = true;
+            }
+        }
+        return settled;
+    }
+'''
+
+
+def same_origin(current_url: str, url: str) -> bool:
+    current, target = urlsplit(current_url), urlsplit(url)
+    return current.scheme in ("http", "https") and (current.scheme, current.netloc) == (target.scheme, target.netloc)
+
+
+async def soft_navigate(page: Page, url: str, selector: str, timeout_seconds: float) -> Optional[str]:
+    """
+    Переход на url средствами самого приложения, без перезагрузки страницы и JS-бандла.
+    Переход принят, только когда по selector (условие готовности запроса) появилась новая разметка:
+    любая перерисовка DOM не отличает новый URL от старого.
+    Возвращает способ перехода (link/history) или None, если новая разметка не появилась за timeout_seconds
+    или селектор не разобран в странице — тогда нужен полный переход.
+    """
+    try:
+        mode = await page.evaluate(
+            _SOFT_NAVIGATE_SCRIPT, {"url": url, "selector": selector, "settle": config.SESSION_SPA_SETTLE_MS})
+        await page.wait_for_function(_SOFT_NAVIGATE_SETTLED_SCRIPT, polling=100, timeout=timeout_seconds * 1000)
+    except Exception as e:
+        logger.warning(f"⚠️🧭 Переход внутри приложения на {url} не удался, нужен полный: {e}")
+        return None
+    return mode
+
+
+class PageSession:
+    """Вкладка, закреплённая за клиентом на несколько запросов."""
+
+    def __init__(self, lease: PageLease, blocker: Optional[RouteBlocker], idle_seconds: float):
+        # номер шарда в id нужен супервизору, чтобы запросы сессии попадали в процесс с её вкладкой
+        self.id = f"{config.SHARD_INDEX}-{uuid.uuid4().hex}"
+        self.lease = lease
+        self.blocker = blocker
+        self.idle_seconds = idle_seconds
+        # Запросы одной сессии выполняются по очереди
+        self.lock = asyncio.Lock()
+        self.created_at = time.time()
+        self.last_used = time.monotonic()
+        self.requests = 0
+        self.soft_navigations = 0
+        self.full_navigations = 0
+        self.closed = False
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    def is_idle(self) -> bool:
+        return not self.lock.locked() and time.monotonic() - self.last_used >= self.idle_seconds
+
+    def describe(self) -> dict:
+        return {
+            "id": self.id,
+            "url": self.lease.page.url,
+            "created_at": self.created_at,
+            "idle_seconds": round(time.monotonic() - self.last_used),
+            "expires_in": max(0, round(self.idle_seconds - (time.monotonic() - self.last_used))),
+            "busy": self.lock.locked(),
+            "requests": self.requests,
+            "soft_navigations": self.soft_navigations,
+            "full_navigations": self.full_navigations,
+        }
+
+
+class SessionStore:
+    """
+    Sticky-сессии: вкладка арендуется из пула на несколько запросов, чтобы следующий URL того же приложения
+    открывался переходом внутри SPA, а не холодной загрузкой. Сессий не больше max_sessions;
+    простаивающие дольше своего idle_seconds закрываются фоновой задачей, вкладка возвращается в пул.
+    """
+
+    def __init__(self, max_sessions: int, release: Callable[[PageLease, bool], Awaitable[None]]):
+        self.max_sessions = max_sessions
+        self.release = release
+        self._sessions: dict[str, PageSession] = {}
+        self._opening = 0
+        self._task: Optional[asyncio.Task] = None
+        self.opened = 0
+        self.expired = 0
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        for session in list(self._sessions.values()):
+            await self.discard(session)
+
+    async def open(
+            self,
+            create: Callable[[], Awaitable[tuple[PageLease, Optional[RouteBlocker]]]],
+            idle_seconds: float,
+    ) -> PageSession:
+        """Открывает сессию с вкладкой от create(); при исчерпании лимита — отказ 429."""
+        if len(self._sessions) + self._opening >= self.max_sessions:
+            raise AdmissionRejectedException(
+                429, "Открыто максимальное число сессий", config.SESSION_REAP_INTERVAL_SECONDS)
+        self._opening += 1
+        try:
+            lease, blocker = await create()
+        finally:
+            self._opening -= 1
+
+        session = PageSession(lease, blocker, idle_seconds)
+        self._sessions[session.id] = session
+        self.opened += 1
+        logger.info(f"📌 Сессия {session.id} открыта (простой до {idle_seconds} с)")
+        return session
+
+    def get(self, session_id: str) -> Optional[PageSession]:
+        return self._sessions.get(session_id)
+
+    def describe(self) -> list[dict]:
+        return [session.describe() for session in self._sessions.values()]
+
+    async def close(self, session_id: str) -> bool:
+        """Закрывает сессию после завершения её текущего запроса."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return False
+        async with session.lock:
+            await self.discard(session)
+        return True
+
+    async def close_browser(self, browser: Browser):
+        """Закрывает сессии заменяемого браузера, дождавшись их текущих запросов."""
+        for session in [s for s in self._sessions.values() if s.lease.browser is browser]:
+            async with session.lock:
+                await self.discard(session)
+
+    async def discard(self, session: PageSession, reusable: bool = True):
+        """Закрывает сессию без ожидания блокировки (вызывающий её держит или сессия простаивает)."""
+        if session.closed:
+            return
+        session.closed = True
+        self._sessions.pop(session.id, None)
+        try:
+            if session.blocker:
+                await session.blocker.detach(session.lease.page)
+        except Exception as e:
+            logger.warning(f"⚠️📌 Ошибка снятия блокировок сессии {session.id}: {e}")
+            reusable = False
+        await self.release(session.lease, reusable)
+        logger.info(f"📌 Сессия {session.id} закрыта: запросов {session.requests}, "
+                    f"переходов внутри приложения {session.soft_navigations}, полных {session.full_navigations}")
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "sessions": len(self._sessions),
+            "busy": sum(1 for s in self._sessions.values() if s.lock.locked()),
+            "opened": self.opened,
+            "expired": self.expired,
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(config.SESSION_REAP_INTERVAL_SECONDS)
+            for session in [s for s in self._sessions.values() if s.is_idle()]:
+                # пока закрывалась предыдущая сессия, эту мог занять запрос: проверка повторяется,
+                # и закрытие идёт под блокировкой сессии, чтобы новый запрос её не занял
+                if session.closed or not session.is_idle():
+                    continue
+                async with session.lock:
+                    try:
+                        logger.info(f"⌛📌 Сессия {session.id} простаивает {session.idle_seconds} с, закрываю")
+                        self.expired += 1
+                        await self.discard(session)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        logger.exception(f"⚠️📌 Ошибка закрытия сессии {session.id}: {e}")
@@ -0,0 +1,131 @@
+import zlib
+from typing import Iterator, Optional
+
+from fastapi.responses import StreamingResponse
+
+import config
+
+# brotli и zstandard входят в зависимости образа; без них (локальный запуск) кодировки br/zstd не предлагаются
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def available_encodings() -> list[str]:
+    """Поддерживаемые кодировки сжатия в порядке предпочтения."""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Выбирает кодировку по заголовку Accept-Encoding (с учётом q=0); None — без сжатия."""
+    if not accept_encoding:
+        return None
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    candidates = [
+        encoding for encoding in available_encodings()
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0
+    ]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda encoding: accepted.get(encoding, accepted.get("*", 0.0)))
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._obj = zlib.compressobj(config.STREAM_GZIP_LEVEL, zlib.DEFLATED, 31)
+        elif encoding == "br":
+            self._obj = brotli.Compressor(quality=config.STREAM_BROTLI_QUALITY)
+        elif encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=config.STREAM_ZSTD_LEVEL).compressobj()
+        else:
+            raise ValueError(f"Неизвестная кодировка: {encoding}")
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._obj.process(data)
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        if self.encoding == "br":
+            return self._obj.finish()
+        return self._obj.flush()
+
+
+def utf8_size(text: str) -> int:
+    """Размер текста в UTF-8 без создания полной закодированной копии."""
+    if text.isascii():
+        return len(text)
+    size = config.STREAM_CHUNK_SIZE
+    return sum(len(text[i:i + size].encode("utf-8")) for i in range(0, len(text), size))
+
+
+def iter_text(text: str, encoding: Optional[str]) -> Iterator[bytes]:
+    """Отдаёт текст кусками по STREAM_CHUNK_SIZE, кодируя и сжимая каждый кусок отдельно."""
+    compressor = _Compressor(encoding) if encoding else None
+    size = config.STREAM_CHUNK_SIZE
+    for i in range(0, len(text), size):
+        chunk = text[i:i + size].encode("utf-8")
+        if compressor:
+            chunk = compressor.compress(chunk)
+        if chunk:
+            yield chunk
+    if compressor:
+        tail = compressor.flush()
+        if tail:
+            yield tail
+
+
+def iter_bytes(data: bytes) -> Iterator[bytes]:
+    """Отдаёт байты кусками по STREAM_CHUNK_SIZE, копируя в каждый момент только один кусок."""
+    view = memoryview(data)
+    size = config.STREAM_CHUNK_SIZE
+    for i in range(0, len(view), size):
+        yield bytes(view[i:i + size])
+
+
+def text_stream_response(
+        text: str,
+        media_type: str,
+        headers: dict[str, str],
+        accept_encoding: Optional[str],
+) -> StreamingResponse:
+    """
+    Ответ с chunked-передачей текста и сжатием, согласованным по Accept-Encoding.
+    text уже целиком в памяти (page.content() строит полную строку, её же хранит кэш ответов):
+    здесь не создаются только полная закодированная и полная сжатая копии.
+    """
+    encoding = negotiate_encoding(accept_encoding)
+    headers = {**headers, "Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(iter_text(text, encoding), media_type=media_type, headers=headers)
+
+
+def bytes_stream_response(data: bytes, media_type: str, headers: dict[str, str]) -> StreamingResponse:
+    """Ответ с chunked-передачей двоичных данных (изображения уже сжаты, повторно не сжимаются)."""
+    return StreamingResponse(iter_bytes(data), media_type=media_type, headers=headers)
@@ -0,0 +1,298 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import zlib
+from contextlib import asynccontextmanager
+from typing import Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+import config
+from configure_logger import configure
+from response_cache import normalize_url
+
+logger = logging.getLogger(__name__)
+configure(logger)
+
+# Заголовки, которые не пробрасываются между клиентом и шардом
+_HOP_HEADERS = {"host", "connection", "keep-alive", "transfer-encoding", "content-length"}
+
+
+class Shard:
+    """Рабочий процесс с собственным браузером Camoufox."""
+
+    def __init__(self, index: int, port: int):
+        self.index = index
+        self.port = port
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.ready = False
+        self.inflight = 0
+        self.restarts = 0
+
+    def info(self) -> dict:
+        return {
+            "index": self.index,
+            "port": self.port,
+            "pid": self.process.pid if self.process else None,
+            "ready": self.ready,
+            "inflight": self.inflight,
+            "restarts": self.restarts,
+        }
+
+
+class Supervisor:
+    """
+    Запускает N рабочих процессов camoufox_server, перезапускает упавшие по отдельности
+    и распределяет запросы по наименьшей загрузке или по домену.
+    """
+
+    def __init__(self, count: int, base_port: int, routing: str):
+        self.shards = [Shard(i, base_port + i) for i in range(count)]
+        self.routing = routing
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self):
+        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None))
+        for shard in self.shards:
+            self._tasks.append(asyncio.create_task(self._run_shard(shard)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for shard in self.shards:
+            if shard.process and shard.process.returncode is None:
+                shard.process.terminate()
+                try:
+                    await asyncio.wait_for(shard.process.wait(), timeout=15)
+                except asyncio.TimeoutError:
+                    shard.process.kill()
+        if self.session:
+            await self.session.close()
+
+    async def restart_shard(self, index: int):
+        """Останавливает процесс шарда — монитор поднимет его заново."""
+        shard = self.shards[index]
+        shard.ready = False
+        if shard.process and shard.process.returncode is None:
+            shard.process.terminate()
+
+    def pick(self, url: Optional[str], shard_header: Optional[str]) -> Shard:
+        if shard_header is not None:
+            try:
+                shard = self.shards[int(shard_header)]
+            except (ValueError, IndexError):
+                raise HTTPException(400, f"Неизвестный шард: {shard_header}")
+            if not shard.ready:
+                raise HTTPException(503, f"Шард {shard.index} не готов")
+            return shard
+
+        ready = [shard for shard in self.shards if shard.ready]
+        if not ready:
+            raise HTTPException(503, "Нет готовых шардов")
+
+        if self.routing == "domain" and url:
+            host = urlsplit(url).hostname or ""
+            shard = self.shards[zlib.crc32(host.encode("utf-8")) % len(self.shards)]
+            if shard.ready:
+                return shard
+
+        return min(ready, key=lambda s: s.inflight)
+
+    async def proxy(self, request: Request, path: str) -> StreamingResponse:
+        body = await request.body()
+        url = _target_url(body)
+        shard_header = request.headers.get("X-Shard") or _owner_shard(path)
+        if shard_header is None and request.method == "POST" and path.strip("/") == "watchlist" and url:
+            # URL отслеживается одним шардом: повторная регистрация попадает туда же, а не создаёт вторую запись
+            shard_header = str(zlib.crc32(normalize_url(url).encode("utf-8")) % len(self.shards))
+        shard = self.pick(url, shard_header)
+
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in _HOP_HEADERS}
+        shard.inflight += 1
+        # Пока шард рендерит, клиент может уйти: запрос к шарду отменяется и закрывает соединение,
+        # тогда шард сам отменяет рендер и освобождает вкладку
+        task = asyncio.ensure_future(self.session.request(
+            request.method,
+            f"{shard.base_url}/{path}",
+            params=list(request.query_params.multi_items()),
+            data=body,
+            headers=headers,
+            auto_decompress=False,
+        ))
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=1)
+                if done:
+                    upstream = task.result()
+                    break
+                if await request.is_disconnected():
+                    logger.warning(f"🔌 Клиент отключился, отменяю запрос к шарду {shard.index}: /{path}")
+                    raise HTTPException(499, "Клиент закрыл соединение")
+        except aiohttp.ClientError as e:
+            shard.inflight -= 1
+            logger.warning(f"⚠️🔀 Шард {shard.index} недоступен: {e}")
+            raise HTTPException(502, f"Шард {shard.index} недоступен: {e!s}")
+        except BaseException:
+            task.cancel()
+            shard.inflight -= 1
+            raise
+
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                if upstream.content.at_eof():
+                    upstream.release()
+                else:
+                    # клиент ушёл, не дочитав ответ: соединение с шардом закрывается, а не возвращается в пул
+                    upstream.close()
+                shard.inflight -= 1
+
+        async def body_iter():
+            try:
+                async for chunk in upstream.content.iter_any():
+                    yield chunk
+            finally:
+                release()
+
+        response_headers = {
+            k: v for k, v in upstream.headers.items()
+            if k.lower() not in _HOP_HEADERS and k.lower() not in ("date", "server")
+        }
+        response_headers["X-Shard"] = str(shard.index)
+        return StreamingResponse(
+            body_iter(),
+            status_code=upstream.status,
+            headers=response_headers,
+            background=BackgroundTask(release),
+        )
+
+    async def watchlist(self) -> list[dict]:
+        """Список отслеживания всех шардов: у каждого шарда свои записи."""
+
+        async def fetch(shard: Shard) -> list[dict]:
+            try:
+                async with self.session.get(
+                        f"{shard.base_url}/watchlist", timeout=aiohttp.ClientTimeout(total=10)) as response:
+                    response.raise_for_status()
+                    return await response.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"⚠️🔀 Список отслеживания шарда {shard.index} недоступен: {e}")
+                return []
+
+        lists = await asyncio.gather(*(fetch(shard) for shard in self.shards if shard.ready))
+        return [entry for entries in lists for entry in entries]
+
+    async def _run_shard(self, shard: Shard):
+        while True:
+            logger.info(f"🔀 Запуск шарда {shard.index} на порту {shard.port}")
+            shard.process = await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "uvicorn", "camoufox_server:app",
+                "--host", "127.0.0.1", "--port", str(shard.port), "--log-level", "warning",
+                env={**os.environ, "CAMOUFOX_SHARD": str(shard.index)},
+            )
+            ready_task = asyncio.create_task(self._wait_ready(shard))
+            code = await shard.process.wait()
+            ready_task.cancel()
+            shard.ready = False
+            shard.restarts += 1
+            logger.warning(f"⚠️🔀 Шард {shard.index} завершился с кодом {code}, перезапуск через "
+                           f"{config.RESTART_DELAY_SECONDS} секунд")
+            await asyncio.sleep(config.RESTART_DELAY_SECONDS)
+
+    async def _wait_ready(self, shard: Shard):
+        while True:
+            try:
+                async with self.session.get(f"{shard.base_url}/health", timeout=aiohttp.ClientTimeout(total=3)) as r:
+                    if r.status == 200:
+                        shard.ready = True
+                        logger.info(f"✅🔀 Шард {shard.index} готов")
+                        return
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                pass
+            await asyncio.sleep(1)
+
+
+def _target_url(body: bytes) -> Optional[str]:
+    """URL целевой страницы из тела запроса (для маршрутизации по домену)."""
+    try:
+        payload = json.loads(body) if body else None
+    except ValueError:
+        return None
+    if isinstance(payload, list) and payload:
+        payload = payload[0]
+    if isinstance(payload, dict) and isinstance(payload.get("url"), str):
+        return payload["url"]
+    return None
+
+
+def _owner_shard(path: str) -> Optional[str]:
+    """
+    Шард задания, сессии или записи списка отслеживания по id (префикс «номер шарда-»): опрос, запросы
+    в сессии и удаление должны попасть в процесс, который ими владеет.
+    """
+    parts = path.strip("/").split("/")
+    if len(parts) >= 2 and parts[0] in ("jobs", "sessions", "watchlist"):
+        prefix = parts[1].partition("-")[0]
+        if prefix.isdigit():
+            return prefix
+    return None
+
+
+def create_app(supervisor: Supervisor) -> FastAPI:
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await supervisor.start()
+        yield
+        await supervisor.stop()
+
+    app = FastAPI(
+        title="Camoufox supervisor",
+        lifespan=lifespan,
+        description="Распределение запросов по шардам Camoufox",
+        version="1.0.0"
+    )
+
+    @app.get("/health")
+    async def health() -> dict:
+        """Проверка состояния супервизора и шардов."""
+        return {
+            "status": "ok",
+            "service": "camoufox-supervisor",
+            "shards": [shard.info() for shard in supervisor.shards],
+        }
+
+    @app.post("/restart-shard/{index}")
+    async def restart_shard(index: int):
+        """Перезапуск процесса одного шарда."""
+        if not 0 <= index < len(supervisor.shards):
+            raise HTTPException(404, f"Неизвестный шард: {index}")
+        await supervisor.restart_shard(index)
+        return {"status": "success", "message": f"Шард {index} перезапускается"}
+
+    @app.get("/watchlist")
+    async def list_watchlist() -> list[dict]:
+        """Записи списка отслеживания всех шардов."""
+        return await supervisor.watchlist()
+
+    @app.api_route("/{path:path}", methods=["GET", "POST", "DELETE"], include_in_schema=False)
+    async def proxy(path: str, request: Request):
+        return await supervisor.proxy(request, path)
+
+    return app
+
+
+def run_supervisor():
+    supervisor = Supervisor(config.SHARDS, config.SHARD_BASE_PORT, config.SHARD_ROUTING)
+    uvicorn.run(create_app(supervisor), host="0.0.0.0", port=8080, log_level="info")
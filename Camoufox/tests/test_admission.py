@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import pytest
+
+from admission import AdmissionController
+from exceptions import AdmissionRejectedException
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _grant_order(controller: AdmissionController, requests: list[tuple[str, str]]) -> list[str]:
+    """Занимает все слоты, ставит запросы в очередь и возвращает порядок, в котором они получили слот."""
+    held = [controller.try_acquire(key="holder") for _ in range(controller.slots)]
+    order = []
+
+    async def worker(name: str, priority: str, key: str):
+        acquired_at = await controller.acquire(priority=priority, key=key)
+        order.append(name)
+        controller.release(acquired_at, priority, key)
+
+    tasks = [
+        asyncio.create_task(worker(f"{priority[0]}{i}", priority, key))
+        for i, (priority, key) in enumerate(requests)
+    ]
+    await asyncio.sleep(0)
+    for acquired_at in held:
+        controller.release(acquired_at, key="holder")
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_slots_are_shared_by_priority_weight():
+    async def scenario():
+        controller = AdmissionController(slots=1, queue_depth=100)
+        requests = [("background", "")] * 4 + [("interactive", "")] * 4
+        return await _grant_order(controller, requests)
+
+    assert run(scenario()) == ["i4", "b0", "i5", "i6", "i7", "b1", "b2", "b3"]
+
+
+def test_per_key_cap_applies_only_while_other_keys_wait():
+    async def scenario():
+        controller = AdmissionController(slots=2, queue_depth=100)
+        alone = await _grant_order(controller, [("normal", "a")] * 3)
+        assert controller.stats()["in_use"] == 0
+
+        blocker = controller.try_acquire(key="a")
+        other = controller.try_acquire(key="c")
+        waiting = [asyncio.create_task(controller.acquire(key=key)) for key in ("a", "b")]
+        await asyncio.sleep(0)
+        controller.release(other, key="c")
+        granted_b = await waiting[1]
+        assert not waiting[0].done()
+        controller.release(blocker, key="a")
+        controller.release(await waiting[0], key="a")
+        controller.release(granted_b, key="b")
+        return alone
+
+    assert run(scenario()) == ["n0", "n1", "n2"]
+
+
+def test_full_queue_is_rejected_with_429():
+    async def scenario():
+        controller = AdmissionController(slots=1, queue_depth=1)
+        controller.try_acquire()
+        queued = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejectedException) as error:
+            await controller.acquire()
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        return error.value, controller.stats()
+
+    error, stats = run(scenario())
+    assert error.status_code == 429
+    assert stats["rejected_queue_full"] == 1
+    assert stats["waiting"] == 0
+
+
+def test_deadline_rejects_before_and_while_queued():
+    async def scenario():
+        controller = AdmissionController(slots=1, queue_depth=10)
+        controller.try_acquire()
+        with pytest.raises(AdmissionRejectedException) as expired:
+            await controller.acquire(deadline=time.monotonic() - 1)
+        with pytest.raises(AdmissionRejectedException) as in_queue:
+            await controller.acquire(deadline=time.monotonic() + 0.05)
+        return expired.value, in_queue.value, controller.stats()
+
+    expired, in_queue, stats = run(scenario())
+    assert expired.status_code == in_queue.status_code == 503
+    assert stats["rejected_deadline"] == 2
+    assert stats["waiting"] == 0
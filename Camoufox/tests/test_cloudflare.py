@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+import cloudflare
+import metrics
+
+
+class FakePage:
+    def __init__(self, verdict):
+        self.verdict = verdict
+        self.calls = []
+
+    async def evaluate(self, script, arg=None):
+        self.calls.append((script, arg))
+        return self.verdict
+
+
+@pytest.mark.parametrize("verdict, expected", [
+    ({"challenge": False, "reason": None, "title": "Example"}, False),
+    ({"challenge": True, "reason": "content", "title": ""}, True),
+    ({"challenge": True, "reason": "title", "title": "Just a moment..."}, True),
+    ({"challenge": True, "reason": "element", "title": ""}, True),
+])
+def test_check_cloudflare_uses_one_probe(verdict, expected):
+    page = FakePage(verdict)
+    checks = metrics.CLOUDFLARE_CHECKS._values[()]
+
+    assert asyncio.run(cloudflare.check_cloudflare(page)) is expected
+    assert len(page.calls) == 1
+    assert page.calls[0][1] == [cloudflare._CONTENT_MARKERS, cloudflare._TITLE_MARKERS]
+    assert metrics.CLOUDFLARE_CHECKS._values[()] == checks + 1
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+import config
+from domain_health import DomainGovernor
+from exceptions import DomainCircuitOpenException
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_limit_grows_additively_and_drops_multiplicatively():
+    governor = DomainGovernor()
+    governor.record("a.com", "success")
+    assert governor._state("a.com").limit == pytest.approx(3 + 1 / 3)
+
+    for _ in range(50):
+        governor.record("a.com", "success")
+    assert governor._state("a.com").limit == config.DOMAIN_MAX_CONCURRENCY
+
+    governor.record("a.com", "challenge")
+    assert governor._state("a.com").limit == config.DOMAIN_MAX_CONCURRENCY * config.DOMAIN_DECREASE_FACTOR
+    governor.record("a.com", "success", latency=config.DOMAIN_SLOW_SECONDS)
+    governor.record("a.com", "rate_limited")
+    governor.record("a.com", "failure")
+    assert governor._state("a.com").limit == config.DOMAIN_MIN_CONCURRENCY
+
+
+def test_waiters_are_admitted_within_the_limit():
+    async def scenario():
+        governor = DomainGovernor()
+        for _ in range(config.DOMAIN_INITIAL_CONCURRENCY):
+            await governor.acquire("a.com")
+        waiter = asyncio.create_task(governor.acquire("a.com"))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        assert not governor.try_acquire("a.com")
+        governor.release("a.com")
+        await waiter
+        return governor._state("a.com").inflight
+
+    assert run(scenario()) == config.DOMAIN_INITIAL_CONCURRENCY
+
+
+def test_breaker_opens_then_half_opens_for_one_probe(monkeypatch):
+    async def scenario():
+        governor = DomainGovernor()
+        for _ in range(config.DOMAIN_BREAKER_MIN_REQUESTS):
+            governor.record("a.com", "failure")
+        assert governor.is_open("a.com")
+        assert governor.circuit_opens == 1
+        with pytest.raises(DomainCircuitOpenException):
+            await governor.acquire("a.com")
+
+        monkeypatch.setattr(config, "DOMAIN_BREAKER_COOLDOWN_SECONDS", 0)
+        await governor.acquire("a.com")
+        assert governor._state("a.com").state == "half_open"
+        with pytest.raises(DomainCircuitOpenException):
+            await governor.acquire("a.com")
+
+        governor.record("a.com", "failure")
+        governor.release("a.com")
+        assert governor.is_open("a.com")
+        assert governor.circuit_opens == 2
+
+        await governor.acquire("a.com")
+        governor.record("a.com", "success")
+        governor.release("a.com")
+        return governor._state("a.com")
+
+    state = run(scenario())
+    assert state.state == "closed"
+    assert state.limit == config.DOMAIN_INITIAL_CONCURRENCY
+
+
+def test_opening_breaker_fails_queued_requests():
+    async def scenario():
+        governor = DomainGovernor()
+        for _ in range(config.DOMAIN_INITIAL_CONCURRENCY):
+            await governor.acquire("a.com")
+        waiter = asyncio.create_task(governor.acquire("a.com"))
+        await asyncio.sleep(0)
+        for _ in range(config.DOMAIN_BREAKER_MIN_REQUESTS):
+            governor.record("a.com", "failure")
+        with pytest.raises(DomainCircuitOpenException):
+            await waiter
+
+    run(scenario())
@@ -0,0 +1,25 @@
+import pytest
+
+import config
+from jobs import check_webhook_url
+
+
+@pytest.mark.parametrize("url", [
+    "ftp://hooks.example.com/x",
+    "/relative",
+    "http://127.0.0.1:8080/hook",
+    "http://10.0.0.5/hook",
+    "http://169.254.169.254/latest/meta-data",
+    "http://[::1]/hook",
+    "http://[::ffff:192.168.1.1]/hook",
+])
+def test_webhook_to_internal_or_non_http_target_is_rejected(url):
+    with pytest.raises(ValueError):
+        check_webhook_url(url)
+
+
+def test_public_and_allowlisted_webhooks_are_accepted(monkeypatch):
+    check_webhook_url("https://hooks.example.com/x")
+    check_webhook_url("http://8.8.8.8/hook")
+    monkeypatch.setattr(config, "JOB_WEBHOOK_ALLOWED_HOSTS", ["10.0.0.5"])
+    check_webhook_url("http://10.0.0.5/hook")
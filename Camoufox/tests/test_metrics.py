@@ -0,0 +1,66 @@
+import pytest
+
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def empty_registry(monkeypatch):
+    monkeypatch.setattr(metrics, "_registry", [])
+    monkeypatch.setattr(metrics, "_collectors", [])
+
+
+def test_counter_renders_each_label_set():
+    counter = metrics.Counter("test_requests_total", "Запросы", ("outcome",))
+    counter.inc(outcome="ok")
+    counter.inc(2, outcome="ok")
+    counter.inc(outcome="error")
+
+    lines = metrics.render_latest().splitlines()
+    assert lines[:2] == ["# HELP test_requests_total Запросы", "# TYPE test_requests_total counter"]
+    assert 'test_requests_total{outcome="ok"} 3.0' in lines
+    assert 'test_requests_total{outcome="error"} 1.0' in lines
+
+
+def test_unlabelled_counter_and_gauge_start_at_zero():
+    metrics.Counter("test_restarts_total", "Перезапуски")
+    gauge = metrics.Gauge("test_inflight", "В работе")
+    gauge.inc(3)
+    gauge.dec()
+
+    lines = metrics.render_latest().splitlines()
+    assert "test_restarts_total 0.0" in lines
+    assert "# TYPE test_inflight gauge" in lines
+    assert "test_inflight 2.0" in lines
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("test_latency_seconds", "Задержка", buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.7, 5):
+        histogram.observe(value)
+
+    lines = metrics.render_latest().splitlines()
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{le="1.0"} 3' in lines
+    assert 'test_latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "test_latency_seconds_sum 6.25" in lines
+    assert "test_latency_seconds_count 4" in lines
+
+
+def test_labelled_histogram_keeps_labels_before_le():
+    histogram = metrics.Histogram("test_phase_seconds", "Фазы", buckets=(1,), labels=("phase",))
+    histogram.observe(0.5, phase="solve")
+
+    lines = metrics.render_latest().splitlines()
+    assert 'test_phase_seconds_bucket{phase="solve",le="1.0"} 1' in lines
+    assert 'test_phase_seconds_sum{phase="solve"} 0.5' in lines
+    assert 'test_phase_seconds_count{phase="solve"} 1' in lines
+
+
+def test_register_stats_exports_counters_with_total_suffix():
+    metrics.register_stats("test_cache", "Кэш", lambda: {"entries": 3, "hits": 7}, counters=["hits"])
+
+    lines = metrics.render_latest().splitlines()
+    assert "# TYPE test_cache_entries gauge" in lines
+    assert "test_cache_entries 3.0" in lines
+    assert "# TYPE test_cache_hits_total counter" in lines
+    assert "test_cache_hits_total 7.0" in lines
@@ -0,0 +1,73 @@
+import asyncio
+
+import config
+from page_pool import PagePool
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+        self.url = "about:blank"
+
+    def on(self, event, handler):
+        pass
+
+    def is_closed(self):
+        return self.closed
+
+    async def goto(self, url):
+        self.url = url
+
+
+class FakeContext:
+    def __init__(self):
+        self.closed = False
+
+    async def new_page(self):
+        return FakePage()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+
+    async def new_context(self, **options):
+        context = FakeContext()
+        self.contexts.append(context)
+        return context
+
+
+def test_isolated_lease_gets_a_fresh_context(monkeypatch):
+    monkeypatch.setattr(config, "PAGE_POOL_CLEAR_STORAGE", True)
+
+    async def scenario():
+        pool, browser = PagePool(), FakeBrowser()
+        first = await pool.acquire(browser)
+        await pool.release(first)
+        await asyncio.sleep(0)
+        second = await pool.acquire(browser)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.context.closed
+    assert second.context is not first.context
+    assert second.warm
+
+
+def test_lease_is_reused_without_isolation(monkeypatch):
+    monkeypatch.setattr(config, "PAGE_POOL_CLEAR_STORAGE", False)
+
+    async def scenario():
+        pool, browser = PagePool(), FakeBrowser()
+        first = await pool.acquire(browser)
+        first.page.url = "https://example.com/"
+        await pool.release(first)
+        second = await pool.acquire(browser)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert second is first
+    assert second.page.url == "about:blank"
@@ -0,0 +1,54 @@
+import asyncio
+
+import readiness
+
+
+class FakePage:
+    url = "https://example.com/"
+
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def emit(self, event, request):
+        for handler in self.handlers.get(event, []):
+            handler(request)
+
+
+def test_network_is_not_quiet_while_request_in_flight():
+    async def scenario():
+        page = FakePage()
+        readiness.track_network(page)
+        page.emit("request", "slow")
+        ready_early, _ = await readiness.wait_until_ready(page, 0.3, network_idle_ms=100)
+
+        async def finish_later():
+            await asyncio.sleep(0.1)
+            page.emit("requestfinished", "slow")
+
+        finisher = asyncio.create_task(finish_later())
+        ready, elapsed = await readiness.wait_until_ready(page, 2, network_idle_ms=100)
+        await finisher
+        return ready_early, ready, elapsed
+
+    ready_early, ready, elapsed = asyncio.run(scenario())
+    assert not ready_early
+    assert ready
+    assert elapsed >= 0.2
+
+
+def test_failed_request_counts_as_finished():
+    async def scenario():
+        page = FakePage()
+        tracker = readiness.track_network(page)
+        page.emit("request", "blocked")
+        pending = tracker.quiet_seconds()
+        page.emit("requestfailed", "blocked")
+        await asyncio.sleep(0.05)
+        return pending, tracker.quiet_seconds()
+
+    pending, quiet = asyncio.run(scenario())
+    assert pending == 0
+    assert quiet >= 0.05
@@ -0,0 +1,160 @@
+import asyncio
+
+from response_cache import ResponseCache, make_cache_key
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_cache_key_ignores_query_order_and_fragment():
+    assert make_cache_key("HTTPS://A.com/x?b=2&a=1#top", {}) == make_cache_key("https://a.com/x?a=1&b=2", {})
+    assert make_cache_key("https://a.com/x", {"wait_time": 1}) != make_cache_key("https://a.com/x", {"wait_time": 2})
+
+
+def test_identical_requests_share_one_render():
+    async def scenario():
+        cache = ResponseCache(max_bytes=1024)
+        calls = 0
+        release = asyncio.Event()
+
+        async def render():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "html", {}
+
+        first = asyncio.create_task(cache.get_or_render("k", 60, False, render))
+        second = asyncio.create_task(cache.get_or_render("k", 60, False, render))
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(first, second)
+        hit = await cache.get_or_render("k", 60, False, render)
+        return calls, results, hit
+
+    calls, results, hit = run(scenario())
+    assert calls == 1
+    assert sorted(headers["X-Cache"] for _, headers in results) == ["COALESCED", "MISS"]
+    assert hit[1]["X-Cache"] == "HIT"
+
+
+def test_render_is_cancelled_when_all_waiters_leave():
+    async def scenario():
+        cache = ResponseCache(max_bytes=1024)
+        cancelled = asyncio.Event()
+
+        async def render():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return "html", {}
+
+        waiter = asyncio.create_task(cache.get_or_render("k", 60, False, render))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        await asyncio.sleep(0)
+        return cache.stats()["inflight"]
+
+    assert run(scenario()) == 0
+
+
+def test_foreground_request_does_not_join_background_render():
+    async def scenario():
+        cache = ResponseCache(max_bytes=1024)
+        background_release = asyncio.Event()
+        renders = []
+
+        def render_as(name, release=None):
+            async def render():
+                renders.append(name)
+                if release:
+                    await release.wait()
+                return name, {}
+            return render
+
+        # фоновое обновление (no_cache, низший rank) ещё идёт
+        background = asyncio.create_task(
+            cache.get_or_render("k", 60, True, render_as("background", background_release), rank=1))
+        await asyncio.sleep(0)
+        # интерактивный запрос не ждёт его, а рендерит сам
+        content, headers = await asyncio.wait_for(
+            cache.get_or_render("k", 60, False, render_as("interactive"), rank=6), 1)
+        background_release.set()
+        await background
+        return renders, content, headers
+
+    renders, content, headers = run(scenario())
+    assert renders == ["background", "interactive"]
+    assert content == "interactive"
+    assert headers["X-Cache"] == "MISS"
+
+
+def test_background_request_joins_foreground_render():
+    async def scenario():
+        cache = ResponseCache(max_bytes=1024)
+        release = asyncio.Event()
+        calls = 0
+
+        async def render():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "html", {}
+
+        foreground = asyncio.create_task(cache.get_or_render("k", 60, False, render, rank=6))
+        await asyncio.sleep(0)
+        background = asyncio.create_task(cache.get_or_render("k", 60, True, render, rank=1))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(foreground, background)
+        return calls, background.result()[1]["X-Cache"]
+
+    assert run(scenario()) == (1, "COALESCED")
+
+
+def _rendering(content):
+    async def render():
+        return content, {}
+    return render
+
+
+def test_expired_entry_is_rendered_again():
+    async def scenario():
+        cache = ResponseCache(max_bytes=1024)
+        await cache.get_or_render("k", 60, False, _rendering("old"))
+        cache._memory["k"].created_at -= 120
+        return await cache.get_or_render("k", 60, False, _rendering("new"))
+
+    content, headers = run(scenario())
+    assert (content, headers["X-Cache"]) == ("new", "MISS")
+
+
+def test_memory_is_evicted_lru_by_bytes():
+    async def scenario():
+        cache = ResponseCache(max_bytes=10)
+        await cache.get_or_render("a", 60, False, _rendering("aaaa"))
+        await cache.get_or_render("b", 60, False, _rendering("bbbb"))
+        await cache.get_or_render("a", 60, False, _rendering("aaaa"))
+        await cache.get_or_render("c", 60, False, _rendering("cccc"))
+        await cache.get_or_render("huge", 60, False, _rendering("x" * 11))
+        return cache
+
+    cache = run(scenario())
+    assert list(cache._memory) == ["a", "c"]
+    assert cache.stats()["bytes"] == 8
+    assert cache.evictions == 1
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    async def scenario():
+        first = ResponseCache(max_bytes=1024, disk_path=str(tmp_path), disk_max_bytes=1024 ** 2)
+        await first.get_or_render("k", 60, False, _rendering("html"))
+        second = ResponseCache(max_bytes=1024, disk_path=str(tmp_path), disk_max_bytes=1024 ** 2)
+        return second, await second.get_or_render("k", 60, False, _rendering("other"))
+
+    cache, (content, headers) = run(scenario())
+    assert (content, headers["X-Cache"]) == ("html", "HIT")
+    assert cache.disk_hits == 1
@@ -0,0 +1,41 @@
+import asyncio
+from types import SimpleNamespace
+
+import config
+from sessions import SessionStore
+
+
+def test_reaper_skips_session_taken_while_closing_another(monkeypatch):
+    monkeypatch.setattr(config, "SESSION_REAP_INTERVAL_SECONDS", 0)
+
+    async def scenario():
+        release_started = asyncio.Event()
+        finish_release = asyncio.Event()
+        released = []
+
+        async def release(lease, reusable):
+            released.append(lease)
+            release_started.set()
+            await finish_release.wait()
+
+        store = SessionStore(max_sessions=2, release=release)
+
+        async def create():
+            return SimpleNamespace(page=SimpleNamespace(url="about:blank"), browser=None), None
+
+        first = await store.open(create, idle_seconds=0)
+        second = await store.open(create, idle_seconds=0)
+        store.start()
+        await asyncio.wait_for(release_started.wait(), 1)
+        # пока закрывается первая сессия, запрос клиента занимает вторую
+        async with second.lock:
+            second.touch()
+            finish_release.set()
+            await asyncio.sleep(0.01)
+            in_use_closed = second.closed
+        await store.stop()
+        return first.closed, in_use_closed
+
+    first_closed, in_use_closed = asyncio.run(scenario())
+    assert first_closed
+    assert not in_use_closed
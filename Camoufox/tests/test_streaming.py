@@ -0,0 +1,63 @@
+import gzip
+
+import pytest
+
+import config
+import streaming
+
+
+@pytest.fixture
+def gzip_only(monkeypatch):
+    monkeypatch.setattr(streaming, "brotli", None)
+    monkeypatch.setattr(streaming, "zstandard", None)
+
+
+@pytest.fixture
+def all_encodings(monkeypatch):
+    monkeypatch.setattr(streaming, "brotli", object())
+    monkeypatch.setattr(streaming, "zstandard", object())
+
+
+def test_available_encodings_follow_installed_packages(gzip_only):
+    assert streaming.available_encodings() == ["gzip"]
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, deflate, br, zstd", "zstd"),
+    ("br;q=1.0, zstd;q=0.5, gzip;q=0.8", "br"),
+    ("zstd;q=0, br;q=0, gzip", "gzip"),
+    ("zstd;q=0, br;q=0", None),
+    ("*", "zstd"),
+    ("*;q=0.1, gzip;q=0.9", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip;q=abc", None),
+])
+def test_negotiate_encoding(all_encodings, header, expected):
+    assert streaming.negotiate_encoding(header) == expected
+
+
+def test_negotiate_encoding_without_optional_packages(gzip_only):
+    assert streaming.negotiate_encoding("br, zstd") is None
+    assert streaming.negotiate_encoding("br, gzip;q=0.5") == "gzip"
+
+
+def test_iter_text_chunks_round_trip(monkeypatch):
+    monkeypatch.setattr(config, "STREAM_CHUNK_SIZE", 7)
+    text = "<p>Привет, мир!</p>" * 20
+    assert b"".join(streaming.iter_text(text, None)) == text.encode("utf-8")
+    assert gzip.decompress(b"".join(streaming.iter_text(text, "gzip"))).decode("utf-8") == text
+
+
+def test_utf8_size_matches_encoded_length(monkeypatch):
+    monkeypatch.setattr(config, "STREAM_CHUNK_SIZE", 5)
+    for text in ("ascii only", "кириллица и 😀", ""):
+        assert streaming.utf8_size(text) == len(text.encode("utf-8"))
+
+
+def test_iter_bytes_chunks(monkeypatch):
+    monkeypatch.setattr(config, "STREAM_CHUNK_SIZE", 4)
+    assert list(streaming.iter_bytes(b"0123456789")) == [b"0123", b"4567", b"89"]
@@ -0,0 +1,38 @@
+import asyncio
+
+from supervisor import Supervisor
+
+
+class FakeRequest:
+    method = "POST"
+    headers = {}
+
+    def __init__(self, body: bytes):
+        self._body = body
+
+    async def body(self) -> bytes:
+        return self._body
+
+
+def test_same_url_is_watched_by_one_shard():
+    supervisor = Supervisor(4, 9000, "least")
+    for shard in supervisor.shards:
+        shard.ready = True
+    picked = []
+
+    def pick(url, shard_header):
+        picked.append(shard_header)
+        raise RuntimeError("stop")
+
+    supervisor.pick = pick
+
+    async def register(url: str):
+        try:
+            await supervisor.proxy(FakeRequest(f'{{"url": "{url}"}}'.encode()), "watchlist")
+        except RuntimeError:
+            pass
+
+    asyncio.run(register("https://www.twitch.tv/some_channel?b=2&a=1"))
+    asyncio.run(register("https://WWW.twitch.tv/some_channel?a=1&b=2"))
+    assert picked[0] is not None
+    assert picked[0] == picked[1]
@@ -0,0 +1,43 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from exceptions import AdmissionRejectedException
+from watchlist import Watchlist
+
+
+def make_watchlist(pages: dict[str, str], max_bytes: int) -> Watchlist:
+    async def render(request):
+        return pages[request.url], {}
+
+    return Watchlist(max_entries=10, max_bytes=max_bytes, render=render, has_idle_capacity=lambda: True)
+
+
+def test_refresh_that_exceeds_byte_budget_keeps_previous_result():
+    pages = {"https://a.com/": "a" * 60, "https://b.com/": "b" * 30}
+    watchlist = make_watchlist(pages, max_bytes=100)
+    a = watchlist.add("a", SimpleNamespace(url="https://a.com/"), 60, 0)
+    b = watchlist.add("b", SimpleNamespace(url="https://b.com/"), 60, 0)
+
+    async def scenario():
+        await watchlist._refresh(a)
+        await watchlist._refresh(b)
+        pages["https://b.com/"] = "b" * 50
+        await watchlist._refresh(b)
+
+    asyncio.run(scenario())
+    assert watchlist.stats()["bytes"] == 90
+    assert b.content == "b" * 30
+    assert b.error_status == 507
+
+
+def test_registration_is_refused_when_byte_budget_is_used_up():
+    watchlist = make_watchlist({"https://a.com/": "a" * 100}, max_bytes=100)
+    a = watchlist.add("a", SimpleNamespace(url="https://a.com/"), 60, 0)
+    asyncio.run(watchlist._refresh(a))
+    with pytest.raises(AdmissionRejectedException):
+        watchlist.add("b", SimpleNamespace(url="https://b.com/"), 60, 0)
+    watchlist.remove("a")
+    assert watchlist.stats()["bytes"] == 0
+    watchlist.add("b", SimpleNamespace(url="https://b.com/"), 60, 0)
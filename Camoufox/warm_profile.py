@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import os
+import shutil
+import time
+from typing import Callable, Optional
+
+from camoufox.async_api import AsyncCamoufox
+from playwright.async_api import BrowserContext, Page
+
+import config
+from browser_fingerprint import browser_options
+from configure_logger import configure
+
+logger = logging.getLogger(__name__)
+configure(logger)
+
+
+class SharedContext:
+    """
+    Контекст аренды внутри общего постоянного контекста: страницы свои, куки, хранилище и кэш общие.
+    close() закрывает только свои страницы, clear_cookies() ничего не делает — куки общего профиля
+    (в том числе clearance) нужны параллельным страницам и следующим запускам. По той же причине
+    пул не очищает localStorage/sessionStorage таких страниц (shared_storage).
+    """
+
+    shared_storage = True
+
+    def __init__(self, owner: "PersistentProfileBrowser"):
+        self._owner = owner
+        self._pages: list[Page] = []
+
+    @property
+    def pages(self) -> list[Page]:
+        return [page for page in self._pages if not page.is_closed()]
+
+    async def new_page(self) -> Page:
+        page = await self._owner.context.new_page()
+        self._pages.append(page)
+        return page
+
+    async def add_cookies(self, cookies: list[dict]):
+        await self._owner.context.add_cookies(cookies)
+
+    async def cookies(self, urls=None) -> list[dict]:
+        return await self._owner.context.cookies(urls)
+
+    async def clear_cookies(self):
+        pass
+
+    async def close(self):
+        self._owner.forget(self)
+        for page in self._pages:
+            if not page.is_closed():
+                await page.close()
+        self._pages.clear()
+
+
+class PersistentProfileBrowser:
+    """Браузер с постоянным профилем: Browser-подобная обёртка над persistent-контекстом Camoufox."""
+
+    def __init__(self, manager: AsyncCamoufox, context: BrowserContext, on_close: Callable[[], None]):
+        self._manager = manager
+        self.context = context
+        self._on_close = on_close
+        self._connected = True
+        self._contexts: list[SharedContext] = []
+        context.on("close", lambda _: self._disconnected())
+
+    @property
+    def contexts(self) -> list[SharedContext]:
+        return list(self._contexts)
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def new_context(self, **options) -> SharedContext:
+        if options:
+            logger.warning(f"⚠️🗂️ Постоянный профиль не поддерживает параметры контекста, игнорирую: {options}")
+        shared = SharedContext(self)
+        self._contexts.append(shared)
+        return shared
+
+    async def new_page(self) -> Page:
+        return await (await self.new_context()).new_page()
+
+    def forget(self, shared: SharedContext):
+        if shared in self._contexts:
+            self._contexts.remove(shared)
+
+    async def __aexit__(self, *args):
+        try:
+            # выход из менеджера закрывает контекст и останавливает драйвер Playwright
+            await self._manager.__aexit__(*args)
+        finally:
+            self._disconnected()
+
+    def _disconnected(self):
+        if self._connected:
+            self._connected = False
+            self._on_close()
+
+
+class WarmProfiles:
+    """
+    Постоянные профили браузера в WARM_PROFILE_DIR с ограниченным дисковым HTTP-кэшем.
+    Firefox блокирует профиль одним процессом, поэтому у каждого шарда свой каталог shard-N, а активный,
+    резервный и заменяемый браузеры получают в нём разные слоты slot-N. Профиль, занятый другим процессом,
+    пропускается и не очищается. После запуска соединения к WARM_PROFILE_PREWARM_URLS прогреваются.
+    """
+
+    def __init__(self, root: str, slots: int):
+        self.root = root
+        self.slots = slots
+        self._in_use: set[int] = set()
+        self._wipe_pending: set[int] = set()
+        self.launches = 0
+        self.wipes = 0
+        self.last_prewarm_seconds = 0.0
+
+    async def launch(self) -> Optional[PersistentProfileBrowser]:
+        """Запускает браузер в свободном слоте; None, если все слоты заняты."""
+        for slot in range(self.slots):
+            if slot in self._in_use:
+                continue
+            path = self._path(slot)
+            if self._locked_by_other_process(path):
+                logger.warning(f"⚠️🗂️ Профиль {path} занят другим процессом, пропускаю слот")
+                continue
+
+            self._in_use.add(slot)
+            try:
+                try:
+                    browser = await self._launch(slot, path)
+                except Exception as e:
+                    if self._locked_by_other_process(path):
+                        # профиль заняли, пока шёл запуск: чужой профиль не очищаем
+                        logger.warning(f"⚠️🗂️ Профиль {path} занят другим процессом ({e}), пропускаю слот")
+                        self._in_use.discard(slot)
+                        continue
+                    # повреждённый профиль не должен мешать запуску: очищаем слот и пробуем ещё раз
+                    logger.warning(f"⚠️🗂️ Браузер с профилем {path} не запустился ({e}), очищаю профиль")
+                    self._wipe_dir(path)
+                    browser = await self._launch(slot, path)
+            except Exception:
+                self._in_use.discard(slot)
+                raise
+
+            self.launches += 1
+            await self._prewarm(browser)
+            return browser
+
+        logger.warning("⚠️🗂️ Свободных слотов постоянного профиля нет, браузер запускается без профиля")
+        return None
+
+    def wipe(self):
+        """Очищает свободные слоты сразу, занятые — при закрытии их браузеров."""
+        for slot in range(self.slots):
+            if slot in self._in_use:
+                self._wipe_pending.add(slot)
+            elif not self._locked_by_other_process(self._path(slot)):
+                self._wipe_dir(self._path(slot))
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "slots_in_use": len(self._in_use),
+            "wipe_pending": len(self._wipe_pending),
+            "launches": self.launches,
+            "wipes": self.wipes,
+            "last_prewarm_ms": round(self.last_prewarm_seconds * 1000),
+        }
+
+    async def _launch(self, slot: int, path: str) -> PersistentProfileBrowser:
+        os.makedirs(path, exist_ok=True)
+        options = browser_options()
+        options["enable_cache"] = True
+        options["firefox_user_prefs"] = {
+            **options.get("firefox_user_prefs", {}),
+            "browser.cache.disk.enable": True,
+            "browser.cache.disk.smart_size.enabled": False,
+            "browser.cache.disk.capacity": config.WARM_PROFILE_CACHE_MB * 1024,
+        }
+        manager = AsyncCamoufox(**options, persistent_context=True, user_data_dir=path)
+        context = await manager.__aenter__()
+        logger.info(f"🗂️ Браузер запущен с постоянным профилем {path}")
+        return PersistentProfileBrowser(manager, context, lambda: self._release(slot))
+
+    async def _prewarm(self, browser: PersistentProfileBrowser):
+        """Открывает лёгкие URL нужных площадок, чтобы DNS, TLS и соединения были готовы к первым запросам."""
+        if not config.WARM_PROFILE_PREWARM_URLS:
+            return
+        started = time.monotonic()
+        shared = await browser.new_context()
+
+        async def visit(url: str):
+            try:
+                page = await shared.new_page()
+                await page.goto(url, wait_until="commit", timeout=config.WARM_PROFILE_PREWARM_TIMEOUT_SECONDS * 1000)
+            except Exception as e:
+                logger.warning(f"⚠️🔥 Не удалось прогреть {url}: {e}")
+
+        try:
+            await asyncio.gather(*(visit(url) for url in config.WARM_PROFILE_PREWARM_URLS))
+        finally:
+            await shared.close()
+        self.last_prewarm_seconds = time.monotonic() - started
+        logger.info(f"🔥 Соединения прогреты за {self.last_prewarm_seconds:.1f} с: "
+                    f"{len(config.WARM_PROFILE_PREWARM_URLS)} URL")
+
+    def _release(self, slot: int):
+        self._in_use.discard(slot)
+        if slot in self._wipe_pending:
+            self._wipe_pending.discard(slot)
+            self._wipe_dir(self._path(slot))
+
+    def _wipe_dir(self, path: str):
+        self.wipes += 1
+        shutil.rmtree(path, ignore_errors=True)
+        logger.info(f"🧹 Профиль {path} очищен")
+
+    def _path(self, slot: int) -> str:
+        return os.path.join(self.root, f"shard-{config.SHARD_INDEX}", f"slot-{slot}")
+
+    @staticmethod
+    def _locked_by_other_process(path: str) -> bool:
+        """
+        Профиль заблокирован живым процессом Firefox. Блокировка в Linux — символическая ссылка lock
+        на «адрес:+pid»; ссылка от завершившегося процесса считается устаревшей.
+        """
+        try:
+            target = os.readlink(os.path.join(path, "lock"))
+        except OSError:
+            return False
+        pid = target.rpartition("+")[2]
+        if not pid.isdigit():
+            return True
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
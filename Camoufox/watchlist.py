@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import HTTPException
+
+import config
+from configure_logger import configure
+from domain_health import domain_of
+from exceptions import AdmissionRejectedException
+
+logger = logging.getLogger(__name__)
+configure(logger)
+
+
+class WatchEntry:
+    def __init__(self, entry_id: str, request: Any, interval: float, jitter: float):
+        self.id = entry_id
+        self.url: str = request.url
+        self.request = request
+        self.interval = interval
+        self.jitter = jitter
+        # Первый рендер разносится по окну джиттера, чтобы пачка регистраций не рендерилась разом
+        self.next_due = time.monotonic() + random.uniform(0, interval * jitter)
+        self.registered_at = time.time()
+        self.content: Optional[str] = None
+        # Размер content в UTF-8 (учитывается в бюджете WATCHLIST_MAX_BYTES)
+        self.size = 0
+        self.headers: dict[str, str] = {}
+        self.fetched_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.error_status: Optional[int] = None
+        self.failures = 0
+        self.refreshes = 0
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def refreshing(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def age(self) -> Optional[float]:
+        return None if self.fetched_at is None else time.time() - self.fetched_at
+
+    def is_stale(self) -> bool:
+        """Результат старше интервала с учётом джиттера: плановое обновление опаздывает или не удаётся."""
+        age = self.age()
+        return age is None or age > self.interval * (1 + self.jitter)
+
+    def schedule(self, delay: Optional[float] = None):
+        if delay is None:
+            delay = self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+        self.next_due = time.monotonic() + delay
+
+    def describe(self) -> dict:
+        age = self.age()
+        result = {
+            "id": self.id,
+            "url": self.url,
+            "interval_seconds": self.interval,
+            "jitter": self.jitter,
+            "status": "pending" if self.content is None else ("stale" if self.is_stale() else "fresh"),
+            "registered_at": self.registered_at,
+            "fetched_at": self.fetched_at,
+            "age_seconds": None if age is None else round(age),
+            "next_refresh_in": max(0, round(self.next_due - time.monotonic())),
+            "refreshing": self.refreshing,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
+        if self.last_error is not None:
+            result["last_error"] = self.last_error
+            result["error_status"] = self.error_status
+        return result
+
+
+class Watchlist:
+    """
+    Список отслеживаемых URL с плановым обновлением на стороне рендерера.
+    Планировщик запускает обновления только при свободной ёмкости вкладок (has_idle_capacity),
+    не чаще раза в WATCHLIST_DOMAIN_MIN_INTERVAL_SECONDS на домен и не больше WATCHLIST_MAX_CONCURRENT разом;
+    запросы клиентов всегда впереди. Последний результат хранится в памяти и отдаётся сразу, с возрастом;
+    общий объём результатов ограничен max_bytes.
+    """
+
+    def __init__(
+            self,
+            max_entries: int,
+            max_bytes: int,
+            render: Callable[[Any], Awaitable[tuple[str, dict[str, str]]]],
+            has_idle_capacity: Callable[[], bool],
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._bytes = 0
+        self.render = render
+        self.has_idle_capacity = has_idle_capacity
+        self._entries: dict[str, WatchEntry] = {}
+        # Момент (time.monotonic), раньше которого к домену не запускается следующее обновление
+        self._domain_next: dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+        self.failures = 0
+        self.deferred = 0
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        tasks = [entry.task for entry in self._entries.values() if entry.refreshing]
+        if self._task:
+            tasks.append(self._task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def add(self, entry_id: str, request: Any, interval: float, jitter: float) -> WatchEntry:
+        """Регистрирует URL; повторная регистрация того же id меняет только интервал и джиттер."""
+        entry = self._entries.get(entry_id)
+        if entry is not None:
+            if entry.interval != interval or entry.jitter != jitter:
+                entry.interval, entry.jitter = interval, jitter
+                if not entry.refreshing and entry.fetched_at is not None:
+                    entry.schedule(max(0.0, entry.interval - entry.age()))
+            return entry
+
+        if len(self._entries) >= self.max_entries:
+            raise AdmissionRejectedException(429, "Список отслеживания заполнен", 60)
+        if self._bytes >= self.max_bytes:
+            raise AdmissionRejectedException(429, "Объём результатов списка отслеживания исчерпан", 60)
+        entry = self._entries[entry_id] = WatchEntry(entry_id, request, interval, jitter)
+        logger.info(f"👁️ {entry.url} добавлен в список отслеживания (каждые {interval} с)")
+        return entry
+
+    def get(self, entry_id: str) -> Optional[WatchEntry]:
+        return self._entries.get(entry_id)
+
+    def remove(self, entry_id: str) -> bool:
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return False
+        self._bytes -= entry.size
+        if entry.refreshing:
+            entry.task.cancel()
+        logger.info(f"👁️ {entry.url} удалён из списка отслеживания")
+        return True
+
+    def describe(self) -> list[dict]:
+        return [entry.describe() for entry in self._entries.values()]
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "refreshing": sum(1 for e in self._entries.values() if e.refreshing),
+            "stale": sum(1 for e in self._entries.values() if e.is_stale()),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "deferred": self.deferred,
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(config.WATCHLIST_TICK_SECONDS)
+            try:
+                self._dispatch()
+            except Exception as e:
+                logger.exception(f"⚠️👁️ Ошибка планировщика списка отслеживания: {e}")
+
+    def _dispatch(self):
+        now = time.monotonic()
+        self._domain_next = {domain: t for domain, t in self._domain_next.items() if t > now}
+        due = sorted(
+            (e for e in self._entries.values() if e.next_due <= now and not e.refreshing),
+            key=lambda e: e.next_due,
+        )
+        running = sum(1 for e in self._entries.values() if e.refreshing)
+        for entry in due:
+            if running >= config.WATCHLIST_MAX_CONCURRENT or not self.has_idle_capacity():
+                break
+            domain = domain_of(entry.url)
+            if domain in self._domain_next:
+                continue
+            self._domain_next[domain] = now + config.WATCHLIST_DOMAIN_MIN_INTERVAL_SECONDS
+            entry.task = asyncio.create_task(self._refresh(entry))
+            running += 1
+
+    async def _refresh(self, entry: WatchEntry):
+        started = time.monotonic()
+        try:
+            content, headers = await self.render(entry.request)
+        except asyncio.CancelledError:
+            raise
+        except HTTPException as e:
+            if e.headers and "Retry-After" in e.headers:
+                # нет свободного слота или домен временно закрыт — это не ошибка страницы, просто позже
+                self.deferred += 1
+                entry.schedule(float(e.headers["Retry-After"]))
+                return
+            self._fail(entry, e.status_code, str(e.detail))
+        except Exception as e:
+            logger.exception(f"Обновление {entry.url} упало: {e}")
+            self._fail(entry, 500, str(e))
+        else:
+            size = len(content.encode("utf-8"))
+            if self._bytes - entry.size + size > self.max_bytes:
+                # прежний результат остаётся (и отдаётся как устаревший), новый не помещается в бюджет
+                self._fail(entry, 507, f"Результат ({size} байт) не помещается в объём списка отслеживания")
+                return
+            self._bytes += size - entry.size
+            entry.content, entry.headers, entry.size = content, headers, size
+            entry.fetched_at = time.time()
+            entry.last_error = entry.error_status = None
+            entry.failures = 0
+            entry.refreshes += 1
+            self.refreshes += 1
+            entry.schedule()
+            logger.info(f"✅👁️ {entry.url} обновлён за {time.monotonic() - started:.2f} с")
+
+    def _fail(self, entry: WatchEntry, status_code: int, error: str):
+        entry.failures += 1
+        entry.last_error, entry.error_status = error, status_code
+        self.failures += 1
+        # повтор с экспоненциальной паузой, но не реже планового интервала
+        entry.schedule(min(entry.interval, config.WATCHLIST_RETRY_SECONDS * 2 ** (entry.failures - 1)))
+        logger.warning(f"⚠️👁️ Обновление {entry.url} не удалось ({status_code}, подряд {entry.failures}): {error}")
@@ -16,7 +16,7 @@ public class Camoufox : ICarterModule
         group.MapPost("/html",
                 async ([FromBody] CamoufoxRequest dto, ICamoufoxService service) =>
                 {
-                    var result = await service.GetPageHtml(dto);
+                    var result = await service.GetPageHtml(dto with { Priority = CamoufoxPriority.Interactive });
                     return Results.Ok(result);
                 })
             .WithSummary("Получить HTML");
@@ -24,10 +24,10 @@ public class Camoufox : ICarterModule
         group.MapPost("/screenshot",
                 async ([FromBody] CamoufoxRequest dto, ICamoufoxService service) =>
                 {
-                    var screenshot = await service.GetPageScreenshot(dto);
+                    var screenshot = await service.GetPageScreenshot(dto with { Priority = CamoufoxPriority.Interactive });
                     return screenshot is null
                         ? Results.Empty
-                        : Results.File(screenshot, "image/png");
+                        : Results.File(screenshot, $"image/{dto.Screenshot?.Format ?? "png"}");
                 })
             .Produces(StatusCodes.Status200OK)
             .WithSummary("Получить скриншот");
@@ -6,4 +6,6 @@ public interface ICamoufoxService
 {
     Task<string?> GetPageHtml(CamoufoxRequest request);
     Task<byte[]?> GetPageScreenshot(CamoufoxRequest request);
+    Task<string?> GetPageHtmlAsJob(CamoufoxRequest request, CancellationToken cancellationToken = default);
+    Task<byte[]?> GetPageScreenshotAsJob(CamoufoxRequest request, CancellationToken cancellationToken = default);
 }
\ No newline at end of file
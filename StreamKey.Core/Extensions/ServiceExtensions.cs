@@ -1,3 +1,4 @@
+using System.Net;
 using System.Net.Http.Headers;
 using FluentValidation;
 using Microsoft.Extensions.Configuration;
@@ -94,9 +95,13 @@ public static class ServiceExtensions
             });
 
             services.AddHttpClient<ICamoufoxService, CamoufoxService>((_, client) =>
-            {
-                client.BaseAddress = new Uri("http://camoufox:8080");
-            });
+                {
+                    client.BaseAddress = new Uri("http://camoufox:8080");
+                })
+                .ConfigurePrimaryHttpMessageHandler(() => new HttpClientHandler
+                {
+                    AutomaticDecompression = DecompressionMethods.GZip | DecompressionMethods.Brotli
+                });
 
             services.AddHttpClient(ApplicationConstants.TelegramClientName, (_, client) =>
             {
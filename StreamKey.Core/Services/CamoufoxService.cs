@@ -1,5 +1,7 @@
+using System.Net;
 using System.Net.Http.Headers;
 using System.Net.Http.Json;
+using System.Text.Json;
 using Microsoft.Extensions.Logging;
 using StreamKey.Core.Abstractions;
 using StreamKey.Shared.DTOs;
@@ -8,6 +10,11 @@ namespace StreamKey.Core.Services;
 
 public class CamoufoxService(HttpClient client, ILogger<CamoufoxService> logger) : ICamoufoxService
 {
+    /// <summary>
+    /// Предельное время ожидания задания: без него опрос без токена отмены длился бы бесконечно.
+    /// </summary>
+    private static readonly TimeSpan JobWaitTimeout = TimeSpan.FromMinutes(5);
+
     public async Task<string?> GetPageHtml(CamoufoxRequest request)
     {
         try
@@ -49,4 +56,78 @@ public class CamoufoxService(HttpClient client, ILogger<CamoufoxService> logger)
             return null;
         }
     }
-}
\ No newline at end of file
+
+    public async Task<string?> GetPageHtmlAsJob(CamoufoxRequest request, CancellationToken cancellationToken = default)
+    {
+        try
+        {
+            var jobId = await SubmitJob(request, CamoufoxJobKind.Html, cancellationToken);
+            using var httpResponse = await WaitForJob(jobId, cancellationToken);
+            return await httpResponse.Content.ReadAsStringAsync(cancellationToken);
+        }
+        catch (Exception e)
+        {
+            logger.LogError(e, "Ошибка получения HTML заданием для URL: {Url}", request.Url);
+            return null;
+        }
+    }
+
+    public async Task<byte[]?> GetPageScreenshotAsJob(CamoufoxRequest request, CancellationToken cancellationToken = default)
+    {
+        try
+        {
+            var jobId = await SubmitJob(request, CamoufoxJobKind.Screenshot, cancellationToken);
+            using var httpResponse = await WaitForJob(jobId, cancellationToken);
+            return await httpResponse.Content.ReadAsByteArrayAsync(cancellationToken);
+        }
+        catch (Exception e)
+        {
+            logger.LogError(e, "Ошибка получения скриншота заданием для URL: {Url}", request.Url);
+            return null;
+        }
+    }
+
+    private async Task<string> SubmitJob(CamoufoxRequest request, string kind, CancellationToken cancellationToken)
+    {
+        var body = JsonSerializer.SerializeToNode(request)!.AsObject();
+        body["kind"] = kind;
+
+        using var httpResponse = await client.PostAsJsonAsync("/jobs", body, cancellationToken);
+        httpResponse.EnsureSuccessStatusCode();
+
+        var job = await httpResponse.Content.ReadFromJsonAsync<CamoufoxJob>(cancellationToken)
+                  ?? throw new InvalidOperationException("Пустой ответ Camoufox");
+        return job.Id;
+    }
+
+    /// <summary>
+    /// Опрос задания: короткие запросы вместо одного длинного, поэтому долгий рендер не упирается в таймаут HttpClient.
+    /// Опрос прекращается по токену вызывающего или через JobWaitTimeout.
+    /// </summary>
+    private async Task<HttpResponseMessage> WaitForJob(string jobId, CancellationToken cancellationToken)
+    {
+        using var timeout = CancellationTokenSource.CreateLinkedTokenSource(cancellationToken);
+        timeout.CancelAfter(JobWaitTimeout);
+        cancellationToken = timeout.Token;
+
+        while (true)
+        {
+            var httpResponse = await client.GetAsync($"/jobs/{jobId}", cancellationToken);
+            if (httpResponse.StatusCode != HttpStatusCode.Accepted)
+            {
+                if (httpResponse.IsSuccessStatusCode)
+                {
+                    return httpResponse;
+                }
+
+                var job = await httpResponse.Content.ReadFromJsonAsync<CamoufoxJob>(cancellationToken);
+                httpResponse.Dispose();
+                throw new HttpRequestException($"Задание {jobId} не выполнено: {job?.Error}", null, httpResponse.StatusCode);
+            }
+
+            var delay = httpResponse.Headers.RetryAfter?.Delta ?? TimeSpan.FromSeconds(1);
+            httpResponse.Dispose();
+            await Task.Delay(delay, cancellationToken);
+        }
+    }
+}
@@ -95,7 +95,10 @@ public class ChannelService(
         const string baseXpath = "//div[contains(@class, \"channel-info-content\")]";
 
         var channelUrl = $"{ApplicationConstants.TwitchUrl}{name}";
-        var response = await camoufox.GetPageHtml(new CamoufoxRequest(channelUrl, 30));
+        var response = await camoufox.GetPageHtmlAsJob(new CamoufoxRequest(channelUrl, 30,
+            new CamoufoxWaitCondition(baseXpath),
+            new CamoufoxBlockRules("html-only"),
+            CamoufoxPriority.Background));
 
         if (response is null)
         {
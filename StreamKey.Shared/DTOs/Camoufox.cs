@@ -4,4 +4,59 @@ namespace StreamKey.Shared.DTOs;
 
 public record CamoufoxRequest(
     [property: JsonPropertyName("url")] string Url,
-    [property: JsonPropertyName("wait_time")] int WaitTime);
\ No newline at end of file
+    [property: JsonPropertyName("wait_time")] int WaitTime,
+    [property: JsonPropertyName("wait_for")] CamoufoxWaitCondition? WaitFor = null,
+    [property: JsonPropertyName("block")] CamoufoxBlockRules? Block = null,
+    [property: JsonPropertyName("priority")] string Priority = CamoufoxPriority.Normal,
+    [property: JsonPropertyName("stream")] bool Stream = false,
+    [property: JsonPropertyName("screenshot")] CamoufoxScreenshotOptions? Screenshot = null);
+
+public record CamoufoxScreenshotOptions(
+    [property: JsonPropertyName("format")] string Format = "png",
+    [property: JsonPropertyName("quality")] int? Quality = null,
+    [property: JsonPropertyName("full_page")] bool FullPage = true,
+    [property: JsonPropertyName("clip")] CamoufoxClipRect? Clip = null,
+    [property: JsonPropertyName("selector")] string? Selector = null,
+    [property: JsonPropertyName("max_height")] int? MaxHeight = null,
+    [property: JsonPropertyName("viewport_width")] int ViewportWidth = 1920,
+    [property: JsonPropertyName("viewport_height")] int ViewportHeight = 1080,
+    [property: JsonPropertyName("device_scale_factor")] double? DeviceScaleFactor = null,
+    [property: JsonPropertyName("thumbnail_width")] int? ThumbnailWidth = null);
+
+public record CamoufoxClipRect(
+    [property: JsonPropertyName("x")] double X,
+    [property: JsonPropertyName("y")] double Y,
+    [property: JsonPropertyName("width")] double Width,
+    [property: JsonPropertyName("height")] double Height);
+
+public static class CamoufoxPriority
+{
+    public const string Interactive = "interactive";
+    public const string Normal = "normal";
+    public const string Background = "background";
+}
+
+public record CamoufoxWaitCondition(
+    [property: JsonPropertyName("selector")] string? Selector = null,
+    [property: JsonPropertyName("network_idle_ms")] int? NetworkIdleMs = null,
+    [property: JsonPropertyName("js_predicate")] string? JsPredicate = null,
+    [property: JsonPropertyName("dom_stable_ms")] int? DomStableMs = null);
+
+public record CamoufoxBlockRules(
+    [property: JsonPropertyName("preset")] string? Preset = null,
+    [property: JsonPropertyName("resource_types")] string[]? ResourceTypes = null,
+    [property: JsonPropertyName("url_patterns")] string[]? UrlPatterns = null,
+    [property: JsonPropertyName("domains")] string[]? Domains = null);
+
+public record CamoufoxJob(
+    [property: JsonPropertyName("id")] string Id,
+    [property: JsonPropertyName("kind")] string Kind,
+    [property: JsonPropertyName("status")] string Status,
+    [property: JsonPropertyName("error")] string? Error = null,
+    [property: JsonPropertyName("error_status")] int? ErrorStatus = null);
+
+public static class CamoufoxJobKind
+{
+    public const string Html = "html";
+    public const string Screenshot = "screenshot";
+}